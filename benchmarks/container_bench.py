@@ -0,0 +1,120 @@
+"""
+Бенчмарк сжатого контейнера импульсов: размер против скорости чтения.
+
+На синтетическом захвате (см. synthetic_capture.py) импульсы извлекаются
+один раз, после чего для текстового формата и каждой пары кодек/уровень
+измеряются размер файла, время записи, пропускная способность полного
+чтения (МБ исходных float64-данных в секунду) и время чтения одного
+случайного импульса (распаковывается только его блок).
+
+    python benchmarks/container_bench.py
+    python benchmarks/container_bench.py --samples 1e7 --pulses 1e4 --codec zlib:1 --codec lzma:9 --json codecs.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import numpy as np
+
+from benchmarks.synthetic_capture import generate
+
+
+DEFAULT_CODECS = ("none:0", "zlib:1", "zlib:6", "zlib:9", "lzma:0", "lzma:6", "lzma:9")
+RANDOM_READS = 20
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    value = func(*args, **kwargs)
+    return value, time.perf_counter() - start
+
+
+def run(n_samples: int, n_pulses: int, width: int, seed: int, codecs: list[str],
+        chunk_pulses: int, float32: bool, work_dir: Path) -> dict:
+    from src.core.config_loader import load_selections
+    from src.core.pulse_extractor import extract_pulse_batch
+    from src.core.pulse_writer import write_pulse_batch
+    from src.data.pulse_container import PulseContainer, write_container
+    from src.models.config_models import ConfigModel
+    from src.validation.pulse_loader import load_pulse_batch
+
+    generate(work_dir, n_samples, n_pulses, width, seed)
+    config = ConfigModel(data_folder_path=work_dir / "raw")
+    batch = extract_pulse_batch(config, load_selections(work_dir / "selections"))
+    raw_mb = 3 * batch.time.size * 8 / 2**20
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(batch), size=RANDOM_READS)
+
+    results = {}
+    txt_path = work_dir / "pulses.txt"
+    _, write_s = timed(write_pulse_batch, batch, txt_path)
+    _, read_s = timed(load_pulse_batch, txt_path)
+    results["txt"] = {"size_mb": txt_path.stat().st_size / 2**20, "write_seconds": write_s,
+                      "read_mb_per_s": raw_mb / read_s, "random_read_ms": None}
+
+    for spec in codecs:
+        codec, _, level = spec.partition(":")
+        path = work_dir / f"pulses_{codec}_{level or 0}.pulsez"
+        _, write_s = timed(write_container, batch, path, codec=codec, level=int(level or 0),
+                           chunk_pulses=chunk_pulses, float32=float32)
+        container = PulseContainer(path)
+        _, read_s = timed(container.read_batch)
+        start = time.perf_counter()
+        for k in picks.tolist():
+            container.read_pulses(k, k + 1)
+        random_ms = (time.perf_counter() - start) / RANDOM_READS * 1000
+        results[spec] = {"size_mb": path.stat().st_size / 2**20, "write_seconds": write_s,
+                         "read_mb_per_s": raw_mb / read_s, "random_read_ms": random_ms}
+
+    return {"n_samples": n_samples, "n_pulses": len(batch), "raw_mb": raw_mb,
+            "chunk_pulses": chunk_pulses, "float32": float32, "formats": results}
+
+
+def main(argv: list[str] | None = None) -> int:
+    from src.data.pulse_container import CODECS, DEFAULT_CHUNK_PULSES
+
+    parser = argparse.ArgumentParser(description="Размер и скорость чтения контейнера импульсов по кодекам")
+    parser.add_argument("--samples", type=float, default=1e6, help="Отсчётов в захвате (по умолчанию: 1e6)")
+    parser.add_argument("--pulses", type=float, default=1e3, help="Импульсов (по умолчанию: 1e3)")
+    parser.add_argument("--width", type=int, default=200, help="Длина импульса в точках (по умолчанию: 200)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--codec", action="append", default=None,
+                        help=f"Кодек:уровень, можно несколько (по умолчанию: {' '.join(DEFAULT_CODECS)})")
+    parser.add_argument("--chunk-pulses", type=int, default=DEFAULT_CHUNK_PULSES,
+                        help=f"Импульсов в блоке (по умолчанию: {DEFAULT_CHUNK_PULSES})")
+    parser.add_argument("--float32", action="store_true", help="Хранить ток и напряжение во float32")
+    parser.add_argument("--json", type=Path, default=None, help="Сохранить результаты в JSON")
+    args = parser.parse_args(argv)
+
+    codecs = args.codec or list(DEFAULT_CODECS)
+    for spec in codecs:
+        if spec.partition(":")[0] not in CODECS:
+            parser.error(f"Неизвестный кодек в {spec!r}, допустимы: {', '.join(CODECS)}")
+
+    with tempfile.TemporaryDirectory(prefix="container_bench_") as tmp:
+        report = run(int(args.samples), int(args.pulses), args.width, args.seed, codecs,
+                     args.chunk_pulses, args.float32, Path(tmp))
+
+    print(f"📦 {report['n_pulses']} импульсов, {report['raw_mb']:.1f} МБ исходных данных")
+    print(f"   {'формат':<10} {'размер, МБ':>11} {'запись, с':>10} {'чтение, МБ/с':>13} {'1 импульс, мс':>14}")
+    for name, r in report["formats"].items():
+        random_ms = f"{r['random_read_ms']:14.2f}" if r["random_read_ms"] is not None else f"{'-':>14}"
+        print(f"   {name:<10} {r['size_mb']:11.2f} {r['write_seconds']:10.3f} {r['read_mb_per_s']:13.1f} {random_ms}")
+
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"💾 Результаты сохранены: {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""
+Бенчмарк пакетной отрисовки гистограмм зарядов.
+
+Для --count синтетических наборов зарядов (по --pulses импульсов, разные
+среднее и разброс) гистограммы считаются заранее, после чего измеряется
+время сохранения одной гистограммы:
+    fresh    - новая фигура на каждый файл, tight_layout и bbox_inches="tight"
+               (как до шаблонов), DEFAULT_DPI; на первых --sample файлах
+    template - переиспользуемый шаблон при DEFAULT_DPI; на первых --sample файлах
+    bulk     - шаблон при BULK_DPI на всех --count файлах
+    report   - сводный отчёт BatchAnalyzer (4 панели) при BULK_DPI на --sample файлах
+    parallel - bulk пулом из --workers процессов, как в BatchAnalyzer
+Итог сравнивается с целью: --count гистограмм не дольше --target секунд;
+если цель не выполнена, скрипт завершается с кодом 1.
+
+    python benchmarks/histogram_bench.py
+    python benchmarks/histogram_bench.py --count 500 --workers 8 --target 10 --json hist.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import numpy as np
+
+
+def make_histograms(count: int, pulses: int, bins: int, seed: int) -> list:
+    from src.analysis.histogram_plotter import compute_charge_histogram
+
+    rng = np.random.default_rng(seed)
+    means = rng.uniform(-50e-9, 50e-9, count)
+    stds = rng.uniform(0.5e-9, 5e-9, count)
+    return [compute_charge_histogram(rng.normal(m, s, pulses), bins) for m, s in zip(means, stds)]
+
+
+def render_fresh(hist, path: Path, dpi: int) -> None:
+    """Отрисовка без шаблона: фигура и раскладка заново для каждого файла."""
+    from src.analysis.histogram_plotter import FIGURE_SIZE, _agg_figure, _style_histogram_axes, _update
+
+    fig = _agg_figure(FIGURE_SIZE)
+    template = _style_histogram_axes(fig.add_subplot(111), hist.density.size, "нКл")
+    _update(template, hist, "нКл", "mid")
+    fig.tight_layout()
+    fig.savefig(path, dpi=dpi, bbox_inches="tight")
+
+
+def render_chunk(args: tuple[list, str, int, int]) -> int:
+    """Воркер пула: шаблон создаётся в процессе один раз и переиспользуется."""
+    from src.analysis.histogram_plotter import render_charge_histogram
+
+    hists, out_dir, start, dpi = args
+    for k, hist in enumerate(hists, start=start):
+        render_charge_histogram(hist, Path(out_dir) / f"parallel_{k:04d}.png", dpi=dpi)
+    return len(hists)
+
+
+def per_file(render, items: list, out_dir: Path, prefix: str) -> float:
+    """Среднее время сохранения одного файла; первый вызов (создание шаблона) не учитывается."""
+    render(items[0], out_dir / f"{prefix}_warmup.png")
+    start = time.perf_counter()
+    for k, item in enumerate(items):
+        render(item, out_dir / f"{prefix}_{k:04d}.png")
+    return (time.perf_counter() - start) / len(items)
+
+
+def run(count: int, sample: int, pulses: int, bins: int, workers: int, seed: int, work_dir: Path) -> dict:
+    from src.analysis.histogram_plotter import (BULK_DPI, DEFAULT_DPI, compute_charge_statistics,
+                                                render_charge_histogram, render_charge_statistics)
+
+    hists = make_histograms(count, pulses, bins, seed)
+    head = hists[:sample]
+    rng = np.random.default_rng(seed)
+    reports = [compute_charge_statistics(rng.normal(0.0, 1e-9, pulses), bins) for _ in range(sample)]
+
+    seconds = {
+        "fresh": per_file(lambda h, p: render_fresh(h, p, DEFAULT_DPI), head, work_dir, "fresh"),
+        "template": per_file(lambda h, p: render_charge_histogram(h, p, dpi=DEFAULT_DPI), head, work_dir, "template"),
+        "bulk": per_file(lambda h, p: render_charge_histogram(h, p, dpi=BULK_DPI), hists, work_dir, "bulk"),
+        "report": per_file(lambda s, p: render_charge_statistics(s, p, dpi=BULK_DPI), reports, work_dir, "report"),
+    }
+
+    total = {"bulk": seconds["bulk"] * count}
+    if workers > 1:
+        step = -(-count // (workers * 4))
+        chunks = [(hists[k:k + step], str(work_dir), k, BULK_DPI) for k in range(0, count, step)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Первая волна создаёт шаблоны в воркерах, как первый файл BatchAnalyzer
+            list(pool.map(render_chunk, [(hists[:1], str(work_dir), 0, BULK_DPI)] * workers))
+            start = time.perf_counter()
+            list(pool.map(render_chunk, chunks))
+            total["parallel"] = time.perf_counter() - start
+        seconds["parallel"] = total["parallel"] / count
+
+    return {"count": count, "sample": sample, "pulses": pulses, "bins": bins, "workers": workers,
+            "default_dpi": DEFAULT_DPI, "bulk_dpi": BULK_DPI, "seconds_per_file": seconds, "total_seconds": total}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Скорость пакетной отрисовки гистограмм зарядов")
+    parser.add_argument("--count", type=int, default=200, help="Гистограмм в пакете (по умолчанию: 200)")
+    parser.add_argument("--sample", type=int, default=20,
+                        help="Файлов для медленных вариантов fresh/template/report (по умолчанию: 20)")
+    parser.add_argument("--pulses", type=int, default=5000, help="Импульсов на файл (по умолчанию: 5000)")
+    parser.add_argument("--bins", type=int, default=20, help="Число бинов (по умолчанию: 20)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Процессов для варианта parallel (по умолчанию: число ядер)")
+    parser.add_argument("--target", type=float, default=10.0,
+                        help="Цель: секунд на --count гистограмм (по умолчанию: 10)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, default=None, help="Сохранить результаты в JSON")
+    args = parser.parse_args(argv)
+    if args.count < 1 or args.sample < 1:
+        parser.error("--count и --sample должны быть положительными")
+
+    with tempfile.TemporaryDirectory(prefix="histogram_bench_") as tmp:
+        report = run(args.count, min(args.sample, args.count), args.pulses, args.bins,
+                     args.workers, args.seed, Path(tmp))
+
+    seconds = report["seconds_per_file"]
+    labels = {
+        "fresh": f"без шаблона, {report['default_dpi']} dpi",
+        "template": f"шаблон, {report['default_dpi']} dpi",
+        "bulk": f"шаблон, {report['bulk_dpi']} dpi",
+        "report": f"отчёт 2x2, {report['bulk_dpi']} dpi",
+        "parallel": f"шаблон, {report['bulk_dpi']} dpi, процессов: {report['workers']}",
+    }
+    print(f"📊 {report['count']} гистограмм по {report['pulses']} импульсов, {report['bins']} бинов")
+    print(f"   {'вариант':<36} {'на файл, мс':>12} {'файлов/с':>9} {'пакет, с':>9}")
+    for name, s in seconds.items():
+        print(f"   {labels[name]:<36} {s * 1000:12.1f} {1 / s:9.1f} {s * report['count']:9.1f}")
+
+    best = min(report["total_seconds"].values())
+    met = best <= args.target
+    print(f"{'✅' if met else '❌'} {report['count']} гистограмм за {best:.1f} с (цель: {args.target:g} с)")
+
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"💾 Результаты сохранены: {args.json}")
+    return 0 if met else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
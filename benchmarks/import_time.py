@@ -0,0 +1,99 @@
+"""
+Бенчмарк времени старта CLI на основе `python -X importtime`.
+
+Каждая команда запускается несколько раз в отдельном интерпретаторе,
+из stderr берётся суммарное (cumulative) время импортов верхнего уровня,
+в отчёт идёт медиана. Если медиана превышает порог или загружен
+запрещённый тяжёлый модуль, скрипт завершается с кодом 1.
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --max-ms 150 --runs 7 --json import_time.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Команды, старт которых измеряется, и модули, которые они не должны загружать
+DEFAULT_CASES = {
+    "analysis --help": (["-m", "src.analysis", "--help"], ("numpy", "pydantic", "matplotlib")),
+    "validation --cli --help": (["-m", "src.validation", "--cli", "--help"], ("numpy", "pydantic", "matplotlib")),
+}
+DEFAULT_MAX_MS = 150.0
+DEFAULT_RUNS = 5
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def parse_importtime(stderr: str) -> tuple[float, dict[str, float]]:
+    """Возвращает суммарное время импортов (мс) и cumulative-время каждого модуля."""
+    total_us = 0
+    modules: dict[str, float] = {}
+    for line in stderr.splitlines():
+        m = _LINE.match(line)
+        if not m:
+            continue
+        cumulative_us, indent, name = int(m.group(2)), m.group(3), m.group(4)
+        modules[name] = cumulative_us / 1000.0
+        # Модули верхнего уровня имеют отступ в один пробел
+        if len(indent) == 1:
+            total_us += cumulative_us
+    return total_us / 1000.0, modules
+
+
+def measure(args: list[str], runs: int) -> tuple[float, dict[str, float]]:
+    """Медианное время импортов команды и модули последнего запуска."""
+    totals = []
+    modules: dict[str, float] = {}
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", *args],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+        )
+        total, modules = parse_importtime(proc.stderr)
+        totals.append(total)
+    return statistics.median(totals), modules
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Время импортов при старте CLI (-X importtime)")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help=f"Запусков на команду (по умолчанию: {DEFAULT_RUNS})")
+    parser.add_argument("--max-ms", type=float, default=DEFAULT_MAX_MS,
+                        help=f"Порог медианного времени импортов, мс (по умолчанию: {DEFAULT_MAX_MS})")
+    parser.add_argument("--top", type=int, default=5, help="Сколько самых дорогих модулей показать")
+    parser.add_argument("--json", type=Path, default=None, help="Сохранить результаты в JSON")
+    args = parser.parse_args(argv)
+
+    results = {}
+    failed = False
+    for name, (cmd, forbidden) in DEFAULT_CASES.items():
+        median_ms, modules = measure(cmd, args.runs)
+        loaded = sorted(m for m in forbidden if m in modules)
+        ok = median_ms <= args.max_ms and not loaded
+        failed |= not ok
+        results[name] = {"median_ms": median_ms, "forbidden_loaded": loaded, "ok": ok}
+
+        print(f"{'✅' if ok else '❌'} {name}: {median_ms:.1f} мс (порог {args.max_ms:.0f} мс)")
+        if loaded:
+            print(f"   Загружены тяжёлые модули: {', '.join(loaded)}")
+        top = sorted(modules.items(), key=lambda kv: kv[1], reverse=True)[:args.top]
+        for mod, ms in top:
+            print(f"   {ms:8.1f} мс  {mod}")
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+"""
+Бенчмарк основных этапов обработки на синтетических захватах.
+
+Для каждого размера генерируется захват и selections.json (см.
+synthetic_capture.py), затем по очереди измеряются время и пиковая память
+(tracemalloc) этапов:
+    extract_all_pulses -> write_pulses -> load_pulses -> compute_all_charges
+    -> plot_charge_histogram -> PulsesRepository.load_group
+Результаты пишутся в JSON; с --compare сравниваются с прошлым прогоном,
+и при замедлении сверх допуска скрипт завершается с кодом 1.
+Время измеряется под tracemalloc, поэтому сравнивать имеет смысл только
+прогоны этого скрипта между собой.
+
+    python benchmarks/pipeline_bench.py --case small --case medium --json bench.json
+    python benchmarks/pipeline_bench.py --samples 1e7 --pulses 1e4 --compare bench.json
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import numpy as np
+
+from benchmarks.synthetic_capture import generate
+
+
+# Предустановленные размеры: (отсчётов, импульсов)
+CASES = {
+    "small": (10**6, 10**2),
+    "medium": (10**7, 10**4),
+    "large": (10**8, 10**5),
+    "huge": (10**9, 10**6),
+}
+DEFAULT_TOLERANCE = 0.25
+
+
+def measure(name: str, results: dict, func, *args, **kwargs):
+    """Вызывает func, записывая в results[name] время и пик памяти; stdout подавляется."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        value = func(*args, **kwargs)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    results[name] = {"seconds": seconds, "peak_mb": peak / 2**20}
+    print(f"   {name:<24} {seconds:9.3f} с  {peak / 2**20:10.1f} МБ")
+    return value
+
+
+def run_case(n_samples: int, n_pulses: int, width: int, seed: int, work_dir: Path) -> dict:
+    """Генерирует захват в work_dir и измеряет все этапы."""
+    from src.core.config_loader import load_selections
+    from src.core.pulse_extractor import extract_all_pulses
+    from src.core.pulse_writer import write_pulses
+    from src.core.mpl_backend import use_headless_backend
+    from src.models.config_models import ConfigModel
+    from src.validation.pulse_loader import load_pulses
+    from src.analysis.charge_calculator import compute_all_charges
+    from src.data.pulses_repository import PulsesRepository
+    from src.data.selections_codec import write_selections_mask
+
+    use_headless_backend()
+    from src.analysis.histogram_plotter import plot_charge_histogram
+
+    start = time.perf_counter()
+    npz_path, _ = generate(work_dir, n_samples, n_pulses, width, seed)
+    generate_seconds = time.perf_counter() - start
+
+    config = ConfigModel(data_folder_path=work_dir / "raw", output_file=Path("pulses.txt"))
+    selections = load_selections(work_dir / "selections")
+    pulses_path = work_dir / "pulses.txt"
+
+    stages: dict = {}
+    pulses = measure("extract_all_pulses", stages, extract_all_pulses, config, selections)
+    measure("write_pulses", stages, write_pulses, pulses, pulses_path)
+    del pulses
+    pulses = measure("load_pulses", stages, load_pulses, pulses_path)
+    charges = measure("compute_all_charges", stages, compute_all_charges, pulses)
+    del pulses
+    measure("plot_charge_histogram", stages, plot_charge_histogram, charges, work_dir / "histogram.png")
+
+    # Явный selections (каждый десятый отклонён), чтобы не трогать данные проекта
+    mask = np.ones(n_pulses, dtype=bool)
+    mask[::10] = False
+    selections_path = write_selections_mask(work_dir / "pulses_selections.json", mask, pulses_path.name)
+    measure("load_group", stages, PulsesRepository.load_group, pulses_path, selections_path)
+
+    return {
+        "n_samples": n_samples,
+        "n_pulses": n_pulses,
+        "pulse_width": width,
+        "capture_mb": npz_path.stat().st_size / 2**20,
+        "pulses_file_mb": pulses_path.stat().st_size / 2**20,
+        "generate_seconds": generate_seconds,
+        "stages": stages,
+    }
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "date": datetime.now().isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Этапы, время которых выросло больше чем на tolerance относительно baseline."""
+    regressions = []
+    for case, result in current["cases"].items():
+        base = baseline.get("cases", {}).get(case)
+        if not base:
+            continue
+        for stage, values in result["stages"].items():
+            old = base["stages"].get(stage)
+            if not old or old["seconds"] <= 0:
+                continue
+            ratio = values["seconds"] / old["seconds"]
+            if ratio > 1.0 + tolerance:
+                regressions.append(f"{case}/{stage}: {old['seconds']:.3f} -> {values['seconds']:.3f} с (x{ratio:.2f})")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк этапов обработки на синтетических данных")
+    parser.add_argument("--case", action="append", choices=sorted(CASES),
+                        help="Предустановленный размер (можно несколько; по умолчанию: small)")
+    parser.add_argument("--samples", type=float, default=None, help="Своё число отсчётов (вместе с --pulses)")
+    parser.add_argument("--pulses", type=float, default=None, help="Своё число импульсов")
+    parser.add_argument("--width", type=int, default=200, help="Длина импульса в точках (по умолчанию: 200)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", type=Path, default=None,
+                        help="Папка для сгенерированных данных (по умолчанию: временная, удаляется)")
+    parser.add_argument("--json", type=Path, default=None, help="Сохранить результаты в JSON")
+    parser.add_argument("--compare", type=Path, default=None, help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"Допустимое замедление этапа (по умолчанию: {DEFAULT_TOLERANCE:.0%}%)")
+    args = parser.parse_args(argv)
+
+    cases: dict[str, tuple[int, int]] = {}
+    if args.samples is not None or args.pulses is not None:
+        if args.samples is None or args.pulses is None:
+            parser.error("--samples и --pulses задаются вместе")
+        cases[f"custom_{int(args.samples)}x{int(args.pulses)}"] = (int(args.samples), int(args.pulses))
+    for name in args.case or ([] if cases else ["small"]):
+        cases[name] = CASES[name]
+
+    report = {"environment": environment(), "cases": {}}
+    for name, (n_samples, n_pulses) in cases.items():
+        print(f"🚀 {name}: {n_samples:.0e} отсчётов, {n_pulses:.0e} импульсов")
+        if args.work_dir is not None:
+            work_dir = args.work_dir / name
+            report["cases"][name] = run_case(n_samples, n_pulses, args.width, args.seed, work_dir)
+        else:
+            with tempfile.TemporaryDirectory(prefix="pulse_bench_") as tmp:
+                report["cases"][name] = run_case(n_samples, n_pulses, args.width, args.seed, Path(tmp))
+
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"💾 Результаты сохранены: {args.json}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print("❌ Замедления относительно прошлого прогона:")
+            for line in regressions:
+                print(f"   {line}")
+            return 1
+        print("✅ Замедлений сверх допуска нет")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
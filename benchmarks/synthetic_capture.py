@@ -0,0 +1,117 @@
+"""
+Генератор синтетических осциллограмм для бенчмарков.
+
+Создаёт .npz в формате установки (ключ "data" = [время, напряжение, ток])
+и соответствующий selections.json. Массив пишется в zip по частям, поэтому
+захваты на 10^8-10^9 отсчётов не требуют держать их в памяти целиком.
+
+    python benchmarks/synthetic_capture.py out_dir --samples 1e7 --pulses 1e4
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import zipfile
+from pathlib import Path
+
+import numpy as np
+
+
+DEFAULT_DT = 1e-9
+DEFAULT_CHUNK = 1 << 22
+
+
+def pulse_positions(n_samples: int, n_pulses: int, pulse_width: int, seed: int = 0) -> np.ndarray:
+    """Начала импульсов: равномерная сетка со случайным сдвигом внутри шага."""
+    step = n_samples // n_pulses
+    if step <= pulse_width:
+        raise ValueError(f"{n_pulses} импульсов по {pulse_width} точек не помещаются в {n_samples} отсчётов")
+    rng = np.random.default_rng(seed)
+    jitter = rng.integers(0, step - pulse_width, size=n_pulses)
+    return np.arange(n_pulses, dtype=np.int64) * step + jitter
+
+
+def _fill_row(row: int, start: int, stop: int, starts: np.ndarray, amplitudes: np.ndarray,
+              template: np.ndarray, rng: np.random.Generator, dt: float) -> np.ndarray:
+    """Участок [start, stop) строки row массива data: шум плюс попавшие в него импульсы."""
+    n = stop - start
+    if row == 0:
+        return (start + np.arange(n)) * dt
+    # Напряжение повторяет форму тока с половинной амплитудой
+    scale, noise = (0.5, 0.01) if row == 1 else (1.0, 0.005)
+    block = rng.normal(0.0, noise, n)
+
+    width = template.size
+    lo = np.searchsorted(starts, start - width, side="right")
+    hi = np.searchsorted(starts, stop, side="left")
+    for p, amplitude in zip(starts[lo:hi], amplitudes[lo:hi]):
+        a, b = max(p, start), min(p + width, stop)
+        block[a - start:b - start] += scale * amplitude * template[a - p:b - p]
+    return block
+
+
+def write_capture(path: Path, n_samples: int, starts: np.ndarray, pulse_width: int,
+                  dt: float = DEFAULT_DT, seed: int = 0, chunk: int = DEFAULT_CHUNK) -> Path:
+    """Пишет .npz с массивом data формы (3, n_samples) блоками по chunk отсчётов."""
+    amplitudes = 1.0 + 0.1 * np.random.default_rng(seed + 1).standard_normal(starts.size)
+    template = np.exp(-0.5 * ((np.arange(pulse_width) - pulse_width / 3) / (pulse_width / 8)) ** 2)
+
+    # Строки (время, напряжение, ток) пишутся последовательно: в .npy C-порядке
+    # каждая строка - непрерывный участок, поэтому блоки одной строки идут подряд
+    header = {"descr": np.lib.format.dtype_to_descr(np.dtype(np.float64)),
+              "fortran_order": False, "shape": (3, n_samples)}
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+        with zf.open("data.npy", "w", force_zip64=True) as f:
+            np.lib.format.write_array_header_2_0(f, header)
+            for row in range(3):
+                rng = np.random.default_rng(seed + 2 + row)
+                for start in range(0, n_samples, chunk):
+                    stop = min(start + chunk, n_samples)
+                    f.write(_fill_row(row, start, stop, starts, amplitudes, template, rng, dt).tobytes())
+    return path
+
+
+def write_selections(path: Path, file_name: str, starts: np.ndarray, pulse_width: int) -> Path:
+    """selections.json в формате, который читает load_selections."""
+    entry = {
+        "file_name": file_name,
+        "batch_size": int(pulse_width),
+        "overlap_size": 0,
+        "selections": [{"start_index": int(s), "end_index": int(s + pulse_width - 1)} for s in starts],
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([entry], f)
+    return path
+
+
+def generate(out_dir: Path, n_samples: int, n_pulses: int, pulse_width: int = 200,
+             seed: int = 0, file_name: str = "synthetic.npz") -> tuple[Path, Path]:
+    """Создаёт raw/<file_name> и selections/selections.json в out_dir."""
+    raw_dir = out_dir / "raw"
+    sel_dir = out_dir / "selections"
+    raw_dir.mkdir(parents=True, exist_ok=True)
+    sel_dir.mkdir(parents=True, exist_ok=True)
+
+    starts = pulse_positions(n_samples, n_pulses, pulse_width, seed)
+    npz_path = write_capture(raw_dir / file_name, n_samples, starts, pulse_width, seed=seed)
+    sel_path = write_selections(sel_dir / "selections.json", file_name, starts, pulse_width)
+    return npz_path, sel_path
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Генерация синтетического захвата и selections.json")
+    parser.add_argument("out_dir", type=Path, help="Папка для raw/ и selections/")
+    parser.add_argument("--samples", type=float, default=1e6, help="Число отсчётов (по умолчанию: 1e6)")
+    parser.add_argument("--pulses", type=float, default=1e2, help="Число импульсов (по умолчанию: 1e2)")
+    parser.add_argument("--width", type=int, default=200, help="Длина импульса в точках (по умолчанию: 200)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    npz_path, sel_path = generate(args.out_dir, int(args.samples), int(args.pulses), args.width, args.seed)
+    print(f"✅ Захват: {npz_path} ({npz_path.stat().st_size / 2**20:.1f} МБ)")
+    print(f"✅ Селекции: {sel_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
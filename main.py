@@ -1,26 +1,173 @@
 
+import argparse
 from pathlib import Path
-from src.core.config_loader import load_config, load_selections, load_data_config
-from src.core.pulse_extractor import extract_all_pulses
+from src.core.instrumentation import add_instrumentation_arguments, configure_logging, get_logger, profile_session
+from src.core.config_loader import load_config, load_selections
+from src.core.session import get_session
+from src.core.pulse_extractor import extract_all_pulses, iter_capture_batches
+from src.core.prefetch import DEFAULT_DEPTH, DEFAULT_MAX_MB
 from src.core.pulse_writer import write_pulses
+from src.data.pulse_catalog import PulseCatalog, update_catalog_safely
 
 
-def main():
+log = get_logger("main")
+
+
+def extract(shard: str = "none", shard_size: int | None = None, virtual: bool = False,
+            compact_time: bool = False, float32: bool = False, codec: str | None = None, level: int = 6,
+            prefetch_depth: int = DEFAULT_DEPTH, prefetch_mb: int | None = DEFAULT_MAX_MB):
     # Загружаем новую конфигурацию данных
-    data_config = load_data_config()
+    session = get_session()
+    data_config = session.config
 
     # Загружаем конфиг извлечения и селекции
     config = load_config(Path("configs/extraction_config.json"))
     selections = load_selections(data_config.selections_folder)
 
+    if virtual:
+        write_virtual(config, data_config)
+        return
+    if shard != "none":
+        extract_sharded(config, selections, per_source=shard == "source", shard_size=shard_size,
+                        compact=compact_time, float32=float32,
+                        prefetch_depth=prefetch_depth, prefetch_mb=prefetch_mb)
+        return
+    output_path = session.ensure_dir(data_config.processed_folder) / config.output_file
+    if codec is not None:
+        extract_container(config, selections, output_path, codec, level, float32, prefetch_depth, prefetch_mb)
+        return
+
     # Извлекаем импульсы
-    pulses = extract_all_pulses(config, selections)
+    pulses = extract_all_pulses(config, selections, prefetch_depth, prefetch_mb)
 
     # Сохраняем в правильную папку
-    output_path = data_config.processed_folder / config.output_file
-    write_pulses(pulses, output_path)
+    write_pulses(pulses, output_path, compact=compact_time, float32=float32)
+
+    # Индексируем результат в каталоге импульсов
+    update_catalog_safely(PulseCatalog.index_pulse_file, output_path)
+
+    log.info("Успешно извлечено %d импульсов в %s", len(pulses), output_path)
+
+
+def extract_container(config, selections, output_path: Path, codec: str, level: int, float32: bool,
+                      prefetch_depth: int, prefetch_mb: int | None):
+    """Потоковая запись в сжатый контейнер: захват за захватом, следующий читается в фоне.
+
+    Каталог импульсов хранит байтовые смещения текста, поэтому контейнер в нём не индексируется.
+    """
+    from src.data.pulse_container import CONTAINER_SUFFIX, write_container
+
+    output_path = output_path.with_suffix(CONTAINER_SUFFIX)
+    batches = (batch for _, batch in iter_capture_batches(config, selections, prefetch_depth, prefetch_mb))
+    index = write_container(batches, output_path, codec=codec, level=level, float32=float32)
+    log.info("Успешно извлечено %d импульсов в %s (%d блоков, %s)",
+             index.total_pulses, output_path, len(index.chunks), codec)
+
+
+def write_virtual(config, data_config):
+    """Вместо копирования импульсов записывает описание виртуального набора."""
+    from src.data.virtual_dataset import virtual_path_for, write_virtual_spec
+
+    session = get_session()
+    output_path = session.ensure_dir(data_config.processed_folder) / config.output_file
+    spec_path = write_virtual_spec(
+        virtual_path_for(output_path),
+        raw_folder=config.data_folder,
+        selections_folder=data_config.selections_folder,
+    )
+    log.info("Виртуальный набор записан: %s (импульсы читаются из захватов при загрузке)", spec_path)
+
+
+def extract_sharded(config, selections, per_source: bool, shard_size: int | None,
+                    compact: bool = False, float32: bool = False,
+                    prefetch_depth: int = DEFAULT_DEPTH, prefetch_mb: int | None = DEFAULT_MAX_MB):
+    """Извлечение с записью шардов (по захватам или по числу импульсов) и манифеста."""
+    from src.data.pulse_manifest import manifest_path_for, write_sharded
+
+    session = get_session()
+    output_path = session.ensure_dir(session.config.processed_folder) / config.output_file
+    manifest_path = manifest_path_for(output_path)
+
+    # Захваты извлекаются по одному, чтобы знать источник каждого импульса; следующий читается в фоне
+    sources = iter_capture_batches(config, selections, prefetch_depth, prefetch_mb)
+    manifest = write_sharded(sources, manifest_path, per_source=per_source, shard_size=shard_size,
+                             compact=compact, float32=float32)
+
+    for shard_path in manifest.shard_paths(manifest_path):
+        update_catalog_safely(PulseCatalog.index_pulse_file, shard_path)
+
+    log.info("Успешно извлечено %d импульсов в %d шардов, манифест: %s",
+             manifest.total_pulses, len(manifest.shards), manifest_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Извлечение импульсов из .npz по селекциям")
+    parser.add_argument(
+        "--shard",
+        choices=("none", "source", "count"),
+        default="none",
+        help="Вывод шардами: source - файл на каждый захват, count - по --shard-size импульсов "
+             "(по умолчанию: none - один файл)",
+    )
+    parser.add_argument(
+        "--virtual",
+        action="store_true",
+        help="Не копировать импульсы: записать processed/<имя>.virtual.json, "
+             "по которому импульсы читаются прямо из .npz",
+    )
+    parser.add_argument(
+        "--shard-size",
+        type=int,
+        default=None,
+        help="Максимум импульсов в шарде (обязателен для --shard count)",
+    )
+    parser.add_argument(
+        "--compact-time",
+        action="store_true",
+        help="Хранить равномерное время как t0:dt в строке start вместо столбца time",
+    )
+    parser.add_argument(
+        "--float32",
+        action="store_true",
+        help="Писать ток и напряжение с точностью float32 (9 значащих цифр) в любом формате; "
+             "вместе с --compact-time файл примерно вдвое меньше",
+    )
+    parser.add_argument(
+        "--codec",
+        choices=("zlib", "lzma", "none"),
+        default=None,
+        help="Писать сжатый контейнер processed/<имя>.pulsez с блоками по 256 импульсов "
+             "вместо текстового файла",
+    )
+    parser.add_argument(
+        "--level",
+        type=int,
+        default=6,
+        help="Уровень сжатия для --codec (zlib: 0-9, lzma: 0-9; по умолчанию: 6)",
+    )
+    parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=DEFAULT_DEPTH,
+        help=f"Сколько захватов читать заранее в фоновом потоке (0 - без упреждения; по умолчанию: {DEFAULT_DEPTH})",
+    )
+    parser.add_argument(
+        "--prefetch-mb",
+        type=int,
+        default=DEFAULT_MAX_MB,
+        help=f"Лимит памяти под заранее прочитанные захваты, МБ (по умолчанию: {DEFAULT_MAX_MB})",
+    )
+    add_instrumentation_arguments(parser, "profile_extract")
+    args = parser.parse_args()
+    if args.shard == "count" and not args.shard_size:
+        parser.error("--shard count требует --shard-size")
+    if args.codec is not None and (args.shard != "none" or args.virtual):
+        parser.error("--codec нельзя сочетать с --shard и --virtual")
 
-    print(f"Успешно извлечено {len(pulses)} импульсов в {output_path}")
+    configure_logging(args.log_level)
+    with profile_session(args.profile):
+        extract(args.shard, args.shard_size, args.virtual, args.compact_time, args.float32, args.codec, args.level,
+                args.prefetch, args.prefetch_mb)
 
 
 if __name__ == "__main__":
@@ -1,29 +1,32 @@
 """
 CLI для анализа импульсов: расчёт зарядов и построение гистограммы.
+
+matplotlib и модули загрузки данных импортируются только после разбора
+аргументов; до него загружается лишь density (numpy и pydantic) ради
+проверки --bins.
 """
-import numpy as np
 import argparse
-import json
 from pathlib import Path
 from datetime import datetime
-from src.core.config_loader import load_data_config
-from src.analysis.charge_calculator import compute_all_charges
-from src.analysis.histogram_plotter import plot_charge_histogram
-from src.data.pulses_repository import PulsesRepository
 
+from src.core.instrumentation import add_instrumentation_arguments, configure_logging, get_logger, profile_session
+from src.analysis.density import bins_arg
 
-def main():
-    # Загружаем конфигурацию для правильных путей
-    data_config = load_data_config()
+# Сколько точек KDE сохранять в JSON
+_KDE_JSON_POINTS = 256
 
+log = get_logger("analysis")
+
+
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="Анализ импульсов: расчёт зарядов и построение гистограммы"
     )
     parser.add_argument(
         "-i", "--input",
         type=Path,
-        default=data_config.processed_folder / "extracted_pulses.txt",
-        help="Путь к входному файлу с импульсами"
+        default=None,
+        help="Путь к входному файлу с импульсами (по умолчанию: processed/extracted_pulses.txt)"
     )
     parser.add_argument(
         "-s", "--selections",
@@ -39,9 +42,9 @@ def main():
     )
     parser.add_argument(
         "--bins",
-        type=int,
+        type=bins_arg,
         default=20,
-        help="Количество бинов для гистограммы (по умолчанию: 20)"
+        help="Количество бинов или правило: fd (Фридман-Диаконис), scott, knuth, auto (по умолчанию: 20)"
     )
     parser.add_argument(
         "--unit-scale",
@@ -55,21 +58,99 @@ def main():
         default="нКл",
         help="Метка единиц заряда (по умолчанию: 'нКл')"
     )
+    parser.add_argument(
+        "--dpi",
+        type=int,
+        default=300,
+        help="Разрешение гистограммы (по умолчанию: 300; для пакетных прогонов хватает 100)"
+    )
+    parser.add_argument(
+        "--format",
+        choices=("png", "svg", "pdf", "jpg"),
+        default=None,
+        help="Формат гистограммы (по умолчанию: по расширению --output)"
+    )
+    parser.add_argument(
+        "--no-kde",
+        action="store_true",
+        help="Не строить ядерную оценку плотности поверх гистограммы"
+    )
+    parser.add_argument(
+        "--bootstrap",
+        type=int,
+        default=1000,
+        metavar="N",
+        help="Ресэмплов для доверительных интервалов среднего, медианы и σ (0 - не считать; по умолчанию: 1000)"
+    )
+    parser.add_argument(
+        "--confidence",
+        type=float,
+        default=0.95,
+        help="Уровень доверия интервалов (по умолчанию: 0.95)"
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Seed бутстрепа; при одном seed интервалы воспроизводимы (по умолчанию: 0)"
+    )
+    parser.add_argument(
+        "--bootstrap-mb",
+        type=float,
+        default=64,
+        help="Память на блок ресэмплов, МБ (по умолчанию: 64)"
+    )
+    parser.add_argument(
+        "-w", "--workers",
+        type=int,
+        default=1,
+        help="Процессов для бутстрепа (по умолчанию: 1)"
+    )
+    parser.add_argument(
+        "--stats-only",
+        action="store_true",
+        help="Только статистика в JSON, без построения гистограммы (matplotlib не загружается)"
+    )
+    add_instrumentation_arguments(parser, "profile_analysis")
+    return parser
+
 
+def main():
+    parser = build_parser()
     args = parser.parse_args()
 
+    configure_logging(args.log_level)
+    with profile_session(args.profile):
+        analyze(parser, args)
+
+
+def analyze(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    # Тяжёлые зависимости загружаем только после разбора аргументов
+    import numpy as np
+    from src.core.session import get_session
+    from src.core.atomic_io import atomic_write_json
+    from src.analysis.charge_calculator import compute_batch_charges
+    from src.analysis.histogram_plotter import compute_charge_histogram
+    from src.data.pulses_repository import PulsesRepository
+    from src.data.pulse_catalog import PulseCatalog, update_catalog_safely
+
+    # Загружаем конфигурацию для правильных путей
+    session = get_session()
+    data_config = session.config
+    if args.input is None:
+        args.input = data_config.processed_folder / "extracted_pulses.txt"
+
     # Автоматически определяем файл селекций, если не указан
     if args.selections is None:
         selections_candidate = data_config.selections_folder / f"{args.input.stem}_selections.json"
         if selections_candidate.exists():
             args.selections = selections_candidate
-            print(f"📁 Используется файл селекций: {args.selections}")
+            log.info("📁 Используется файл селекций: %s", args.selections)
 
     # Устанавливаем выходной путь по умолчанию
     if args.output is None:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        analysis_dir = data_config.outputs_folder / "analysis"
-        analysis_dir.mkdir(parents=True, exist_ok=True)
+        analysis_dir = session.output_dir(data_config.analysis_subfolder)
         args.output = analysis_dir / f"charge_histogram_{timestamp}.png"
 
     # Проверка существования входного файла
@@ -77,69 +158,104 @@ def main():
         parser.error(f"Входной файл не найден: {args.input}")
     if not args.input.is_file():
         parser.error(f"Указанный путь не является файлом: {args.input}")
+    if not 0 < args.confidence < 1:
+        parser.error("--confidence должен быть в интервале (0, 1)")
 
     try:
         # Загружаем группу импульсов
-        group = PulsesRepository.load_group(args.input, selections_path=args.selections)
-        pulses = [item.pulse for item in group.pulses if item.approved]
+        group = PulsesRepository.load_group(args.input, selections_path=args.selections, include_rejected=True)
+        view = group.approved_view()
 
-        if not pulses:
-            print("❌ Нет одобренных импульсов для анализа")
+        if len(view) == 0:
+            log.error("❌ Нет одобренных импульсов для анализа")
             return
 
-        print(f"📊 Анализ {len(pulses)} импульсов из файла: {args.input.name}")
+        log.info("📊 Анализ %d импульсов из файла: %s", len(view), args.input.name)
 
-        # Вычисляем заряды
-        charges = compute_all_charges(pulses)
-        print(f"⚡ Рассчитаны заряды для {len(charges)} импульсов")
+        # Вычисляем заряды (векторно по всему пакету, затем берём одобренные)
+        indices = view.indices
+        charges = compute_batch_charges(group.batch)[indices]
+        log.info("⚡ Рассчитаны заряды для %d импульсов", len(charges))
 
-        # Строим гистограмму
-        plot_charge_histogram(
-            charges,
-            save_path=args.output,
-            bins=args.bins,
-            unit_scale=args.unit_scale,
-            unit_label=args.unit_label
-        )
-        print(f"📈 Гистограмма сохранена: {args.output}")
+        # Сохраняем заряды в каталог, чтобы последующие запросы не перечитывали файл
+        def _store_charges(catalog: PulseCatalog) -> None:
+            catalog.index_pulse_file(args.input)
+            catalog.update_metrics(args.input, indices, charge=charges)
+        update_catalog_safely(_store_charges)
+
+        # Бины и KDE считаются без matplotlib - они нужны и для --stats-only
+        hist = compute_charge_histogram(charges, args.bins, args.unit_scale, kde=not args.no_kde)
+        if isinstance(args.bins, str):
+            log.info("📏 Правило '%s': %d бинов", args.bins, hist.density.size)
+
+        # Строим гистограмму (headless backend, matplotlib только здесь)
+        if not args.stats_only:
+            from src.core.mpl_backend import use_headless_backend
+            use_headless_backend()
+            from src.analysis.histogram_plotter import render_charge_histogram
+
+            render_charge_histogram(hist, args.output, args.unit_label, dpi=args.dpi, fmt=args.format)
+            log.info("📈 Гистограмма сохранена: %s", args.output)
 
         # Сохраняем статистику в JSON
         stats_path = args.output.with_suffix(".json")
+        boot = None
+        if args.bootstrap > 0:
+            from src.analysis.bootstrap import bootstrap_statistics
+
+            boot = bootstrap_statistics(charges, args.bootstrap, args.confidence, args.seed,
+                                        max_mb=args.bootstrap_mb, workers=args.workers)
         stats = {
             "analysis_date": datetime.now().isoformat(),
             "input_file": str(args.input),
             "selections_file": str(args.selections) if args.selections else None,
-            "total_pulses_analyzed": len(pulses),
+            "total_pulses_analyzed": len(view),
             "charge_statistics": {
                 "mean": float(charges.mean()),
                 "std": float(charges.std()),
                 "min": float(charges.min()),
                 "max": float(charges.max()),
                 "median": float(np.median(charges)),
-                "unit": "C"
+                "unit": "C",
+                "confidence_intervals": boot.model_dump() if boot is not None else None
             },
             "histogram_settings": {
-                "bins": args.bins,
+                "bins": int(hist.density.size),
+                "bin_rule": hist.bin_rule,
+                "bin_edges": hist.edges.tolist(),
                 "unit_scale": args.unit_scale,
                 "unit_label": args.unit_label,
                 "output_path": str(args.output)
             }
         }
+        if hist.kde is not None:
+            # Сетка KDE прореживается; значения в единицах unit_label
+            step = max(1, hist.kde.grid.size // _KDE_JSON_POINTS)
+            stats["kde"] = {
+                "bandwidth": hist.kde.bandwidth,
+                "grid": hist.kde.grid[::step].tolist(),
+                "density": hist.kde.density[::step].tolist(),
+                "unit_label": args.unit_label
+            }
 
-        with open(stats_path, "w", encoding="utf-8") as f:
-            json.dump(stats, f, indent=2, ensure_ascii=False)
-        print(f"📊 Статистика сохранена: {stats_path}")
+        atomic_write_json(stats_path, stats)
+        log.info("📊 Статистика сохранена: %s", stats_path)
 
         # Выводим краткую статистику
-        print("\n📋 Краткая статистика:")
-        print(f"   Средний заряд: {charges.mean() * args.unit_scale:.2f} {args.unit_label}")
-        print(f"   Стандартное отклонение: {charges.std() * args.unit_scale:.2f} {args.unit_label}")
-        print(f"   Минимальный заряд: {charges.min() * args.unit_scale:.2f} {args.unit_label}")
-        print(f"   Максимальный заряд: {charges.max() * args.unit_scale:.2f} {args.unit_label}")
-        print(f"   Медиана: {np.median(charges) * args.unit_scale:.2f} {args.unit_label}")
+        unit = args.unit_label
+        log.info("\n📋 Краткая статистика:")
+        log.info("   Средний заряд: %.2f %s", charges.mean() * args.unit_scale, unit)
+        log.info("   Стандартное отклонение: %.2f %s", charges.std() * args.unit_scale, unit)
+        log.info("   Минимальный заряд: %.2f %s", charges.min() * args.unit_scale, unit)
+        log.info("   Максимальный заряд: %.2f %s", charges.max() * args.unit_scale, unit)
+        log.info("   Медиана: %.2f %s", np.median(charges) * args.unit_scale, unit)
+        if boot is not None:
+            log.info("   Доверительные интервалы (%.0f%%, %d ресэмплов):", boot.confidence * 100, boot.n_resamples)
+            for name, ci in boot.intervals.items():
+                log.info("     %s: [%.3f; %.3f] %s", name, ci.low * args.unit_scale, ci.high * args.unit_scale, unit)
 
     except Exception as e:
-        print(f"❌ Ошибка при анализе: {e}")
+        log.error("❌ Ошибка при анализе: %s", e)
         raise
 
 
@@ -0,0 +1,170 @@
+"""
+Векторная оценка аномальности импульсов для предварительной сортировки.
+
+Для каждого импульса считаются заряд, пик, длительность и невязка формы
+относительно медианного шаблона. По каждой характеристике берётся
+робастный z-score (медиана/MAD), итоговая оценка - максимум модулей.
+"""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+from src.models.pulse_batch_models import PulseBatchModel
+from src.analysis.charge_calculator import compute_batch_charges
+from src.core.atomic_io import atomic_write_json
+
+
+FEATURE_NAMES = ("charge", "peak", "duration", "residual")
+# Порог робастного z-score, выше которого импульс считается выбросом
+DEFAULT_THRESHOLD = 3.5
+# Число точек нормированной формы импульса для шаблона
+TEMPLATE_POINTS = 64
+# Максимум импульсов для построения медианного шаблона
+TEMPLATE_SAMPLE = 20000
+# Сколько импульсов обрабатывать за раз при расчёте невязки
+RESIDUAL_CHUNK = 65536
+# Коэффициент перевода MAD в оценку σ для нормального распределения
+MAD_TO_SIGMA = 1.4826
+
+
+def _resampled_shapes(batch: PulseBatchModel, indices: np.ndarray, peaks: np.ndarray) -> np.ndarray:
+    """Формы импульсов на TEMPLATE_POINTS точках, нормированные на пик."""
+    u = np.linspace(0.0, 1.0, TEMPLATE_POINTS)
+    starts = batch.starts[indices]
+    spans = batch.lengths[indices] - 1
+    pos = starts[:, None] + u[None, :] * spans[:, None]
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.minimum(lo + 1, (starts + spans)[:, None])
+    frac = pos - lo
+    shapes = batch.current[lo] * (1.0 - frac) + batch.current[hi] * frac
+    scale = peaks[indices]
+    scale = np.where(scale > 0, scale, 1.0)
+    return shapes / scale[:, None]
+
+
+def compute_pulse_features(batch: PulseBatchModel, seed: int = 0) -> dict[str, np.ndarray]:
+    """Считает характеристики всех импульсов пакета."""
+    n = len(batch)
+    if n == 0:
+        raise ValueError("Пакет импульсов не может быть пустым")
+
+    charge = compute_batch_charges(batch)
+    peak = np.maximum.reduceat(np.abs(batch.current), batch.starts)
+    if batch.uniform_time:
+        duration = batch.time.dt * (batch.lengths - 1)
+    else:
+        duration = batch.time[batch.ends - 1] - batch.time[batch.starts]
+
+    # Медианный шаблон по случайной подвыборке, невязка - по всем импульсам чанками
+    rng = np.random.default_rng(seed)
+    sample = np.arange(n) if n <= TEMPLATE_SAMPLE else np.sort(rng.choice(n, TEMPLATE_SAMPLE, replace=False))
+    template = np.median(_resampled_shapes(batch, sample, peak), axis=0)
+
+    residual = np.empty(n, dtype=np.float64)
+    for k in range(0, n, RESIDUAL_CHUNK):
+        idx = np.arange(k, min(k + RESIDUAL_CHUNK, n))
+        shapes = _resampled_shapes(batch, idx, peak)
+        residual[idx] = np.sqrt(np.mean((shapes - template[None, :]) ** 2, axis=1))
+
+    return {"charge": charge, "peak": peak, "duration": duration, "residual": residual}
+
+
+def robust_z(values: np.ndarray) -> np.ndarray:
+    """Робастный z-score: (x - медиана) / (1.4826 * MAD)."""
+    med = np.median(values)
+    dev = np.abs(values - med)
+    scale = MAD_TO_SIGMA * np.median(dev)
+    if scale == 0:
+        # Больше половины значений совпадают - используем среднее отклонение
+        scale = 1.2533 * np.mean(dev)
+    if scale == 0:
+        return np.zeros_like(values, dtype=np.float64)
+    return (values - med) / scale
+
+
+def score_pulses(batch: PulseBatchModel) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    """Возвращает итоговые оценки аномальности и характеристики импульсов."""
+    features = compute_pulse_features(batch)
+    z = np.vstack([np.abs(robust_z(features[name])) for name in FEATURE_NAMES])
+    return z.max(axis=0), features
+
+
+def flag_outliers(scores: np.ndarray, threshold: float = DEFAULT_THRESHOLD) -> np.ndarray:
+    """Bool-маска выбросов (True - импульс подозрительный)."""
+    return scores > threshold
+
+
+def triage_order(scores: np.ndarray) -> np.ndarray:
+    """Порядок просмотра: сначала самые подозрительные импульсы."""
+    return np.argsort(-scores, kind="stable")
+
+
+def write_proposed_selections(path: Path, file_name: str, scores: np.ndarray,
+                              threshold: float = DEFAULT_THRESHOLD) -> Path:
+    """Сохраняет предлагаемые selections в формате {"pulses": [{"approved": ...}]}."""
+    approved = ~flag_outliers(scores, threshold)
+    data = {
+        "file_name": file_name,
+        "threshold": threshold,
+        "pulses": [{"approved": bool(ok), "score": round(float(sc), 3)} for ok, sc in zip(approved, scores)],
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return atomic_write_json(path, data)
+
+
+def main():
+    """CLI: оценка аномальности импульсов файла и предлагаемые selections."""
+    from src.core.session import get_session
+    from src.validation.pulse_loader import load_pulse_batch
+
+    data_config = get_session().config
+
+    parser = argparse.ArgumentParser(description="Предварительная сортировка импульсов по аномальности")
+    parser.add_argument(
+        "-i", "--input",
+        type=Path,
+        default=data_config.processed_folder / "extracted_pulses.txt",
+        help="Путь к входному файлу с импульсами"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"Порог робастного z-score (по умолчанию: {DEFAULT_THRESHOLD})"
+    )
+    parser.add_argument(
+        "--write-selections",
+        type=Path,
+        nargs="?",
+        const=True,
+        default=None,
+        help="Записать предлагаемые selections (по умолчанию: selections/<stem>_proposed_selections.json)"
+    )
+    args = parser.parse_args()
+
+    if not args.input.exists():
+        parser.error(f"Входной файл не найден: {args.input}")
+
+    batch = load_pulse_batch(args.input)
+    if len(batch) == 0:
+        print("❌ В файле нет импульсов")
+        return
+    scores, _ = score_pulses(batch)
+    flagged = flag_outliers(scores, args.threshold)
+    print(f"🔎 Импульсов: {len(batch)}, подозрительных: {int(flagged.sum())} (порог {args.threshold})")
+    for idx in triage_order(scores)[:10]:
+        print(f"   Импульс {idx + 1}: score={scores[idx]:.2f}")
+
+    if args.write_selections is not None:
+        out = args.write_selections
+        if out is True:
+            out = data_config.selections_folder / f"{args.input.stem}_proposed_selections.json"
+        write_proposed_selections(out, args.input.name, scores, args.threshold)
+        print(f"📝 Предлагаемые selections сохранены: {out}")
+
+
+if __name__ == "__main__":
+    main()
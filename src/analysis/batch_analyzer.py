@@ -1,99 +1,142 @@
 """
 Модуль для пакетного анализа нескольких файлов с импульсами.
 """
+from concurrent.futures import Future, ProcessPoolExecutor
 from pathlib import Path
-import json
+import os
 import numpy as np
-from src.core.config_loader import load_data_config
+from src.core.session import get_session
+from src.core.instrumentation import configure_logging, get_logger
+from src.core.atomic_io import atomic_write_json
 from src.data.pulses_repository import PulsesRepository
-from src.analysis.charge_calculator import compute_all_charges
-from src.analysis.histogram_plotter import plot_charge_histogram, plot_charge_statistics
+from src.data.pulse_catalog import PulseCatalog
+from src.analysis.charge_calculator import compute_batch_charges
+from src.analysis.histogram_plotter import plot_charge_statistics, BULK_DPI
+
+
+log = get_logger("batch_analysis")
 
 
 class BatchAnalyzer:
     """Анализатор нескольких файлов с импульсами."""
 
-    def __init__(self):
-        self.data_config = load_data_config()
+    def __init__(self, dpi: int = BULK_DPI, fmt: str = "png", workers: int | None = None):
+        self.session = get_session()
+        self.dpi = dpi
+        self.fmt = fmt
+        # Отчёты рисуются пулом процессов, пока загружаются следующие файлы
+        self.workers = workers or os.cpu_count() or 1
+        self.data_config = self.session.config
+        self.catalog = PulseCatalog.default(self.data_config)
 
     def analyze_processed_files(self):
         """Анализирует все файлы в папке processed."""
         results = {}
+        pending: list[tuple[Path, int, Future]] = []
+        pool = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+
+        try:
+            self._analyze_files(results, pending, pool)
+            for txt_file, total, future in pending:
+                try:
+                    self._record(results, txt_file, total, future.result())
+                except Exception as e:
+                    log.error("   ❌ Ошибка отрисовки %s: %s", txt_file.name, e)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        # Сохраняем сводный отчет
+        if results:
+            summary_path = self.session.output_dir(self.data_config.analysis_subfolder) / "batch_analysis_summary.json"
+            atomic_write_json(summary_path, results)
+
+            log.info("📊 Сводный отчет сохранен: %s", summary_path)
+
+            # Выводим краткую статистику
+            self._print_summary(results)
+        else:
+            log.error("❌ Не удалось проанализировать ни один файл")
 
-        for txt_file in self.data_config.processed_folder.glob("*.txt"):
-            print(f"🔍 Анализ файла: {txt_file.name}")
+    def _analyze_files(self, results: dict, pending: list, pool: ProcessPoolExecutor | None) -> None:
+        """Считает заряды каждого файла; отчёт рисуется сразу или отдаётся пулу (pending)."""
+        for txt_file in PulsesRepository.discover_pulse_files(self.data_config):
+            log.info("🔍 Анализ файла: %s", txt_file.name)
 
             try:
                 # Пытаемся найти соответствующий файл селекций
                 selections_path = self.data_config.selections_folder / f"{txt_file.stem}_selections.json"
                 selections_path = selections_path if selections_path.exists() else None
 
-                # Загружаем импульсы
-                group = PulsesRepository.load_group(txt_file, selections_path)
-                pulses = [item.pulse for item in group.pulses if item.approved]
+                # Заряды из каталога, если файл не менялся; иначе загружаем и считаем
+                charges = (self.catalog.cached_metric(txt_file, "charge")
+                           if PulsesRepository.is_text_file(txt_file) else None)
+                if charges is None:
+                    charges = self._compute_charges(txt_file, selections_path)
 
-                if not pulses:
-                    print(f"   ⚠️  Нет одобренных импульсов")
+                if charges.size == 0:
+                    log.warning("   ⚠️  Нет одобренных импульсов")
                     continue
 
-                # Вычисляем заряды
-                charges = compute_all_charges(pulses)
-
-                # Сохраняем результаты
-                results[txt_file.name] = {
-                    "file_path": str(txt_file),
-                    "total_pulses": len(pulses),
-                    "charge_statistics": {
-                        "mean": float(np.mean(charges)),
-                        "std": float(np.std(charges)),
-                        "min": float(np.min(charges)),
-                        "max": float(np.max(charges)),
-                    }
-                }
-
                 # Создаем отдельную папку для каждого файла
-                analysis_dir = self.data_config.outputs_folder / "analysis" / txt_file.stem
-                analysis_dir.mkdir(parents=True, exist_ok=True)
-
-                # Строим графики
-                plot_charge_statistics(charges, analysis_dir)
+                analysis_dir = self.session.output_dir(self.data_config.analysis_subfolder / txt_file.stem)
 
-                print(f"   ✅ Проанализировано {len(pulses)} импульсов")
+                # Строим графики; статистика для сводки - из того же прохода
+                if pool is None:
+                    stats = plot_charge_statistics(charges, analysis_dir, dpi=self.dpi, fmt=self.fmt)
+                    self._record(results, txt_file, charges.size, stats)
+                else:
+                    pending.append((txt_file, charges.size, pool.submit(
+                        plot_charge_statistics, charges, analysis_dir, dpi=self.dpi, fmt=self.fmt)))
 
             except Exception as e:
-                print(f"   ❌ Ошибка анализа {txt_file.name}: {e}")
+                log.error("   ❌ Ошибка анализа %s: %s", txt_file.name, e)
                 continue
 
-        # Сохраняем сводный отчет
-        if results:
-            summary_path = self.data_config.outputs_folder / "analysis" / "batch_analysis_summary.json"
-            with open(summary_path, "w", encoding="utf-8") as f:
-                json.dump(results, f, indent=2, ensure_ascii=False)
-
-            print(f"📊 Сводный отчет сохранен: {summary_path}")
-
-            # Выводим краткую статистику
-            self._print_summary(results)
-        else:
-            print("❌ Не удалось проанализировать ни один файл")
+    @staticmethod
+    def _record(results: dict, txt_file: Path, total: int, stats) -> None:
+        """Сохраняет результаты файла для сводки."""
+        results[txt_file.name] = {
+            "file_path": str(txt_file),
+            "total_pulses": int(total),
+            "charge_statistics": stats.summary(),
+        }
+        log.info("   ✅ %s: проанализировано %d импульсов", txt_file.name, total)
+
+    def _compute_charges(self, txt_file: Path, selections_path: Path | None) -> np.ndarray:
+        """Загружает одобренные импульсы файла, считает заряды и кладёт их в каталог."""
+        # Шарды манифеста читаются параллельно, по процессу на шард
+        workers = 1 if PulsesRepository.is_text_file(txt_file) else (os.cpu_count() or 1)
+        group = PulsesRepository.load_group(txt_file, selections_path, include_rejected=True, workers=workers)
+        indices = group.approved_view().indices
+        if indices.size == 0:
+            return np.empty(0)
+        charges = compute_batch_charges(group.batch)[indices]
+        if not PulsesRepository.is_text_file(txt_file):
+            # Каталог индексирует текстовые файлы; у манифеста и виртуального набора нет байтовых смещений
+            return charges
+        # selections_path здесь - selections по умолчанию, их же использует каталог
+        self.catalog.index_pulse_file(txt_file)
+        self.catalog.update_metrics(txt_file, indices, charge=charges)
+        return charges
 
     def _print_summary(self, results):
         """Выводит краткую сводку по анализу."""
-        print("\n" + "=" * 50)
-        print("📈 СВОДКА АНАЛИЗА")
-        print("=" * 50)
+        log.info("\n%s", "=" * 50)
+        log.info("📈 СВОДКА АНАЛИЗА")
+        log.info("=" * 50)
 
         for filename, data in results.items():
             stats = data["charge_statistics"]
-            print(f"📁 {filename}:")
-            print(f"   Импульсов: {data['total_pulses']}")
-            print(f"   Средний заряд: {stats['mean']:.2e} Кл")
-            print(f"   Стандартное отклонение: {stats['std']:.2e} Кл")
-            print()
+            log.info("📁 %s:", filename)
+            log.info("   Импульсов: %d", data["total_pulses"])
+            log.info("   Средний заряд: %.2e Кл", stats["mean"])
+            log.info("   Стандартное отклонение: %.2e Кл\n", stats["std"])
 
 
 def main():
     """Точка входа для пакетного анализа."""
+    configure_logging()
     analyzer = BatchAnalyzer()
     analyzer.analyze_processed_files()
 
@@ -0,0 +1,133 @@
+"""
+Бутстреп-доверительные интервалы для статистик зарядов.
+
+Ресэмплы строятся блоками: матрица индексов (строк x N) по
+отсортированной выборке сворачивается одним np.bincount в матрицу
+кратностей. Среднее и σ - скалярные произведения кратностей на
+центрированные значения, медиана - searchsorted по накопленным
+кратностям, так что ни копий значений, ни сортировки ресэмпла (np.median
+втрое дороже генерации индексов) не нужно. Размер блока ограничен max_mb.
+
+У каждого ресэмпла свой генератор из SeedSequence(seed).spawn(), поэтому
+при одном seed ресэмплы не зависят ни от размера блока, ни от числа
+процессов (результаты совпадают с точностью до округления). Интервалы -
+процентильные.
+"""
+from __future__ import annotations
+
+import math
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from src.core.instrumentation import count, span
+
+
+STATISTICS = ("mean", "median", "std")
+DEFAULT_RESAMPLES = 1000
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_MAX_MB = 64
+# Байт на элемент блока: индексы, кратности и их накопленная сумма (int64)
+_BYTES_PER_ELEMENT = 24
+# Задач на процесс: мелкие задачи выравнивают нагрузку
+_TASKS_PER_WORKER = 4
+
+
+class ConfidenceIntervalModel(BaseModel):
+    estimate: float = Field(description="Статистика по исходной выборке")
+    low: float
+    high: float
+    standard_error: float = Field(description="σ бутстреп-распределения")
+
+
+class BootstrapModel(BaseModel):
+    n_resamples: int
+    confidence: float
+    seed: int
+    method: str = "percentile"
+    intervals: dict[str, ConfidenceIntervalModel]
+
+
+def _statistics(values: np.ndarray) -> np.ndarray:
+    """Среднее, медиана и σ выборки; форма (3,)."""
+    return np.array([values.mean(), np.median(values), values.std()])
+
+
+def _rows_per_block(n: int, max_mb: float) -> int:
+    return max(1, int(max_mb * 2**20) // (n * _BYTES_PER_ELEMENT))
+
+
+def _resample_block(ordered: np.ndarray, seeds: list[np.random.SeedSequence], max_mb: float) -> np.ndarray:
+    """Статистики ресэмплов отсортированной выборки ordered; форма (len(seeds), 3)."""
+    n = ordered.size
+    shift = ordered.mean()
+    centered = ordered - shift
+    squared = centered * centered
+    # Позиции медианы в отсортированном ресэмпле (при чётном N - две средние)
+    middle = np.array([(n - 1) // 2, n // 2])
+    rows = _rows_per_block(n, max_mb)
+    out = np.empty((len(seeds), len(STATISTICS)))
+    index = np.empty((min(rows, len(seeds)), n), dtype=np.int64)
+    for start in range(0, len(seeds), rows):
+        block = seeds[start:start + rows]
+        m = len(block)
+        offsets = np.arange(m)[:, None] * n
+        for row, seq in enumerate(block):
+            index[row] = np.random.default_rng(seq).integers(0, n, size=n)
+        index[:m] += offsets
+        counts = np.bincount(index[:m].ravel(), minlength=m * n).reshape(m, n)
+        mean = counts @ centered / n
+        out[start:start + m, 0] = shift + mean
+        out[start:start + m, 2] = np.sqrt(np.maximum(counts @ squared / n - mean * mean, 0.0))
+        # Накопленные кратности (на месте) монотонны в строке; сдвиг строк на n даёт один searchsorted
+        cumulative = np.cumsum(counts, axis=1, out=counts)
+        cumulative += offsets
+        pos = np.searchsorted(cumulative.ravel(), (middle + offsets).ravel(), side="right").reshape(m, 2) - offsets
+        out[start:start + m, 1] = ordered[pos].mean(axis=1)
+    return out
+
+
+def bootstrap_statistics(
+        x: np.ndarray,
+        n_resamples: int = DEFAULT_RESAMPLES,
+        confidence: float = DEFAULT_CONFIDENCE,
+        seed: int = 0,
+        max_mb: float = DEFAULT_MAX_MB,
+        workers: int = 1,
+) -> BootstrapModel:
+    """Процентильные интервалы для среднего, медианы и σ.
+
+    max_mb - бюджет памяти на блок (на каждый процесс при workers > 1).
+    """
+    x = np.sort(np.asarray(x, dtype=np.float64).ravel())
+    if x.size == 0:
+        raise ValueError("Массив для бутстрепа не может быть пустым")
+    if n_resamples < 1:
+        raise ValueError("Число ресэмплов должно быть положительным")
+    if not 0 < confidence < 1:
+        raise ValueError("Уровень доверия должен быть в интервале (0, 1)")
+
+    seeds = np.random.SeedSequence(seed).spawn(n_resamples)
+    count("bootstrap.resamples", n_resamples)
+    with span("bootstrap"):
+        if workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            tasks = min(n_resamples, workers * _TASKS_PER_WORKER)
+            step = math.ceil(n_resamples / tasks)
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                parts = pool.map(_resample_block, [x] * tasks,
+                                 [seeds[i:i + step] for i in range(0, n_resamples, step)], [max_mb] * tasks)
+                replicates = np.concatenate(list(parts))
+        else:
+            replicates = _resample_block(x, seeds, max_mb)
+
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(replicates, [alpha, 1 - alpha], axis=0)
+    estimates = _statistics(x)
+    errors = replicates.std(axis=0, ddof=1) if n_resamples > 1 else np.zeros(len(STATISTICS))
+    intervals = {
+        name: ConfidenceIntervalModel(estimate=float(estimates[k]), low=float(low[k]), high=float(high[k]),
+                                      standard_error=float(errors[k]))
+        for k, name in enumerate(STATISTICS)
+    }
+    return BootstrapModel(n_resamples=n_resamples, confidence=confidence, seed=seed, intervals=intervals)
@@ -1,10 +1,16 @@
 
 import numpy as np
-from src.models.pulse_models import PulseModel
+from src.models.pulse_models import PulseModel, UniformTimeAxis
+from src.models.pulse_batch_models import PulseBatchModel
+from src.core.instrumentation import span
 
 
 def compute_charge(pulse: PulseModel) -> float:
     """Вычисляет заряд одного импульса (Кулон)."""
+    if isinstance(pulse.time, UniformTimeAxis):
+        # Равномерный шаг: трапеции без массива времени, сумма в float64
+        current = pulse.current
+        return float(pulse.time.dt * (current.sum(dtype=np.float64) - 0.5 * (float(current[0]) + float(current[-1]))))
     q = np.trapezoid(pulse.current, pulse.time)
     return float(q)
 
@@ -12,5 +18,22 @@ def compute_all_charges(pulses: list[PulseModel]) -> np.ndarray:
     """Возвращает массив зарядов для всех импульсов."""
     if not pulses:
         raise ValueError("Список импульсов не может быть пустым")
-    charges = np.array([compute_charge(p) for p in pulses])
-    return charges
\ No newline at end of file
+    with span("charges.per_pulse"):
+        charges = np.array([compute_charge(p) for p in pulses])
+    return charges
+
+def compute_batch_charges(batch: PulseBatchModel) -> np.ndarray:
+    """Заряды всех импульсов пакета методом трапеций без цикла по импульсам."""
+    if len(batch) == 0:
+        raise ValueError("Список импульсов не может быть пустым")
+    with span("charges.batch"):
+        if batch.uniform_time:
+            # Равномерные оси: сумма тока по импульсу минус половины крайних отсчётов, умноженная на dt
+            current = batch.current
+            sums = np.add.reduceat(current, batch.starts, dtype=np.float64)
+            edges = current[batch.starts].astype(np.float64) + current[batch.ends - 1]
+            return batch.time.dt * (sums - 0.5 * edges)
+        seg = np.diff(batch.time) * (batch.current[1:] + batch.current[:-1]) * 0.5
+        cs = np.concatenate(([0.0], np.cumsum(seg)))
+        # Отрезок j соединяет отсчёты j и j+1; для импульса [s, e) это j = s..e-2
+        return cs[batch.ends - 1] - cs[batch.starts]
\ No newline at end of file
@@ -0,0 +1,143 @@
+"""
+Оценка плотности распределения зарядов для больших наборов.
+
+Правила выбора числа бинов (Фридмана-Диакониса, Скотта, Кнута) и ядерная
+оценка плотности (KDE) на сетке через FFT. Наивная KDE стоит O(N*M);
+здесь данные линейно раскладываются на M узлов сетки (O(N), np.bincount),
+а свёртка с гауссовым ядром выполняется через rfft (O(M log M)), так что
+10^6 импульсов обрабатываются за доли секунды.
+"""
+from __future__ import annotations
+
+import argparse
+import math
+from typing import Annotated, Optional
+
+import numpy as np
+from pydantic import BaseModel, ConfigDict, Field
+
+
+BIN_RULES = ("fd", "scott", "knuth", "auto")
+MAX_BINS = 500
+KDE_GRID_SIZE = 1024
+# Сетка KDE выходит за данные на столько ширин ядра
+KDE_CUT = 3.0
+# Кандидатов числа бинов для правила Кнута (геометрическая сетка до MAX_BINS)
+KNUTH_CANDIDATES = 64
+
+
+def bins_arg(value: str) -> int | str:
+    """Тип argparse для --bins: число бинов или имя правила (fd, scott, knuth, auto)."""
+    if value in BIN_RULES:
+        return value
+    try:
+        bins = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"ожидается число или одно из: {', '.join(BIN_RULES)}")
+    if bins < 1:
+        raise argparse.ArgumentTypeError("число бинов должно быть положительным")
+    return bins
+
+
+class KdeModel(BaseModel):
+    """Оценка плотности на равномерной сетке (интеграл density по grid равен 1)."""
+    grid: Annotated[np.ndarray, Field(description="Узлы сетки")]
+    density: Annotated[np.ndarray, Field(description="Плотность в узлах")]
+    bandwidth: float
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+
+def _bins_for_width(x: np.ndarray, width: float, max_bins: int) -> int:
+    data_range = float(x.max() - x.min())
+    if width <= 0 or data_range <= 0:
+        return 1
+    return int(min(max(math.ceil(data_range / width), 1), max_bins))
+
+
+def freedman_diaconis_bins(x: np.ndarray, max_bins: int = MAX_BINS) -> int:
+    """Ширина бина 2*IQR*N^(-1/3); устойчиво к выбросам."""
+    q1, q3 = np.percentile(x, [25, 75])
+    return _bins_for_width(x, 2.0 * (q3 - q1) * x.size ** (-1 / 3), max_bins)
+
+
+def scott_bins(x: np.ndarray, max_bins: int = MAX_BINS) -> int:
+    """Ширина бина 3.49*σ*N^(-1/3); оптимальна для нормального распределения."""
+    return _bins_for_width(x, 3.49 * float(np.std(x)) * x.size ** (-1 / 3), max_bins)
+
+
+def knuth_bins(x: np.ndarray, max_bins: int = MAX_BINS) -> int:
+    """Число бинов с максимальной апостериорной вероятностью (Knuth, 2006).
+
+    log P(M) = N log M + lnΓ(M/2) - M lnΓ(1/2) - lnΓ(N + M/2) + Σ lnΓ(n_k + 1/2).
+    Данные сортируются один раз, счёт бинов для кандидата M - searchsorted
+    по его границам; lnΓ(n + 1/2) для целых n берётся из накопленной таблицы.
+    """
+    n = x.size
+    lo, hi = float(x.min()), float(x.max())
+    if hi <= lo:
+        return 1
+    ordered = np.sort(x)
+    # lnΓ(k + 1/2) = lnΓ(1/2) + Σ_{j<k} ln(j + 1/2)
+    lgamma_half = math.lgamma(0.5)
+    table = lgamma_half + np.concatenate(([0.0], np.cumsum(np.log(np.arange(n) + 0.5))))
+
+    candidates = np.unique(np.geomspace(1, max_bins, KNUTH_CANDIDATES).astype(np.int64))
+    best_m, best_logp = 1, -np.inf
+    for m in candidates.tolist():
+        # Бины [e_k, e_k+1), последний включает правую границу - как в np.histogram
+        inner = np.searchsorted(ordered, np.linspace(lo, hi, m + 1)[1:-1], side="left")
+        counts = np.diff(np.concatenate(([0], inner, [n])))
+        logp = (n * math.log(m) + math.lgamma(m / 2) - m * lgamma_half - math.lgamma(n + m / 2)
+                + float(table[counts].sum()))
+        if logp > best_logp:
+            best_m, best_logp = m, logp
+    return int(best_m)
+
+
+def auto_bins(x: np.ndarray, rule: str, max_bins: int = MAX_BINS) -> int:
+    """Число бинов по правилу rule; auto - Фридман-Диаконис, а при нулевом IQR - Скотт."""
+    x = np.asarray(x, dtype=np.float64)
+    if rule == "fd":
+        return freedman_diaconis_bins(x, max_bins)
+    if rule == "scott":
+        return scott_bins(x, max_bins)
+    if rule == "knuth":
+        return knuth_bins(x, max_bins)
+    if rule == "auto":
+        q1, q3 = np.percentile(x, [25, 75])
+        return freedman_diaconis_bins(x, max_bins) if q3 > q1 else scott_bins(x, max_bins)
+    raise ValueError(f"Неизвестное правило бинов '{rule}', допустимо: {BIN_RULES}")
+
+
+def silverman_bandwidth(x: np.ndarray) -> float:
+    """Правило Сильвермана: 0.9 * min(σ, IQR/1.34) * N^(-1/5)."""
+    q1, q3 = np.percentile(x, [25, 75])
+    spread = min(float(np.std(x)), (q3 - q1) / 1.34) or float(np.std(x)) or 1.0
+    return 0.9 * spread * x.size ** (-1 / 5)
+
+
+def binned_kde(x: np.ndarray, grid_size: int = KDE_GRID_SIZE, bandwidth: Optional[float] = None) -> KdeModel:
+    """Гауссова KDE на сетке из grid_size узлов: линейное биннинг-разложение и свёртка через FFT."""
+    x = np.asarray(x, dtype=np.float64)
+    if x.size == 0:
+        raise ValueError("Массив для оценки плотности не может быть пустым")
+    h = float(bandwidth) if bandwidth else silverman_bandwidth(x)
+    lo, hi = float(x.min()) - KDE_CUT * h, float(x.max()) + KDE_CUT * h
+    grid = np.linspace(lo, hi, grid_size)
+    step = grid[1] - grid[0]
+
+    # Линейное разложение: каждая точка делит вес между двумя соседними узлами
+    pos = (x - lo) / step
+    left = np.clip(np.floor(pos).astype(np.int64), 0, grid_size - 2)
+    frac = pos - left
+    weights = (np.bincount(left, weights=1.0 - frac, minlength=grid_size)
+               + np.bincount(left + 1, weights=frac, minlength=grid_size))
+
+    # Ядро на сетке с тем же шагом; дополнение нулями исключает циклическое наложение
+    half = min(int(math.ceil(KDE_CUT * h / step)), grid_size - 1)
+    offsets = np.arange(-half, half + 1) * step
+    kernel = np.exp(-0.5 * (offsets / h) ** 2) / (h * math.sqrt(2 * math.pi))
+    size = 1 << int(math.ceil(math.log2(grid_size + kernel.size - 1)))
+    conv = np.fft.irfft(np.fft.rfft(weights, size) * np.fft.rfft(kernel, size), size)
+    density = np.maximum(conv[half:half + grid_size], 0.0) / x.size
+    return KdeModel(grid=grid, density=density, bandwidth=h)
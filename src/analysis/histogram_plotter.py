@@ -1,6 +1,30 @@
-import matplotlib.pyplot as plt
-import numpy as np
+"""
+Гистограмма распределения зарядов.
+
+Расчёт (compute_charge_histogram, один вызов np.histogram) отделён от
+отрисовки (render_charge_histogram). Отрисовка использует заранее
+оформленный шаблон фигуры - оси, подписи, столбцы и рамку статистики
+создаются один раз на сочетание (bins, unit_label), а для каждого файла
+обновляются только высоты и положения столбцов, подписи делений и текст.
+Раскладка (tight_layout, положения подписи оси X и заголовков) считается при
+создании шаблона, bbox_inches="tight" не используется, поэтому каждое
+сохранение рисует фигуру один раз и не измеряет подписи делений заново.
+Оставшееся время - отрисовка текста и растеризация, растущая с dpi: пакетные
+прогоны используют BULK_DPI, а BatchAnalyzer рисует отчёты пулом процессов
+(см. benchmarks/histogram_bench.py).
+
+Число бинов задаётся числом или правилом (fd, scott, knuth, auto - см.
+density.py); поверх столбцов рисуется KDE, посчитанная через FFT.
+"""
+import math
 from pathlib import Path
+from typing import Annotated, Optional
+
+import numpy as np
+from pydantic import BaseModel, ConfigDict, Field
+
+from src.core.atomic_io import atomic_write
+from src.analysis.density import KdeModel, auto_bins, binned_kde
 
 
 # Константы для оформления гистограммы (старый дизайн)
@@ -8,17 +32,47 @@ X_AXIS_MARGIN_RATIO = 0.05  # Запас по оси X (5% с каждой ст
 HISTOGRAM_RWIDTH = 0.9  # Ширина столбцов гистограммы относительно бина
 STATS_TEXT_X_POS = 0.98  # Позиция текста статистики по X (относительно)
 STATS_TEXT_Y_POS = 0.95  # Позиция текста статистики по Y (относительно)
+Y_AXIS_MARGIN_RATIO = 0.05  # Запас над самым высоким столбцом (как у autoscale)
+FIGURE_SIZE = (8, 5)
+DEFAULT_DPI = 300
+# Разрешение для пакетных прогонов по сотням файлов: время сохранения растёт с числом пикселей
+BULK_DPI = 100
+# Смещение центра столбца от левой границы бина (в долях ширины бина), как у ax.hist
+_ALIGN_OFFSET = {"left": 0.0, "mid": 0.5, "right": 1.0}
+# Образец подписи деления для расчёта полей шаблона
+_TICK_LABEL_SAMPLE = "-0000.00"
+# Подписи делений - основная часть времени сохранения; при большем числе бинов
+# подписывается каждый k-й центр
+MAX_TICK_LABELS = 10
+# Сколько шаблонов (по числу бинов) держать в памяти при адаптивном биннинге
+TEMPLATE_CACHE_SIZE = 8
 
+# (bins, unit_label) -> шаблон фигуры
+_templates: dict[tuple[int, str], dict] = {}
 
-def plot_charge_histogram(
-        charges: np.ndarray,
-        save_path: Path | None = None,
-        bins: int = 20,
-        unit_scale: float = 1e9,  # переводим в нКл
-        unit_label: str = "нКл",
-        align: str = "mid"
-) -> None:
-    """Построение гистограммы распределения зарядов с оформлением по ГОСТ."""
+
+class ChargeHistogramModel(BaseModel):
+    """Рассчитанная гистограмма зарядов в отображаемых единицах."""
+    density: Annotated[np.ndarray, Field(description="Относительные частоты (плотность) по бинам")]
+    edges: Annotated[np.ndarray, Field(description="Границы бинов, длина = bins + 1")]
+    mean: float
+    std: float
+    bin_rule: str = Field(default="fixed", description="Как выбрано число бинов: fixed или правило")
+    kde: Optional[KdeModel] = Field(default=None, description="Оценка плотности в тех же единицах")
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @property
+    def centers(self) -> np.ndarray:
+        return (self.edges[:-1] + self.edges[1:]) / 2
+
+
+def compute_charge_histogram(charges: np.ndarray, bins: int | str = 20, unit_scale: float = 1e9,
+                             kde: bool = True) -> ChargeHistogramModel:
+    """Гистограмма зарядов с запасом X_AXIS_MARGIN_RATIO по краям диапазона.
+
+    bins - число бинов или правило его выбора (fd, scott, knuth, auto);
+    kde=True добавляет KDE на сетке (O(N + M log M)).
+    """
     if charges.size == 0:
         raise ValueError("Массив зарядов не может быть пустым")
 
@@ -27,62 +81,403 @@ def plot_charge_histogram(
 
     # Определяем границы по оси X с учетом отрицательных значений
     # Добавляем небольшой запас по обе стороны
-    data_range = charges_scaled.max() - charges_scaled.min()
-    x_min = charges_scaled.min() - X_AXIS_MARGIN_RATIO * data_range
-    x_max = charges_scaled.max() + X_AXIS_MARGIN_RATIO * data_range
+    q_min, q_max = charges_scaled.min(), charges_scaled.max()
+    data_range = q_max - q_min
+    x_min = q_min - X_AXIS_MARGIN_RATIO * data_range
+    x_max = q_max + X_AXIS_MARGIN_RATIO * data_range
 
-    # Создаем фигуру и оси
-    fig, ax = plt.subplots(figsize=(8, 5), dpi=300)
+    # Правило задаёт ширину бина по данным; запас по краям добавляет бины той же ширины
+    bin_rule = "fixed"
+    if isinstance(bins, str):
+        bin_rule = bins
+        bins = max(1, round(auto_bins(charges_scaled, bins) * (1 + 2 * X_AXIS_MARGIN_RATIO)))
 
     # Создаем бины вручную для точного контроля
     bin_edges = np.linspace(x_min, x_max, bins + 1)
+    density, edges = np.histogram(charges_scaled, bins=bin_edges, density=True)
+    return ChargeHistogramModel(density=density, edges=edges,
+                                mean=float(np.mean(charges_scaled)), std=float(np.std(charges_scaled)),
+                                bin_rule=bin_rule, kde=binned_kde(charges_scaled) if kde else None)
 
-    counts, edges, patches = ax.hist(
-        charges_scaled,
-        bins=bin_edges,  # используем специально созданные бины
-        density=True,  # ВКЛЮЧАЕМ относительные частоты!
-        color="white",  # заливка белая (по ГОСТ – нейтральные цвета)
-        edgecolor="black",
-        linewidth=0.7,
-        align=align,
-        rwidth=HISTOGRAM_RWIDTH
-    )
+
+def _style_histogram_axes(ax, bins: int, unit_label: str) -> dict:
+    """Оформляет оси гистограммы по ГОСТ: сетка, bins белых столбцов и рамка статистики."""
+    bars = ax.bar(np.zeros(bins), np.zeros(bins), width=1.0, align="center",
+                  color="white",  # заливка белая (по ГОСТ – нейтральные цвета)
+                  edgecolor="black", linewidth=0.7)
+    (kde_line,) = ax.plot([], [], color="black", linewidth=1.0)
 
     # Оформление осей
-    ax.set_xlim(left=x_min, right=x_max)
     ax.set_xlabel(f"Заряд ({unit_label})", fontsize=10)
     ax.set_ylabel("Частота", fontsize=10)
-
-    # Устанавливаем деления по центрам бинов
-    bin_centers = (bin_edges[:-1] + bin_edges[1:]) / 2
-    ax.set_xticks(bin_centers)
-
-    # Форматируем подписи делений
-    ax.set_xticklabels([f"{x:.2f}" for x in bin_centers], rotation=45)
-
     ax.grid(True, linestyle="--", linewidth=0.4, color="grey", alpha=0.6)
     ax.tick_params(labelsize=9)
 
-    # Название графика
-    ax.set_title("Распределение зарядов импульсов", fontsize=12, pad=10)
+    # Название графика; явный y отключает пересчёт его положения при каждой отрисовке
+    ax.set_title("Распределение зарядов импульсов", fontsize=12, pad=10, y=1.0)
 
     # Статистика
-    mean_q = np.mean(charges_scaled)
-    std_q = np.std(charges_scaled)
-    stats_text = f"Среднее = {mean_q:.2f} {unit_label}\nσ = {std_q:.2f} {unit_label}"
-    ax.text(
-        STATS_TEXT_X_POS, STATS_TEXT_Y_POS, stats_text,
+    text = ax.text(
+        STATS_TEXT_X_POS, STATS_TEXT_Y_POS, "",
         transform=ax.transAxes,
         ha="right", va="top",
         fontsize=9, color="black",
         bbox=dict(boxstyle="round,pad=0.2", fc="white", ec="black", lw=0.5)
     )
 
-    fig.tight_layout()
+    # Поля считаются один раз по самой длинной ожидаемой подписи делений
+    labels = min(bins, MAX_TICK_LABELS)
+    ax.set_xticks(np.arange(labels))
+    ax.set_xticklabels([_TICK_LABEL_SAMPLE] * labels, rotation=45)
+    return {"ax": ax, "bars": bars.patches, "kde_line": kde_line, "text": text}
 
-    if save_path:
-        save_path.parent.mkdir(parents=True, exist_ok=True)
-        fig.savefig(save_path, dpi=300, bbox_inches="tight")
-        plt.close(fig)
+
+def _freeze_layout(fig) -> None:
+    """Раскладывает фигуру один раз: поля tight_layout и положения подписей оси X.
+
+    Figure.tight_layout оставляет фигуре движок компоновки, и savefig из-за него
+    рисует фигуру дважды. Подпись оси X с автоматическим положением при каждой
+    отрисовке заново измеряет все подписи делений; высота подписей задана
+    образцом _TICK_LABEL_SAMPLE, поэтому её положение фиксируется. Подписи оси Y
+    меняют ширину от файла к файлу и остаются автоматическими.
+    """
+    from matplotlib.layout_engine import TightLayoutEngine
+
+    TightLayoutEngine().execute(fig)
+    fig.canvas.draw()
+    for ax in fig.axes:
+        label = ax.xaxis.label
+        ax.xaxis.set_label_coords(
+            *ax.transAxes.inverted().transform(label.get_transform().transform(label.get_position())))
+
+
+def _build_template(fig, bins: int, unit_label: str) -> dict:
+    template = _style_histogram_axes(fig.add_subplot(111), bins, unit_label)
+    _freeze_layout(fig)
+    return {"fig": fig, **template}
+
+
+def _agg_figure(figsize):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def _template(bins: int, unit_label: str) -> dict:
+    key = (bins, unit_label)
+    template = _templates.get(key)
+    if template is None:
+        _evict(_templates)
+        template = _templates[key] = _build_template(_agg_figure(FIGURE_SIZE), bins, unit_label)
+    return template
+
+
+def _evict(cache: dict) -> None:
+    """Удаляет самый старый шаблон, если кэш заполнен (адаптивные правила дают разное число бинов)."""
+    if len(cache) >= TEMPLATE_CACHE_SIZE:
+        del cache[next(iter(cache))]
+
+
+def _update(template: dict, hist: ChargeHistogramModel, unit_label: str, align: str) -> None:
+    """Переносит рассчитанную гистограмму в шаблон: столбцы, пределы, деления и текст."""
+    ax = template["ax"]
+    widths = np.diff(hist.edges)
+    centers = hist.edges[:-1] + _ALIGN_OFFSET[align] * widths
+    bar_widths = HISTOGRAM_RWIDTH * widths
+    for rect, x, w, h in zip(template["bars"], (centers - bar_widths / 2).tolist(),
+                             bar_widths.tolist(), hist.density.tolist()):
+        rect.set_x(x)
+        rect.set_width(w)
+        rect.set_height(h)
+
+    top = float(hist.density.max()) if hist.density.size else 0.0
+    if hist.kde is not None:
+        template["kde_line"].set_data(hist.kde.grid, hist.kde.density)
+        top = max(top, float(hist.kde.density.max()))
     else:
-        plt.show()
\ No newline at end of file
+        template["kde_line"].set_data([], [])
+    ax.set_xlim(left=hist.edges[0], right=hist.edges[-1])
+    ax.set_ylim(bottom=0.0, top=top * (1 + Y_AXIS_MARGIN_RATIO) if top > 0 else 1.0)
+
+    # Устанавливаем деления по центрам бинов (при многих бинах - каждого k-го)
+    bin_centers = hist.centers[::math.ceil(hist.centers.size / MAX_TICK_LABELS)]
+    ax.set_xticks(bin_centers)
+
+    # Форматируем подписи делений
+    ax.set_xticklabels([f"{x:.2f}" for x in bin_centers], rotation=45)
+
+    template["text"].set_text(f"Среднее = {hist.mean:.2f} {unit_label}\nσ = {hist.std:.2f} {unit_label}")
+
+
+def render_charge_histogram(
+        hist: ChargeHistogramModel,
+        save_path: Path,
+        unit_label: str = "нКл",
+        align: str = "mid",
+        dpi: int = DEFAULT_DPI,
+        fmt: str | None = None,
+) -> Path:
+    """Сохраняет гистограмму на переиспользуемом шаблоне; fmt по умолчанию - по расширению save_path."""
+    template = _template(hist.density.size, unit_label)
+    _update(template, hist, unit_label, align)
+    fmt = fmt or save_path.suffix.lstrip(".") or "png"
+    save_path.parent.mkdir(parents=True, exist_ok=True)
+    with atomic_write(save_path, binary=True) as f:
+        template["fig"].savefig(f, dpi=dpi, format=fmt)
+    return save_path
+
+
+def plot_charge_histogram(
+        charges: np.ndarray,
+        save_path: Path | None = None,
+        bins: int | str = 20,
+        unit_scale: float = 1e9,  # переводим в нКл
+        unit_label: str = "нКл",
+        align: str = "mid",
+        dpi: int = DEFAULT_DPI,
+        fmt: str | None = None,
+) -> ChargeHistogramModel:
+    """Построение гистограммы распределения зарядов с оформлением по ГОСТ.
+
+    Без save_path гистограмма показывается в окне pyplot.
+    """
+    hist = compute_charge_histogram(charges, bins, unit_scale)
+    if save_path:
+        render_charge_histogram(hist, save_path, unit_label, align, dpi, fmt)
+        return hist
+
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure(figsize=FIGURE_SIZE, dpi=dpi)
+    _update(_build_template(fig, hist.density.size, unit_label), hist, unit_label, align)
+    plt.show()
+    return hist
+
+
+# --- Сводный отчёт: гистограмма, ECDF, тренд по номеру импульса и box-диаграмма ---
+
+STATISTICS_FIGURE_SIZE = (12, 8)
+STATISTICS_DPI = 150
+STATISTICS_FILE_STEM = "charge_statistics"
+# Максимум точек на линию ECDF/тренда и выбросов на box-диаграмме
+MAX_PLOT_POINTS = 2000
+# Окно скользящего среднего тренда - доля от числа импульсов
+TREND_WINDOW_RATIO = 0.02
+BOX_WHISKER_IQR = 1.5
+
+# (bins, unit_label) -> шаблон сводного отчёта
+_statistics_templates: dict[tuple[int, str], dict] = {}
+
+
+class ChargeStatisticsModel(BaseModel):
+    """Всё, что нужно панелям отчёта, в отображаемых единицах; считается за один проход."""
+    count: int
+    unit_scale: float
+    min: float
+    max: float
+    median: float
+    q1: float
+    q3: float
+    whisker_low: float
+    whisker_high: float
+    outlier_count: int
+    histogram: ChargeHistogramModel
+    ecdf_x: Annotated[np.ndarray, Field(description="Заряды для ECDF (прорежены до MAX_PLOT_POINTS)")]
+    ecdf_y: Annotated[np.ndarray, Field(description="Доля импульсов с зарядом не больше ecdf_x")]
+    trend_index: Annotated[np.ndarray, Field(description="Номера импульсов для панели тренда")]
+    trend_values: Annotated[np.ndarray, Field(description="Заряды импульсов trend_index")]
+    trend_mean: Annotated[np.ndarray, Field(description="Скользящее среднее в точках trend_index")]
+    outliers: Annotated[np.ndarray, Field(description="Выбросы за усами (не больше MAX_PLOT_POINTS)")]
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    def summary(self) -> dict:
+        """Статистика в кулонах для JSON-сводок."""
+        scale = self.unit_scale
+        kde = self.histogram.kde
+        return {
+            "bins": int(self.histogram.density.size),
+            "bin_rule": self.histogram.bin_rule,
+            "kde_bandwidth": kde.bandwidth / scale if kde is not None else None,
+            "mean": self.histogram.mean / scale,
+            "std": self.histogram.std / scale,
+            "min": self.min / scale,
+            "max": self.max / scale,
+            "median": self.median / scale,
+            "q1": self.q1 / scale,
+            "q3": self.q3 / scale,
+            "outliers": self.outlier_count,
+        }
+
+
+def _thin(n: int, max_points: int) -> np.ndarray:
+    """Не больше max_points равномерно взятых индексов из n, включая первый и последний."""
+    if n <= max_points:
+        return np.arange(n)
+    return np.unique(np.linspace(0, n - 1, max_points).astype(np.int64))
+
+
+def compute_charge_statistics(charges: np.ndarray, bins: int | str = 20, unit_scale: float = 1e9,
+                              max_points: int = MAX_PLOT_POINTS) -> ChargeStatisticsModel:
+    """Один векторный проход: сортировка даёт квантили, усы, выбросы и ECDF, cumsum - тренд."""
+    if charges.size == 0:
+        raise ValueError("Массив зарядов не может быть пустым")
+    histogram = compute_charge_histogram(charges, bins, unit_scale)
+    scaled = np.asarray(charges, dtype=np.float64) * unit_scale
+    n = scaled.size
+    ordered = np.sort(scaled)
+
+    q1, median, q3 = np.quantile(ordered, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    lo = int(np.searchsorted(ordered, q1 - BOX_WHISKER_IQR * iqr, side="left"))
+    hi = int(np.searchsorted(ordered, q3 + BOX_WHISKER_IQR * iqr, side="right"))
+    outliers = np.concatenate((ordered[:lo], ordered[hi:]))
+
+    ecdf_idx = _thin(n, max_points)
+
+    # Скользящее среднее через кумулятивную сумму (окно обрезается у начала ряда)
+    window = max(1, int(n * TREND_WINDOW_RATIO))
+    csum = np.concatenate(([0.0], np.cumsum(scaled)))
+    trend_idx = _thin(n, max_points)
+    first = np.maximum(trend_idx + 1 - window, 0)
+    trend_mean = (csum[trend_idx + 1] - csum[first]) / (trend_idx + 1 - first)
+
+    return ChargeStatisticsModel(
+        count=n,
+        unit_scale=unit_scale,
+        min=float(ordered[0]),
+        max=float(ordered[-1]),
+        median=float(median),
+        q1=float(q1),
+        q3=float(q3),
+        whisker_low=float(ordered[lo]) if lo < n else float(q1),
+        whisker_high=float(ordered[hi - 1]) if hi > 0 else float(q3),
+        outlier_count=int(outliers.size),
+        histogram=histogram,
+        ecdf_x=ordered[ecdf_idx],
+        ecdf_y=(ecdf_idx + 1) / n,
+        trend_index=trend_idx,
+        trend_values=scaled[trend_idx],
+        trend_mean=trend_mean,
+        outliers=outliers[_thin(outliers.size, max_points)],
+    )
+
+
+def _build_statistics_template(fig, bins: int, unit_label: str) -> dict:
+    """Фигура 2x2 с панелями, артисты которых потом только обновляются."""
+    from matplotlib.patches import Rectangle
+
+    axes = fig.subplots(2, 2)
+    hist = _style_histogram_axes(axes[0, 0], bins, unit_label)
+    grid = dict(linestyle="--", linewidth=0.4, color="grey", alpha=0.6)
+
+    ax_ecdf = axes[0, 1]
+    (ecdf_line,) = ax_ecdf.step([], [], where="post", color="black", linewidth=0.9)
+    ax_ecdf.set_title("Эмпирическая функция распределения", fontsize=12, pad=10, y=1.0)
+    ax_ecdf.set_xlabel(f"Заряд ({unit_label})", fontsize=10)
+    ax_ecdf.set_ylabel("Доля импульсов", fontsize=10)
+    ax_ecdf.set_ylim(0.0, 1.02)
+    ax_ecdf.grid(True, **grid)
+
+    ax_trend = axes[1, 0]
+    (trend_points,) = ax_trend.plot([], [], linestyle="none", marker=".", markersize=2, color="grey")
+    (trend_line,) = ax_trend.plot([], [], color="black", linewidth=1.0, label="Скользящее среднее")
+    ax_trend.set_title("Заряд по номеру импульса", fontsize=12, pad=10, y=1.0)
+    ax_trend.set_xlabel("Номер импульса", fontsize=10)
+    ax_trend.set_ylabel(f"Заряд ({unit_label})", fontsize=10)
+    ax_trend.legend(loc="upper right", fontsize=8)
+    ax_trend.grid(True, **grid)
+
+    ax_box = axes[1, 1]
+    box = ax_box.add_patch(Rectangle((0.75, 0.0), 0.5, 0.0, facecolor="white", edgecolor="black", linewidth=0.9))
+    (median_line,) = ax_box.plot([0.75, 1.25], [0, 0], color="black", linewidth=1.5)
+    (whiskers,) = ax_box.plot([], [], color="black", linewidth=0.9)
+    (outliers,) = ax_box.plot([], [], linestyle="none", marker="o", markersize=3,
+                              markerfacecolor="none", markeredgecolor="black")
+    box_text = ax_box.text(STATS_TEXT_X_POS, STATS_TEXT_Y_POS, "", transform=ax_box.transAxes,
+                           ha="right", va="top", fontsize=9,
+                           bbox=dict(boxstyle="round,pad=0.2", fc="white", ec="black", lw=0.5))
+    ax_box.set_title("Сводка (box-диаграмма)", fontsize=12, pad=10, y=1.0)
+    ax_box.set_ylabel(f"Заряд ({unit_label})", fontsize=10)
+    ax_box.set_xlim(0.4, 1.6)
+    ax_box.set_xticks([])
+    ax_box.grid(True, axis="y", **grid)
+
+    _freeze_layout(fig)
+    return {"fig": fig, "hist": hist, "ax_ecdf": ax_ecdf, "ecdf_line": ecdf_line,
+            "ax_trend": ax_trend, "trend_points": trend_points, "trend_line": trend_line,
+            "ax_box": ax_box, "box": box, "median_line": median_line, "whiskers": whiskers,
+            "outliers": outliers, "box_text": box_text}
+
+
+def _statistics_template(bins: int, unit_label: str) -> dict:
+    key = (bins, unit_label)
+    template = _statistics_templates.get(key)
+    if template is None:
+        _evict(_statistics_templates)
+        template = _statistics_templates[key] = _build_statistics_template(
+            _agg_figure(STATISTICS_FIGURE_SIZE), bins, unit_label)
+    return template
+
+
+def _padded(low: float, high: float) -> tuple[float, float]:
+    pad = (high - low) * Y_AXIS_MARGIN_RATIO or abs(high) * Y_AXIS_MARGIN_RATIO or 1.0
+    return low - pad, high + pad
+
+
+def _update_statistics(template: dict, stats: ChargeStatisticsModel, unit_label: str) -> None:
+    _update(template["hist"], stats.histogram, unit_label, "mid")
+
+    template["ecdf_line"].set_data(stats.ecdf_x, stats.ecdf_y)
+    template["ax_ecdf"].set_xlim(*_padded(stats.min, stats.max))
+
+    template["trend_points"].set_data(stats.trend_index, stats.trend_values)
+    template["trend_line"].set_data(stats.trend_index, stats.trend_mean)
+    template["ax_trend"].set_xlim(-0.5, max(stats.count - 0.5, 0.5))
+    template["ax_trend"].set_ylim(*_padded(stats.min, stats.max))
+
+    template["box"].set_y(stats.q1)
+    template["box"].set_height(stats.q3 - stats.q1)
+    template["median_line"].set_ydata([stats.median, stats.median])
+    # Усы и засечки одной линией с разрывами (NaN)
+    lo, hi, q1, q3 = stats.whisker_low, stats.whisker_high, stats.q1, stats.q3
+    template["whiskers"].set_data(
+        [1.0, 1.0, np.nan, 1.0, 1.0, np.nan, 0.9, 1.1, np.nan, 0.9, 1.1],
+        [q1, lo, np.nan, q3, hi, np.nan, lo, lo, np.nan, hi, hi])
+    template["outliers"].set_data(np.ones(stats.outliers.size), stats.outliers)
+    template["ax_box"].set_ylim(*_padded(stats.min, stats.max))
+    template["box_text"].set_text(
+        f"N = {stats.count}\nМедиана = {stats.median:.2f} {unit_label}\n"
+        f"IQR = {stats.q3 - stats.q1:.2f} {unit_label}\nВыбросов: {stats.outlier_count}")
+
+
+def render_charge_statistics(stats: ChargeStatisticsModel, save_path: Path, unit_label: str = "нКл",
+                             dpi: int = STATISTICS_DPI, fmt: str | None = None) -> Path:
+    """Сохраняет четыре панели отчёта одним файлом на переиспользуемом шаблоне."""
+    template = _statistics_template(stats.histogram.density.size, unit_label)
+    _update_statistics(template, stats, unit_label)
+    fmt = fmt or save_path.suffix.lstrip(".") or "png"
+    save_path.parent.mkdir(parents=True, exist_ok=True)
+    with atomic_write(save_path, binary=True) as f:
+        template["fig"].savefig(f, dpi=dpi, format=fmt)
+    return save_path
+
+
+def plot_charge_statistics(
+        charges: np.ndarray,
+        out_dir: Path,
+        bins: int | str = 20,
+        unit_scale: float = 1e9,
+        unit_label: str = "нКл",
+        dpi: int = STATISTICS_DPI,
+        fmt: str = "png",
+) -> ChargeStatisticsModel:
+    """Отчёт по зарядам файла: out_dir/charge_statistics.<fmt> с гистограммой, ECDF, трендом и box-диаграммой.
+
+    Возвращает рассчитанную статистику, чтобы сводка бралась из того же прохода.
+    """
+    stats = compute_charge_statistics(charges, bins, unit_scale)
+    render_charge_statistics(stats, out_dir / f"{STATISTICS_FILE_STEM}.{fmt}", unit_label, dpi, fmt)
+    return stats
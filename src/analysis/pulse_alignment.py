@@ -0,0 +1,199 @@
+"""
+Выравнивание импульсов по опорной точке и передискретизация на общую сетку.
+
+Импульсы разной длины и с разными отсчётами времени сдвигаются так, чтобы
+опорная точка (пик, пересечение порога или начало) оказалась в t = 0, и
+линейно интерполируются на общую сетку времени. Обработка идёт чанками
+импульсов, размер которых подбирается под заданный бюджет памяти.
+"""
+from __future__ import annotations
+
+import warnings
+from typing import Annotated, Sequence
+
+import numpy as np
+from pydantic import BaseModel, Field, ConfigDict
+
+from src.models.pulse_batch_models import PulseBatchModel
+
+
+FIDUCIALS = ("peak", "threshold", "start")
+DEFAULT_GRID_POINTS = 256
+DEFAULT_PERCENTILES = (5.0, 50.0, 95.0)
+# Бюджет памяти на промежуточные массивы одного чанка, байт
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024
+# Оценка числа 8-байтовых временных массивов на отсчёт / точку сетки
+_BYTES_PER_SAMPLE = 6 * 8
+_BYTES_PER_GRID_POINT = 6 * 8
+
+
+class AlignedPulsesModel(BaseModel):
+    """Результат выравнивания: матрица импульсов на общей сетке и огибающие."""
+    grid: Annotated[np.ndarray, Field(description="Общая сетка времени относительно опорной точки")]
+    matrix: Annotated[np.ndarray, Field(description="Импульсы на сетке, форма (N, M); NaN вне импульса")]
+    fiducial_times: Annotated[np.ndarray, Field(description="Абсолютное время опорной точки каждого импульса")]
+    mean: Annotated[np.ndarray, Field(description="Среднее по импульсам в каждой точке сетки")]
+    percentiles: Annotated[dict[float, np.ndarray], Field(description="Перцентили по импульсам в каждой точке сетки")]
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+
+def _chunk_bounds(batch: PulseBatchModel, grid_points: int, memory_budget: int) -> list[tuple[int, int]]:
+    """Разбивает импульсы на чанки так, чтобы каждый укладывался в бюджет памяти."""
+    n = len(batch)
+    bounds = []
+    k = 0
+    offsets = batch.offsets
+    while k < n:
+        # Сколько импульсов помещается, если считать и отсчёты, и точки сетки
+        lo, hi = k + 1, n
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            cost = (offsets[mid] - offsets[k]) * _BYTES_PER_SAMPLE + (mid - k) * grid_points * _BYTES_PER_GRID_POINT
+            if cost <= memory_budget:
+                lo = mid
+            else:
+                hi = mid - 1
+        bounds.append((k, lo))
+        k = lo
+    return bounds
+
+
+def _segment_first(mask: np.ndarray, seg_id: np.ndarray, n_segments: int, fallback: np.ndarray) -> np.ndarray:
+    """Индекс первого True в каждом сегменте; для сегментов без True - fallback."""
+    idx = np.flatnonzero(mask)
+    result = fallback.copy()
+    if idx.size:
+        segs, first = np.unique(seg_id[idx], return_index=True)
+        result[segs] = idx[first]
+    return result
+
+
+def _chunk_fiducials(time: np.ndarray, values: np.ndarray, starts: np.ndarray, ends: np.ndarray,
+                     fiducial: str, threshold_fraction: float) -> np.ndarray:
+    """Время опорной точки для импульсов одного чанка (локальные индексы)."""
+    if fiducial == "start":
+        return time[starts].astype(np.float64)
+
+    n = len(starts)
+    seg_id = np.repeat(np.arange(n), ends - starts)
+    peaks = np.maximum.reduceat(values, starts)
+    peak_idx = _segment_first(values == peaks[seg_id], seg_id, n, starts)
+    if fiducial == "peak":
+        return time[peak_idx].astype(np.float64)
+
+    # Пересечение порога threshold_fraction * пик на переднем фронте
+    level = threshold_fraction * peaks
+    cross = _segment_first(values >= level[seg_id], seg_id, n, peak_idx)
+    prev = np.maximum(cross - 1, starts)
+    v0, v1 = values[prev], values[cross]
+    t0, t1 = time[prev], time[cross]
+    dv = v1 - v0
+    safe = (cross > starts) & (dv != 0)
+    frac = np.where(safe, (level - v0) / np.where(dv != 0, dv, 1.0), 1.0)
+    return np.where(safe, t0 + frac * (t1 - t0), t1).astype(np.float64)
+
+
+def fiducial_times(batch: PulseBatchModel, fiducial: str = "peak", threshold_fraction: float = 0.5,
+                   channel: str = "current", memory_budget: int = DEFAULT_MEMORY_BUDGET) -> np.ndarray:
+    """Абсолютное время опорной точки для каждого импульса пакета."""
+    if fiducial not in FIDUCIALS:
+        raise ValueError(f"Неизвестная опорная точка '{fiducial}', допустимо: {FIDUCIALS}")
+    values = getattr(batch, channel)
+    result = np.empty(len(batch), dtype=np.float64)
+    for a, b in _chunk_bounds(batch, 0, memory_budget):
+        s0, s1 = int(batch.offsets[a]), int(batch.offsets[b])
+        result[a:b] = _chunk_fiducials(
+            batch.time[s0:s1], values[s0:s1],
+            batch.offsets[a:b] - s0, batch.offsets[a + 1:b + 1] - s0,
+            fiducial, threshold_fraction,
+        )
+    return result
+
+
+def default_grid(batch: PulseBatchModel, fid: np.ndarray, n_points: int = DEFAULT_GRID_POINTS) -> np.ndarray:
+    """Сетка от медианного начала до медианного конца импульса относительно опорной точки."""
+    before = np.median(fid - batch.time[batch.starts])
+    after = np.median(batch.time[batch.ends - 1] - fid)
+    if before + after <= 0:
+        raise ValueError("Невозможно построить сетку: нулевая длительность импульсов")
+    return np.linspace(-before, after, n_points)
+
+
+def _resample_chunk(time: np.ndarray, values: np.ndarray, starts: np.ndarray, ends: np.ndarray,
+                    fid: np.ndarray, grid: np.ndarray) -> np.ndarray:
+    """Линейная интерполяция импульсов чанка на сетку одним searchsorted.
+
+    Времена каждого импульса j отображаются в монотонные ключи
+    j + 0.5 * (t - t_start) / (t_end - t_start), поэтому поиск по всему
+    чанку выполняется за один вызов без цикла по импульсам.
+    """
+    n = len(starts)
+    seg_id = np.repeat(np.arange(n), ends - starts)
+    t_start = time[starts]
+    span = time[ends - 1] - t_start
+    span = np.where(span > 0, span, 1.0)
+    keys = seg_id + 0.5 * (time - t_start[seg_id]) / span[seg_id]
+
+    g_abs = fid[:, None] + grid[None, :]
+    g_norm = (g_abs - t_start[:, None]) / span[:, None]
+    inside = (g_norm >= 0.0) & (g_norm <= 1.0) & (ends - starts > 1)[:, None]
+    g_keys = np.arange(n)[:, None] + 0.5 * np.clip(g_norm, 0.0, 1.0)
+
+    lo = np.searchsorted(keys, g_keys.ravel(), side="right").reshape(n, -1) - 1
+    lo = np.clip(lo, starts[:, None], np.maximum(ends - 2, starts)[:, None])
+    hi = np.minimum(lo + 1, (ends - 1)[:, None])
+    t0, t1 = time[lo], time[hi]
+    dt = np.where(t1 > t0, t1 - t0, 1.0)
+    w = np.clip((g_abs - t0) / dt, 0.0, 1.0)
+    out = values[lo] * (1.0 - w) + values[hi] * w
+    out[~inside] = np.nan
+    return out
+
+
+def align_pulses(
+        batch: PulseBatchModel,
+        fiducial: str = "peak",
+        grid: np.ndarray | None = None,
+        n_points: int = DEFAULT_GRID_POINTS,
+        channel: str = "current",
+        threshold_fraction: float = 0.5,
+        percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+        memory_budget: int = DEFAULT_MEMORY_BUDGET,
+        dtype=np.float32,
+) -> AlignedPulsesModel:
+    """Выравнивает импульсы по опорной точке и передискретизирует на общую сетку.
+
+    Возвращает плотную матрицу (N, M) в dtype, среднее и перцентили по
+    импульсам в каждой точке сетки. Точки сетки вне импульса равны NaN и
+    не участвуют в статистике.
+    """
+    if len(batch) == 0:
+        raise ValueError("Пакет импульсов не может быть пустым")
+
+    fid = fiducial_times(batch, fiducial, threshold_fraction, channel, memory_budget)
+    if grid is None:
+        grid = default_grid(batch, fid, n_points)
+    grid = np.asarray(grid, dtype=np.float64)
+
+    values = getattr(batch, channel)
+    matrix = np.empty((len(batch), len(grid)), dtype=dtype)
+    for a, b in _chunk_bounds(batch, len(grid), memory_budget):
+        s0, s1 = int(batch.offsets[a]), int(batch.offsets[b])
+        matrix[a:b] = _resample_chunk(
+            batch.time[s0:s1], values[s0:s1],
+            batch.offsets[a:b] - s0, batch.offsets[a + 1:b + 1] - s0,
+            fid[a:b], grid,
+        )
+
+    with warnings.catch_warnings():
+        # Столбцы сетки, не покрытые ни одним импульсом, дают NaN без предупреждений
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        mean = np.nanmean(matrix, axis=0, dtype=np.float64)
+        pct = np.nanpercentile(matrix, list(percentiles), axis=0) if percentiles else []
+    return AlignedPulsesModel(
+        grid=grid,
+        matrix=matrix,
+        fiducial_times=fid,
+        mean=mean,
+        percentiles={float(p): row for p, row in zip(percentiles, pct)},
+    )
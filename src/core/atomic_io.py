@@ -0,0 +1,140 @@
+"""
+Атомарная запись файлов и рекомендательные блокировки.
+
+atomic_write() пишет во временный файл в той же папке, делает fsync и
+переименовывает его поверх цели (os.replace атомарен в пределах тома),
+после чего синхронизирует саму папку. Читатель - например, GUI,
+подхватывающий processed/*.txt, - видит либо старый файл целиком, либо
+новый целиком; после падения остаётся прежняя версия, а не обрезанная.
+
+file_lock() - рекомендательная блокировка через соседний <имя>.lock
+(flock на POSIX, msvcrt.locking на Windows; там блокировка всегда
+исключительная). Нужна для операций чтение-изменение-запись, например
+уплотнения журнала одобрений в selections. Блокировка не реентерабельна:
+код, уже держащий её, передаёт lock=False во вложенные вызовы.
+
+Модуль использует только стандартную библиотеку.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Iterator, Optional
+
+LOCK_SUFFIX = ".lock"
+_LOCK_POLL = 0.05
+
+
+def _fsync_dir(folder: Path) -> None:
+    """Синхронизирует запись каталога (на Windows не поддерживается и не нужно)."""
+    if sys.platform == "win32":
+        return
+    fd = os.open(folder, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _target_mode(path: Path) -> int:
+    """Права нового файла: как у заменяемого, иначе 0o644 (mkstemp создаёт 0o600)."""
+    try:
+        return path.stat().st_mode & 0o777
+    except FileNotFoundError:
+        return 0o644
+
+
+def _try_lock(fd: int, shared: bool) -> bool:
+    if sys.platform == "win32":
+        import msvcrt
+        try:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+    import fcntl
+    try:
+        fcntl.flock(fd, (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | fcntl.LOCK_NB)
+        return True
+    except BlockingIOError:
+        return False
+
+
+def _unlock(fd: int) -> None:
+    if sys.platform == "win32":
+        import msvcrt
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+@contextmanager
+def file_lock(path: Path, shared: bool = False, timeout: Optional[float] = None) -> Iterator[None]:
+    """Блокирует path через <path>.lock; timeout=None - ждать сколько потребуется."""
+    lock_path = path.with_name(path.name + LOCK_SUFFIX)
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not _try_lock(fd, shared):
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"Не удалось заблокировать {path} за {timeout} с")
+            time.sleep(_LOCK_POLL)
+        try:
+            yield
+        finally:
+            _unlock(fd)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def atomic_write(path: Path, binary: bool = False, encoding: str = "utf-8", lock: bool = False,
+                 lock_timeout: Optional[float] = None):
+    """Открывает временный файл рядом с path; при успешном выходе он заменяет path.
+
+    При исключении временный файл удаляется, а path остаётся прежним.
+    """
+    with file_lock(path, timeout=lock_timeout) if lock else nullcontext():
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") if binary else os.fdopen(fd, "w", encoding=encoding) as f:
+                yield f
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp, _target_mode(path))
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except FileNotFoundError:
+                pass
+            raise
+        _fsync_dir(path.parent)
+
+
+def atomic_write_text(path: Path, text: str, encoding: str = "utf-8", lock: bool = False) -> Path:
+    with atomic_write(path, encoding=encoding, lock=lock) as f:
+        f.write(text)
+    return path
+
+
+def atomic_write_json(path: Path, data, indent: Optional[int] = 2, lock: bool = False) -> Path:
+    with atomic_write(path, lock=lock) as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False)
+    return path
+
+
+def durable_replace(tmp: Path, path: Path) -> None:
+    """fsync уже записанного tmp и атомарная замена им path (для писателей со своим файлом)."""
+    with open(tmp, "rb+") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    _fsync_dir(path.parent)
@@ -3,6 +3,10 @@ import json
 from src.models.config_models import ConfigModel, DataConfigModel
 from src.models.selection_models import SelectionModel
 from src.core.project_root import PROJECT_ROOT
+from src.core.atomic_io import atomic_write_json
+from src.core.instrumentation import get_logger
+
+log = get_logger("config")
 
 
 def load_config(config_path: Path) -> ConfigModel:
@@ -59,8 +63,8 @@ def load_data_config(config_path: Path | None = None) -> DataConfigModel:
             # Создаем конфиг по умолчанию
             return _create_default_data_config(config_path)
     except (json.JSONDecodeError, KeyError, ValueError) as e:
-        print(f"⚠️ Ошибка загрузки конфига {config_path}: {e}")
-        print("🔄 Создаю новый конфиг по умолчанию...")
+        log.warning("⚠️ Ошибка загрузки конфига %s: %s", config_path, e)
+        log.warning("🔄 Создаю новый конфиг по умолчанию...")
         return _create_default_data_config(config_path)
 
 
@@ -69,8 +73,7 @@ def _create_default_data_config(config_path: Path) -> DataConfigModel:
     default_config = DataConfigModel()
     config_path.parent.mkdir(parents=True, exist_ok=True)
 
-    with open(config_path, "w", encoding="utf-8") as f:
-        json.dump(default_config.model_dump_jsonable(), f, indent=2, ensure_ascii=False)
+    atomic_write_json(config_path, default_config.model_dump_jsonable())
 
-    print(f"✅ Создан новый конфиг: {config_path}")
+    log.info("✅ Создан новый конфиг: %s", config_path)
     return default_config
\ No newline at end of file
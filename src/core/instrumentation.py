@@ -0,0 +1,164 @@
+"""
+Лёгкая инструментация: именованные интервалы времени (spans), счётчики и
+логирование по уровням вместо print.
+
+По умолчанию выключена: span() возвращает общий пустой контекст, а count()
+сводится к проверке флага, поэтому вызовы можно оставлять в горячих циклах.
+Включается через profile_session() (опция --profile у CLI).
+
+Модуль использует только стандартную библиотеку и импортируется CLI до
+разбора аргументов, так что тяжёлые зависимости сюда добавлять нельзя.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Optional
+
+LOGGER_NAME = "pulses"
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR")
+
+_enabled = False
+# name -> [число вызовов, суммарное время, максимальное время]
+_spans: dict[str, list] = {}
+_counters: dict[str, int] = {}
+_NULL_SPAN = nullcontext()
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Логгер подсистемы внутри общего логгера проекта."""
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+def configure_logging(level: str = "INFO") -> None:
+    """Вывод логов проекта в stdout в прежнем виде (только текст сообщения)."""
+    logger = logging.getLogger(LOGGER_NAME)
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.propagate = False
+    logger.setLevel(level.upper())
+
+
+def enable() -> None:
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset() -> None:
+    _spans.clear()
+    _counters.clear()
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        stat = _spans.get(self.name)
+        if stat is None:
+            _spans[self.name] = [1, elapsed, elapsed]
+        else:
+            stat[0] += 1
+            stat[1] += elapsed
+            if elapsed > stat[2]:
+                stat[2] = elapsed
+        return False
+
+
+def span(name: str):
+    """Контекст, измеряющий время блока под именем name (пустой, если выключено)."""
+    return _Span(name) if _enabled else _NULL_SPAN
+
+
+def count(name: str, n: int = 1) -> None:
+    """Увеличивает счётчик name на n (ничего не делает, если выключено)."""
+    if _enabled:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def summary() -> dict:
+    """Сводка интервалов и счётчиков, интервалы отсортированы по суммарному времени."""
+    spans = {
+        name: {"calls": calls, "total_s": total, "mean_s": total / calls, "max_s": worst}
+        for name, (calls, total, worst) in sorted(_spans.items(), key=lambda kv: kv[1][1], reverse=True)
+    }
+    return {"spans": spans, "counters": dict(sorted(_counters.items()))}
+
+
+def write_summary(path: Path) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {"created": datetime.now().isoformat(), **summary()}
+    path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+def add_instrumentation_arguments(parser, default_profile: str) -> None:
+    """Добавляет в argparse-парсер опции --profile и --log-level."""
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        nargs="?",
+        const=Path(default_profile),
+        default=None,
+        metavar="PREFIX",
+        help=f"Сохранить cProfile (PREFIX.prof) и сводку интервалов (PREFIX_spans.json); "
+             f"по умолчанию PREFIX={default_profile}",
+    )
+    parser.add_argument(
+        "--log-level",
+        choices=LOG_LEVELS,
+        default="INFO",
+        help="Уровень подробности вывода (по умолчанию: INFO)",
+    )
+
+
+@contextmanager
+def profile_session(prefix: Optional[Path]) -> Iterator[None]:
+    """Включает инструментацию и cProfile на время блока, если задан prefix."""
+    if prefix is None:
+        yield
+        return
+
+    import cProfile
+    import pstats
+
+    log = get_logger("profile")
+    reset()
+    enable()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        disable()
+        prof_path = prefix.with_name(prefix.name + ".prof")
+        prof_path.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(prof_path)
+        spans_path = write_summary(prefix.with_name(prefix.name + "_spans.json"))
+        log.info("⏱️ Профиль сохранён: %s, интервалы: %s", prof_path, spans_path)
+        if log.isEnabledFor(logging.DEBUG):
+            pstats.Stats(profiler, stream=sys.stdout).sort_stats("cumulative").print_stats(15)
@@ -0,0 +1,16 @@
+"""
+Выбор backend matplotlib для запусков без дисплея.
+"""
+import os
+
+
+def use_headless_backend() -> None:
+    """Переключает matplotlib на Agg, если backend не задан явно через MPLBACKEND.
+
+    Вызывается CLI до импорта модулей с графиками: Agg не тянет GUI-toolkit
+    и заметно быстрее импортируется в пакетных задачах.
+    """
+    if os.environ.get("MPLBACKEND"):
+        return
+    import matplotlib
+    matplotlib.use("Agg")
@@ -0,0 +1,113 @@
+"""
+Упреждающее чтение в фоновом потоке с ограниченной очередью.
+
+Пока основной поток режет и пишет захват N, поток чтения загружает
+(и распаковывает) захват N + 1: np.load и zlib отпускают GIL на время
+чтения и распаковки, так что диск и процессор работают одновременно.
+Глубина очереди ограничена depth элементами, а объём загруженных, но ещё
+не обработанных данных - max_bytes (один элемент пропускается всегда,
+даже если он больше лимита). depth=0 - последовательная загрузка без потока.
+"""
+from __future__ import annotations
+
+import queue
+import threading
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
+
+from src.core.instrumentation import span
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+DEFAULT_DEPTH = 2
+DEFAULT_MAX_MB = 1024
+_DONE = object()
+
+
+class _ByteBudget:
+    """Счётчик байт, загруженных потоком чтения и ещё не отданных обратно потребителем."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, n: int, stop: threading.Event) -> None:
+        with self._cond:
+            while self.used and self.used + n > self.limit and not stop.is_set():
+                self._cond.wait(0.1)
+            self.used += n
+
+    def release(self, n: int) -> None:
+        with self._cond:
+            self.used -= n
+            self._cond.notify_all()
+
+
+def _put(q: queue.Queue, value, stop: threading.Event) -> bool:
+    while not stop.is_set():
+        try:
+            q.put(value, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def prefetch(items: Iterable[T], load: Callable[[T], R], depth: int = DEFAULT_DEPTH,
+             max_bytes: Optional[int] = None,
+             size_of: Optional[Callable[[T], int]] = None) -> Iterator[tuple[T, Optional[R], Optional[Exception]]]:
+    """Отдаёт (item, load(item), None) или (item, None, ошибка) в исходном порядке.
+
+    load выполняется в фоновом потоке не более чем на depth элементов
+    вперёд; size_of(item) - оценка памяти результата для лимита max_bytes.
+    Ошибки load не прерывают чтение - решение принимает потребитель.
+    """
+    if depth <= 0:
+        for item in items:
+            try:
+                yield item, load(item), None
+            except Exception as e:
+                yield item, None, e
+        return
+
+    q: queue.Queue = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    budget = _ByteBudget(max_bytes) if max_bytes else None
+
+    def reader() -> None:
+        try:
+            for item in items:
+                if stop.is_set():
+                    return
+                n = size_of(item) if budget is not None and size_of is not None else 0
+                if budget is not None:
+                    budget.acquire(n, stop)
+                try:
+                    with span("prefetch.load"):
+                        entry = (item, load(item), None, n)
+                except Exception as e:
+                    entry = (item, None, e, n)
+                if not _put(q, entry, stop):
+                    return
+        finally:
+            _put(q, _DONE, stop)
+
+    thread = threading.Thread(target=reader, name="prefetch-reader", daemon=True)
+    thread.start()
+    try:
+        while True:
+            with span("prefetch.wait"):
+                entry = q.get()
+            if entry is _DONE:
+                break
+            item, result, error, n = entry
+            del entry
+            yield item, result, error
+            # Потребитель вернулся за следующим элементом - предыдущий обработан
+            del result
+            if budget is not None:
+                budget.release(n)
+    finally:
+        stop.set()
+        thread.join()
@@ -1,75 +1,182 @@
+import logging
 import warnings
+import zipfile
 import numpy as np
 from pathlib import Path
+from typing import Optional
 from src.models.config_models import ConfigModel
 from src.models.selection_models import SelectionModel
-from src.models.pulse_models import PulseModel
+from src.models.pulse_models import PulseModel, PulseProvenanceModel
+from src.models.pulse_batch_models import PulseBatchModel, BatchProvenanceModel
+from src.core.instrumentation import get_logger, span, count
+from src.core.prefetch import prefetch, DEFAULT_DEPTH, DEFAULT_MAX_MB
 
+log = get_logger("extract")
+
+
+def load_capture(file_path: Path) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Загружает массив data захвата: (время, напряжение, ток)."""
+    if not file_path.exists():
+        raise FileNotFoundError(f"Файл не найден и пропущен: {file_path}")
+    with span("extract.load_npz"), np.load(file_path) as npz:
+        if "data" not in npz:
+            raise KeyError(f"Ключ 'data' не найден в файле {file_path}")
+        t, v, i = npz["data"]
+    count("extract.bytes_read", t.nbytes + v.nbytes + i.nbytes)
+    return t, v, i
 
-def extract_pulses_from_file(file_path: Path, selection: SelectionModel) -> list[PulseModel]:
-    print(f"🔧 Извлечение из файла: {file_path.name}")
-    print(f"   Селекции: {len(selection.selections)} записей")
 
+def capture_nbytes(file_path: Path) -> int:
+    """Оценка памяти под data захвата по несжатому размеру записи в .npz."""
     try:
-        with np.load(file_path) as npz:
-            if "data" not in npz:
-                print(f"   ❌ Ключ 'data' не найден в файле {file_path}")
-                raise KeyError(f"Ключ 'data' не найден в файле {file_path}")
+        with zipfile.ZipFile(file_path) as zf:
+            return zf.getinfo("data.npy").file_size
+    except (OSError, KeyError, zipfile.BadZipFile):
+        return 0
+
+
+def iter_captures(config: ConfigModel, selections: list[SelectionModel], prefetch_depth: int = DEFAULT_DEPTH,
+                  prefetch_mb: Optional[int] = DEFAULT_MAX_MB):
+    """Отдаёт (селекция, путь, (t, v, i)) по порядку; следующий захват читается в фоне.
+
+    Отсутствующие и нечитаемые файлы пропускаются с сообщением в лог.
+    """
+    base = config.data_folder
+    paths = {s.file_name: base / s.file_name for s in selections}
+    loaded = prefetch(selections, lambda s: load_capture(paths[s.file_name]), depth=prefetch_depth,
+                      max_bytes=prefetch_mb * 2**20 if prefetch_mb else None,
+                      size_of=lambda s: capture_nbytes(paths[s.file_name]))
+    for s, arrays, error in loaded:
+        file_path = paths[s.file_name]
+        if isinstance(error, FileNotFoundError) and not file_path.exists():
+            warnings.warn(f"Файл не найден и пропущен: {file_path}", UserWarning)
+            log.error("   ❌ Файл не существует: %s", file_path)
+            count("extract.files_missing")
+            continue
+        if error is not None:
+            log.error("   ❌ Ошибка при извлечении из %s: %s", file_path, error)
+            continue
+        yield s, file_path, arrays
+
 
-            t, v, i = npz["data"]
-            print(f"   Данные загружены: время={len(t)}, напряжение={len(v)}, ток={len(i)}")
+def slice_pulses(t: np.ndarray, v: np.ndarray, i: np.ndarray, selection: SelectionModel) -> list[PulseModel]:
+    """Нарезает загруженный захват на PulseModel по селекциям файла."""
+    log.debug("   Селекции: %d записей", len(selection.selections))
+    log.debug("   Данные загружены: время=%d, напряжение=%d, ток=%d", len(t), len(v), len(i))
+    debug = log.isEnabledFor(logging.DEBUG)
 
-            pulses: list[PulseModel] = []
-            valid_selections = 0
+    pulses: list[PulseModel] = []
+    valid_selections = 0
 
-            for idx, s in enumerate(selection.selections):
-                start, end = s.start_index, s.end_index + 1
+    with span("extract.slice"):
+        for idx, s in enumerate(selection.selections):
+            start, end = s.start_index, s.end_index + 1
 
-                # Полная валидация границ массива
-                if start < 0 or start >= len(t) or end > len(t) or start >= end:
-                    print(f"   ⚠️  Пропуск селекции {idx}: неверные границы {start}-{end} (данные: 0-{len(t)})")
-                    continue
+            # Полная валидация границ массива
+            if start < 0 or start >= len(t) or end > len(t) or start >= end:
+                log.warning("   ⚠️  Пропуск селекции %d: неверные границы %d-%d (данные: 0-%d)",
+                            idx, start, end, len(t))
+                continue
 
-                t_rel = t[start:end]
-                pulse = PulseModel(time=t_rel, current=i[start:end], voltage=v[start:end])
-                pulses.append(pulse)
-                valid_selections += 1
-                print(f"   ✅ Селекция {idx}: {start}-{end} -> импульс {len(t_rel)} точек")
+            t_rel = t[start:end]
+            provenance = PulseProvenanceModel(source_file=selection.file_name, selection_index=idx,
+                                              sample_start=start, sample_end=end)
+            pulse = PulseModel(time=t_rel, current=i[start:end], voltage=v[start:end], provenance=provenance)
+            pulses.append(pulse)
+            valid_selections += 1
+            if debug:
+                log.debug("   ✅ Селекция %d: %d-%d -> импульс %d точек", idx, start, end, len(t_rel))
 
-            print(f"   📊 Извлечено импульсов: {valid_selections}/{len(selection.selections)}")
-            return pulses
+    count("extract.pulses_extracted", valid_selections)
+    count("extract.pulses_skipped", len(selection.selections) - valid_selections)
+    log.info("   📊 Извлечено импульсов: %d/%d", valid_selections, len(selection.selections))
+    return pulses
 
+
+def extract_pulses_from_file(file_path: Path, selection: SelectionModel) -> list[PulseModel]:
+    log.info("🔧 Извлечение из файла: %s", file_path.name)
+    try:
+        t, v, i = load_capture(file_path)
+        return slice_pulses(t, v, i, selection)
     except Exception as e:
-        print(f"   ❌ Ошибка при обработке файла {file_path}: {e}")
+        log.error("   ❌ Ошибка при обработке файла %s: %s", file_path, e)
         raise
 
 
-def extract_all_pulses(config: ConfigModel, selections: list[SelectionModel]) -> list[PulseModel]:
-    print("🚀 Начало извлечения всех импульсов")
+def extract_all_pulses(config: ConfigModel, selections: list[SelectionModel], prefetch_depth: int = DEFAULT_DEPTH,
+                       prefetch_mb: Optional[int] = DEFAULT_MAX_MB) -> list[PulseModel]:
+    """Извлекает импульсы всех селекций; захваты читаются с упреждением (см. src.core.prefetch)."""
+    log.info("🚀 Начало извлечения всех импульсов")
     all_pulses: list[PulseModel] = []
-    base = config.data_folder
 
-    print(f"📁 Базовая папка: {base}")
-    print(f"📋 Всего селекций: {len(selections)}")
+    log.info("📁 Базовая папка: %s", config.data_folder)
+    log.info("📋 Всего селекций: %d", len(selections))
 
-    for s_idx, s in enumerate(selections):
-        file_path = base / s.file_name  # Используем имя файла из селекции
-        print(f"\n📄 Обработка селекции {s_idx}: {s.file_name}")
-        print(f"   Полный путь: {file_path}")
+    for s, file_path, (t, v, i) in iter_captures(config, selections, prefetch_depth, prefetch_mb):
+        log.info("🔧 Извлечение из файла: %s", file_path.name)
+        with span("extract.file"):
+            all_pulses.extend(slice_pulses(t, v, i, s))
 
-        if not file_path.exists():
-            warnings.warn(f"Файл не найден и пропущен: {file_path}", UserWarning)
-            print(f"   ❌ Файл не существует: {file_path}")
-            continue
-
-        try:
-            pulses_from_file = extract_pulses_from_file(file_path, s)
-            all_pulses.extend(pulses_from_file)
-            print(f"   ✅ Добавлено {len(pulses_from_file)} импульсов")
-        except Exception as e:
-            print(f"   ❌ Ошибка при извлечении из {file_path}: {e}")
-            continue
-
-    print(f"\n🎉 ИТОГО: Извлечено {len(all_pulses)} импульсов")
+    log.info("🎉 ИТОГО: Извлечено %d импульсов", len(all_pulses))
     return all_pulses
 
+
+def valid_selection_ranges(selection: SelectionModel, n_samples: int) -> list[tuple[int, int, int]]:
+    """(номер селекции, start, end) для селекций, попадающих в массив длиной n_samples."""
+    ranges = []
+    for idx, s in enumerate(selection.selections):
+        start, end = s.start_index, s.end_index + 1
+        if start < 0 or start >= n_samples or end > n_samples or start >= end:
+            continue
+        ranges.append((idx, start, end))
+    return ranges
+
+
+def gather_ranges(t: np.ndarray, v: np.ndarray, i: np.ndarray, file_name: str,
+                  ranges: list[tuple[int, int, int]]) -> PulseBatchModel:
+    """Пакет из отрезков массивов захвата (копируются только выбранные отсчёты)."""
+    if not ranges:
+        return PulseBatchModel.from_pulses([])
+    idx = np.array([r[0] for r in ranges], dtype=np.int64)
+    starts = np.array([r[1] for r in ranges], dtype=np.int64)
+    ends = np.array([r[2] for r in ranges], dtype=np.int64)
+    return PulseBatchModel(
+        time=np.concatenate([t[s:e] for s, e in zip(starts, ends)]),
+        current=np.concatenate([i[s:e] for s, e in zip(starts, ends)]),
+        voltage=np.concatenate([v[s:e] for s, e in zip(starts, ends)]),
+        offsets=np.concatenate(([0], np.cumsum(ends - starts))).astype(np.int64),
+        provenance=BatchProvenanceModel(
+            sources=[file_name],
+            source_ids=np.zeros(len(ranges), dtype=np.int32),
+            selection_index=idx,
+            sample_start=starts,
+            sample_end=ends,
+        ),
+    )
+
+
+def iter_capture_batches(config: ConfigModel, selections: list[SelectionModel],
+                         prefetch_depth: int = DEFAULT_DEPTH, prefetch_mb: Optional[int] = DEFAULT_MAX_MB):
+    """Отдаёт (имя захвата, PulseBatchModel) по одному захвату, читая следующий в фоне.
+
+    Подходит для потоковой записи (шарды, контейнер): в памяти одновременно
+    только обрабатываемый захват и очередь упреждающего чтения.
+    """
+    for s, file_path, (t, v, i) in iter_captures(config, selections, prefetch_depth, prefetch_mb):
+        ranges = valid_selection_ranges(s, len(t))
+        batch = gather_ranges(t, v, i, s.file_name, ranges)
+        count("extract.pulses_extracted", len(ranges))
+        count("extract.pulses_skipped", len(s.selections) - len(ranges))
+        log.info("   ✅ %s: %d/%d импульсов", file_path.name, len(ranges), len(s.selections))
+        yield s.file_name, batch
+
+
+def extract_pulse_batch(config: ConfigModel, selections: list[SelectionModel],
+                        prefetch_depth: int = DEFAULT_DEPTH, prefetch_mb: Optional[int] = DEFAULT_MAX_MB) -> PulseBatchModel:
+    """Извлекает импульсы всех селекций сразу в PulseBatchModel.
+
+    В отличие от extract_all_pulses, не создаёт PulseModel на каждый импульс:
+    срезы склеиваются в плоские массивы, происхождение хранится массивами.
+    """
+    return PulseBatchModel.concatenate(
+        [batch for _, batch in iter_capture_batches(config, selections, prefetch_depth, prefetch_mb)])
@@ -1,11 +1,133 @@
 from pathlib import Path
-from src.models.pulse_models import PulseModel
+import numpy as np
+from src.models.pulse_models import PulseModel, UniformTimeAxis
+from src.models.pulse_batch_models import PulseBatchModel
+from src.core.instrumentation import get_logger, span, count
+from src.core.atomic_io import atomic_write
+from src.data.pulse_container import is_container, write_container, DEFAULT_CODEC, DEFAULT_LEVEL
 
-def write_pulses(pulses: list[PulseModel], output_path: Path) -> None:
-    """Записывает импульсы в текстовый файл."""
-    with output_path.open("w", encoding="utf-8") as f:
-        f.write("time\tcurrent\tvoltage\n")
+# Заголовки полного формата; ":f4" - ток и напряжение записаны с точностью float32
+FULL_HEADER = "time\tcurrent\tvoltage\n"
+FULL_HEADER_F4 = "time\tcurrent:f4\tvoltage:f4\n"
+# Заголовки компактного формата: время хранится в строке "start" как <t0>:<dt>
+COMPACT_HEADER = "current\tvoltage\n"
+COMPACT_HEADER_F4 = "current:f4\tvoltage:f4\n"
+
+log = get_logger("write")
+
+
+def _start_line(provenance, axis: UniformTimeAxis | None = None) -> str:
+    """Строка-разделитель импульса; при известном происхождении - с файлом и отсчётами.
+
+    В компактном формате в конце добавляется ось времени <t0>:<dt>.
+    """
+    fields = provenance.to_fields() if provenance is not None else "\t"
+    if axis is not None:
+        return f"start\t{fields}\t{axis.to_field()}\n"
+    return f"start\t{fields}\n"
+
+
+def _compact_header(float32: bool) -> str:
+    return COMPACT_HEADER_F4 if float32 else COMPACT_HEADER
+
+
+def _row_format(float32: bool) -> str:
+    # 9 значащих цифр достаточно для точного восстановления float32
+    return "{:.9g}\t{:.9g}\n" if float32 else "{!r}\t{!r}\n"
+
+
+def _full_header(float32: bool) -> str:
+    return FULL_HEADER_F4 if float32 else FULL_HEADER
+
+
+def _full_row_format(float32: bool) -> str:
+    # Время всегда пишется полностью: округление до float32 сдвинуло бы отсчёты
+    return "{!r}\t{:.9g}\t{:.9g}\n" if float32 else "{!r}\t{!r}\t{!r}\n"
+
+
+def _samples(values: np.ndarray, float32: bool) -> list:
+    return np.asarray(values, dtype=np.float32 if float32 else None).tolist()
+
+
+def write_pulses(pulses: list[PulseModel], output_path: Path, compact: bool = False, float32: bool = False,
+                 codec: str = DEFAULT_CODEC, level: int = DEFAULT_LEVEL) -> None:
+    """Записывает импульсы в текстовый файл.
+
+    Строка "start" перед импульсом хранит его происхождение:
+    start<TAB><файл .npz><TAB><селекция>:<начало>:<конец>.
+    compact=True - равномерное время не пишется столбцом, а хранится в
+    строке "start" как <t0>:<dt> (если хоть один импульс неравномерен,
+    файл пишется в полном формате); float32=True - ток и напряжение
+    округляются до float32 в любом формате (заголовок с ":f4"). Путь с расширением .pulsez - сжатый контейнер
+    (см. pulse_container) с кодеком codec и уровнем level. Файл пишется
+    атомарно (см. atomic_io): читатель не увидит его обрезанным.
+    """
+    if is_container(output_path):
+        write_pulse_batch(PulseBatchModel.from_pulses(pulses), output_path, float32=float32, codec=codec, level=level)
+        return
+    if compact:
+        axes = [UniformTimeAxis.from_array(p.time) for p in pulses]
+        if any(axis is None for axis in axes):
+            log.warning("⚠️ Время импульсов неравномерно, файл записан в полном формате: %s", output_path)
+        else:
+            _write_compact(((p.provenance, axis, p.current, p.voltage) for p, axis in zip(pulses, axes)),
+                           output_path, float32)
+            count("write.pulses_written", len(pulses))
+            return
+
+    row = _full_row_format(float32)
+    with span("write.pulses"), atomic_write(output_path) as f:
+        f.write(_full_header(float32))
         for pulse in pulses:
-            f.write("start\t\t\n")
-            for t, i, v in zip(pulse.time, pulse.current, pulse.voltage):
-                f.write(f"{t}\t{i}\t{v}\n")
\ No newline at end of file
+            f.write(_start_line(pulse.provenance))
+            f.writelines(row.format(t, i, v) for t, i, v in zip(
+                np.asarray(pulse.time).tolist(), _samples(pulse.current, float32), _samples(pulse.voltage, float32)))
+    count("write.pulses_written", len(pulses))
+
+
+def _write_compact(items, output_path: Path, float32: bool) -> None:
+    """Компактный формат: строки тока и напряжения, ось времени в строке "start"."""
+    row = _row_format(float32)
+    with span("write.compact"), atomic_write(output_path) as f:
+        f.write(_compact_header(float32))
+        for provenance, axis, current, voltage in items:
+            if float32:
+                current, voltage = np.asarray(current, dtype=np.float32), np.asarray(voltage, dtype=np.float32)
+            f.write(_start_line(provenance, axis))
+            f.writelines(row.format(i, v) for i, v in zip(current.tolist(), voltage.tolist()))
+
+
+def write_pulse_batch(batch: PulseBatchModel, output_path: Path, compact: bool = False, float32: bool = False,
+                      codec: str = DEFAULT_CODEC, level: int = DEFAULT_LEVEL) -> None:
+    """Записывает пакет импульсов в тот же формат, что и write_pulses."""
+    if is_container(output_path):
+        with span("write.container"):
+            write_container(batch, output_path, codec=codec, level=level, float32=float32)
+        count("write.pulses_written", len(batch))
+        return
+    if compact:
+        axes = batch.uniform_time_axes()
+        if axes is None:
+            log.warning("⚠️ Время импульсов неравномерно, файл записан в полном формате: %s", output_path)
+        else:
+            t0, dt = axes
+            provenance = batch.provenance
+            items = (
+                (provenance.item(k) if provenance is not None else None,
+                 UniformTimeAxis(t0[k], dt[k], e - s), batch.current[s:e], batch.voltage[s:e])
+                for k, (s, e) in enumerate(zip(batch.starts.tolist(), batch.ends.tolist()))
+            )
+            _write_compact(items, output_path, float32)
+            count("write.pulses_written", len(batch))
+            return
+
+    time = batch.time.tolist()
+    current, voltage = _samples(batch.current, float32), _samples(batch.voltage, float32)
+    row = _full_row_format(float32)
+    with span("write.pulse_batch"), atomic_write(output_path) as f:
+        f.write(_full_header(float32))
+        provenance = batch.provenance
+        for k, (s, e) in enumerate(zip(batch.starts.tolist(), batch.ends.tolist())):
+            f.write(_start_line(provenance.item(k) if provenance is not None else None))
+            f.writelines(row.format(t, i, v) for t, i, v in zip(time[s:e], current[s:e], voltage[s:e]))
+    count("write.pulses_written", len(batch))
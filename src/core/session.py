@@ -0,0 +1,91 @@
+"""
+Сессия работы с данными: конфигурация путей и кэш производных путей.
+
+Конфиг data_config.json читается один раз и перечитывается только при
+изменении его mtime (проверка не чаще CHECK_INTERVAL секунд). Папки
+создаются лениво - при первой записи в них, а не при загрузке конфига.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from src.core.project_root import PROJECT_ROOT
+from src.models.config_models import DataConfigModel
+
+
+DEFAULT_DATA_CONFIG = Path("configs/data_config.json")
+# Как часто (секунды) проверять mtime конфига
+CHECK_INTERVAL = 1.0
+
+
+class DataSession:
+    """Кэширующая обёртка над DataConfigModel, общая для репозитория, анализа и CLI."""
+
+    def __init__(self, config_path: Path | None = None):
+        config_path = config_path or DEFAULT_DATA_CONFIG
+        if not config_path.is_absolute():
+            config_path = PROJECT_ROOT / config_path
+        self.config_path = config_path
+        self._lock = threading.Lock()
+        self._config: Optional[DataConfigModel] = None
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._selections_paths: dict[Path, Path] = {}
+        self._ensured: set[Path] = set()
+
+    def _stat_mtime(self) -> Optional[float]:
+        try:
+            return self.config_path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+
+    @property
+    def config(self) -> DataConfigModel:
+        """Текущая конфигурация; перечитывается, если файл конфига изменился."""
+        with self._lock:
+            now = time.monotonic()
+            if self._config is not None and now - self._checked_at < CHECK_INTERVAL:
+                return self._config
+            self._checked_at = now
+            mtime = self._stat_mtime()
+            if self._config is None or mtime != self._mtime:
+                from src.core.config_loader import load_data_config
+                self._config = load_data_config(self.config_path)
+                self._mtime = self._stat_mtime()
+                self._selections_paths.clear()
+                self._ensured.clear()
+            return self._config
+
+    def ensure_dir(self, path: Path) -> Path:
+        """Создаёт папку при первом обращении в рамках сессии и возвращает её."""
+        if path not in self._ensured:
+            path.mkdir(parents=True, exist_ok=True)
+            self._ensured.add(path)
+        return path
+
+    def selections_path(self, pulses_path: Path) -> Path:
+        """Путь к selections по умолчанию для файла импульсов (кэшируется)."""
+        config = self.config
+        path = self._selections_paths.get(pulses_path)
+        if path is None:
+            path = config.selections_folder / f"{pulses_path.stem}_selections.json"
+            self._selections_paths[pulses_path] = path
+        return path
+
+    def output_dir(self, subfolder: Path | str) -> Path:
+        """Подпапка outputs (approved, validation, analysis, ...), созданная при необходимости."""
+        return self.ensure_dir(self.config.outputs_folder / subfolder)
+
+
+_sessions: dict[Path, DataSession] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(config_path: Path | None = None) -> DataSession:
+    """Возвращает общую сессию для файла конфигурации (создаёт при первом вызове)."""
+    probe = DataSession(config_path)
+    with _sessions_lock:
+        return _sessions.setdefault(probe.config_path, probe)
@@ -0,0 +1,140 @@
+"""
+Журнал решений по одобрению импульсов.
+
+Каждое переключение approved в GUI дописывается одной строкой JSON Lines
+в файл ``<stem>_selections.journal`` рядом с файлом селекций. Запись и
+периодическое уплотнение журнала в ``*_selections.json`` выполняются
+фоновым потоком, поэтому UI не ждёт диска. И то и другое идёт под
+блокировкой selections (см. atomic_io.file_lock), чтобы запись другого
+процесса не потерялась между чтением журнала и его удалением.
+"""
+from __future__ import annotations
+
+import json
+import os
+import queue
+import threading
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+from src.core.atomic_io import file_lock
+
+
+# Количество записей в журнале файла, после которого запускается уплотнение
+COMPACT_EVERY = 500
+
+
+def replay_journal(journal_path: Path, approved) -> np.ndarray:
+    """Применяет записи журнала к маске approved (по индексам исходного файла).
+
+    Обрезанная последняя строка (падение во время записи) и записи с индексом
+    вне диапазона пропускаются.
+    """
+    result = np.array(approved, dtype=bool)
+    if not journal_path.exists():
+        return result
+
+    with open(journal_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                idx = int(record["i"])
+                value = bool(record["approved"])
+            except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+                continue
+            if 0 <= idx < len(result):
+                result[idx] = value
+    return result
+
+
+class ApprovalJournal:
+    """Асинхронный журнал одобрений с фоновым уплотнением в selections."""
+
+    def __init__(self, compact_every: int = COMPACT_EVERY):
+        self.compact_every = compact_every
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._pending: dict[Path, int] = {}
+        self._totals: dict[Path, int] = {}
+        self._thread = threading.Thread(target=self._worker, name="approval-journal", daemon=True)
+        self._thread.start()
+
+    def record(self, pulses_path: Path, pulse_index: int, approved: bool, total: int) -> None:
+        """Ставит в очередь запись решения по импульсу (не блокирует вызывающего)."""
+        self._queue.put(("append", pulses_path, pulse_index, approved, total))
+
+    def compact(self, pulses_path: Path, total: int,
+                on_done: Optional[Callable[[Path], None]] = None) -> None:
+        """Ставит в очередь уплотнение журнала файла в его selections."""
+        self._queue.put(("compact", pulses_path, total, on_done))
+
+    def flush(self) -> None:
+        """Ждёт, пока все поставленные в очередь операции будут выполнены."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Уплотняет непустые журналы и останавливает фоновый поток."""
+        from src.data.pulses_repository import PulsesRepository
+
+        self.flush()
+        for pulses_path, total in list(self._totals.items()):
+            # Журнал уже уплотнён (или удалён) - selections переписывать незачем
+            if PulsesRepository.default_journal_path(pulses_path).exists():
+                self.compact(pulses_path, total)
+        self._queue.put(None)
+        self._thread.join()
+
+    def _worker(self) -> None:
+        while True:
+            task = self._queue.get()
+            try:
+                if task is None:
+                    return
+                if task[0] == "append":
+                    _, pulses_path, pulse_index, approved, total = task
+                    self._append(pulses_path, pulse_index, approved, total)
+                elif task[0] == "compact":
+                    _, pulses_path, total, on_done = task
+                    self._compact(pulses_path, total)
+                    if on_done is not None:
+                        on_done(pulses_path)
+            except Exception as e:
+                print(f"⚠️ Ошибка журнала одобрений: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _append(self, pulses_path: Path, pulse_index: int, approved: bool, total: int) -> None:
+        from src.data.pulses_repository import PulsesRepository
+        from src.core.session import get_session
+
+        journal_path = PulsesRepository.default_journal_path(pulses_path)
+        get_session().ensure_dir(journal_path.parent)
+        with file_lock(PulsesRepository.default_selections_path(pulses_path)), \
+                open(journal_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"i": pulse_index, "approved": approved}) + "\n")
+            f.flush()
+            # Решение пользователя должно пережить падение питания; fsync идёт в фоновом потоке
+            os.fsync(f.fileno())
+
+        self._totals[pulses_path] = total
+        self._pending[pulses_path] = self._pending.get(pulses_path, 0) + 1
+        if self._pending[pulses_path] >= self.compact_every:
+            self._compact(pulses_path, total)
+
+    def _compact(self, pulses_path: Path, total: int) -> None:
+        from src.data.pulses_repository import PulsesRepository
+
+        selections_path = PulsesRepository.default_selections_path(pulses_path)
+        journal_path = PulsesRepository.default_journal_path(pulses_path)
+
+        with file_lock(selections_path):
+            if selections_path.exists():
+                approved = PulsesRepository.read_selections_mask(selections_path, total, pulses_path.name)
+            else:
+                approved = np.ones(total, dtype=bool)
+            approved = replay_journal(journal_path, approved)
+
+            PulsesRepository.write_selections(pulses_path, approved, lock=False)
+            journal_path.unlink(missing_ok=True)
+        self._pending[pulses_path] = 0
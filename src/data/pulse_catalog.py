@@ -0,0 +1,445 @@
+"""
+Локальный каталог импульсов на SQLite.
+
+Для каждого файла импульсов хранится mtime/размер, для каждого импульса -
+байтовое смещение в файле, число отсчётов, хеш содержимого, ключ
+происхождения, одобрение и рассчитанные метрики. Запросы вида «все
+одобренные импульсы с зарядом > X» выполняются по индексу и возвращают
+дескрипторы, которые загружают импульс лениво; хеши позволяют сравнивать
+прогоны без чтения файлов (см. pulse_diff).
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import mmap
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+from pydantic import BaseModel, ConfigDict
+
+from src.models.pulse_models import PulseModel
+
+
+CATALOG_FILE_NAME = "pulse_catalog.sqlite"
+METRIC_COLUMNS = ("charge", "peak", "duration", "score")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    pulse_count INTEGER NOT NULL,
+    selections_mtime REAL
+);
+CREATE TABLE IF NOT EXISTS pulses (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    pulse_index INTEGER NOT NULL,
+    byte_offset INTEGER NOT NULL,
+    n_samples INTEGER NOT NULL,
+    approved INTEGER NOT NULL DEFAULT 1,
+    charge REAL,
+    peak REAL,
+    duration REAL,
+    score REAL,
+    content_hash TEXT,
+    pulse_key TEXT,
+    PRIMARY KEY (file_id, pulse_index)
+);
+CREATE INDEX IF NOT EXISTS idx_pulses_approved_charge ON pulses(approved, charge);
+CREATE INDEX IF NOT EXISTS idx_pulses_charge ON pulses(charge);
+"""
+
+
+class PulseHandle(BaseModel):
+    """Ссылка на импульс в файле; сам импульс читается только в load()."""
+    file_path: Path
+    pulse_index: int
+    byte_offset: int
+    n_samples: int
+    approved: bool
+    charge: Optional[float] = None
+    peak: Optional[float] = None
+    duration: Optional[float] = None
+    score: Optional[float] = None
+
+    def load(self) -> PulseModel:
+        from src.validation.pulse_loader import load_pulse_at
+        return load_pulse_at(self.file_path, self.byte_offset, self.n_samples)
+
+
+class PulseDigestsModel(BaseModel):
+    """Индекс импульсов файла: смещение данных, число отсчётов, хеш содержимого и ключ происхождения."""
+    offsets: np.ndarray
+    n_samples: np.ndarray
+    digests: list[str]
+    keys: list[str]
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    def __len__(self) -> int:
+        return len(self.digests)
+
+
+def _count_lines(block: bytes) -> int:
+    """Число непустых строк блока данных с концами LF (пустые строки загрузчик пропускает)."""
+    if not block:
+        return 0
+    if b"\n\n" in block or block.startswith(b"\n"):
+        return sum(1 for line in block.split(b"\n") if line.strip())
+    return block.count(b"\n") + (not block.endswith(b"\n"))
+
+
+def pulse_key(start_line: str, ordinal: int) -> str:
+    """Ключ импульса для сопоставления прогонов: <файл>:<селекция> или #<номер> без происхождения."""
+    parts = start_line.split("\t")
+    if len(parts) >= 3 and parts[1] and parts[2]:
+        return f"{parts[1]}:{parts[2].split(':')[0]}"
+    return f"#{ordinal}"
+
+
+def scan_pulse_digests(file_path: Path) -> PulseDigestsModel:
+    """Один проход по текстовому файлу без разбора чисел.
+
+    Строки "start" ищутся поиском подстроки в mmap, так что цикл Python идёт
+    по импульсам, а не по строкам. Хеш SHA-1 (для обнаружения изменений, а
+    не для защиты) берётся от байтов данных с концами строк, приведёнными к
+    LF, и от оси времени компактного формата из строки "start";
+    происхождение в хеш не входит - оно служит ключом.
+    """
+    offsets: list[int] = []
+    counts: list[int] = []
+    digests: list[str] = []
+    keys: list[str] = []
+    with open(file_path, "rb") as f:
+        size = f.seek(0, 2)
+        if size == 0:
+            return PulseDigestsModel(offsets=np.empty(0, np.int64), n_samples=np.empty(0, np.int64),
+                                     digests=[], keys=[])
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            header_end = mm.find(b"\n")
+            markers = []
+            pos = mm.find(b"\nstart", header_end) if header_end >= 0 else -1
+            while pos >= 0:
+                markers.append(pos + 1)
+                pos = mm.find(b"\nstart", pos + 1)
+            markers.append(size)
+            for marker, next_marker in zip(markers, markers[1:]):
+                line_end = mm.find(b"\n", marker, next_marker)
+                data_start = next_marker if line_end < 0 else line_end + 1
+                block = mm[data_start:next_marker]
+                if b"\r" in block:
+                    block = block.replace(b"\r\n", b"\n")
+                n = _count_lines(block)
+                # Пустые «импульсы» загрузчик пропускает, поэтому и здесь их не индексируем
+                if n == 0:
+                    continue
+                start_line = mm[marker:data_start].decode("utf-8").rstrip("\r\n")
+                digest = hashlib.sha1(usedforsecurity=False)
+                digest.update("\t".join(start_line.split("\t")[3:]).encode("utf-8") + b"\n")
+                digest.update(block)
+                offsets.append(data_start)
+                counts.append(n)
+                digests.append(digest.hexdigest())
+                keys.append(pulse_key(start_line, len(keys)))
+    return PulseDigestsModel(offsets=np.array(offsets, dtype=np.int64), n_samples=np.array(counts, dtype=np.int64),
+                             digests=digests, keys=keys)
+
+
+def scan_pulse_offsets(file_path: Path) -> tuple[list[int], list[int]]:
+    """Один проход по текстовому файлу: смещение первых данных и число отсчётов каждого импульса."""
+    index = scan_pulse_digests(file_path)
+    return index.offsets.tolist(), index.n_samples.tolist()
+
+
+def _selections_mtime(pulses_path: Path) -> Optional[float]:
+    """Максимальный mtime selections и журнала по умолчанию (None, если их нет)."""
+    from src.data.pulses_repository import PulsesRepository
+
+    mtimes = [
+        p.stat().st_mtime
+        for p in (PulsesRepository.default_selections_path(pulses_path),
+                  PulsesRepository.default_journal_path(pulses_path))
+        if p.exists()
+    ]
+    return max(mtimes) if mtimes else None
+
+
+def _read_approved(pulses_path: Path, total: int) -> np.ndarray:
+    """Текущие одобрения файла: selections по умолчанию + журнал."""
+    from src.data.pulses_repository import PulsesRepository
+    from src.data.approval_journal import replay_journal
+
+    selections_path = PulsesRepository.default_selections_path(pulses_path)
+    approved = np.ones(total, dtype=bool)
+    if selections_path.exists():
+        approved = PulsesRepository.read_selections_mask(selections_path, total, pulses_path.name)
+    return replay_journal(PulsesRepository.default_journal_path(pulses_path), approved)
+
+
+class PulseCatalog:
+    """Каталог файлов и импульсов с инкрементальным обновлением."""
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(_SCHEMA)
+
+    @classmethod
+    def default(cls, data_config=None) -> "PulseCatalog":
+        """Каталог в папке processed из конфигурации данных."""
+        if data_config is None:
+            from src.core.session import get_session
+            data_config = get_session().config
+        return cls(data_config.processed_folder / CATALOG_FILE_NAME)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA journal_mode = WAL")
+        return conn
+
+    @staticmethod
+    def _key(path: Path) -> str:
+        return str(Path(path).resolve())
+
+    def _file_row(self, conn: sqlite3.Connection, path: Path):
+        return conn.execute(
+            "SELECT id, mtime, size, pulse_count, selections_mtime FROM files WHERE path = ?",
+            (self._key(path),),
+        ).fetchone()
+
+    def is_current(self, path: Path) -> bool:
+        """True, если файл проиндексирован и не менялся с момента индексации."""
+        if not path.exists():
+            return False
+        st = path.stat()
+        with closing(self._connect()) as conn:
+            row = self._file_row(conn, path)
+        return row is not None and row[1] == st.st_mtime and row[2] == st.st_size
+
+    def index_pulse_file(self, path: Path, force: bool = False) -> int:
+        """Индексирует файл импульсов (если изменился) и возвращает число импульсов."""
+        st = path.stat()
+        with closing(self._connect()) as conn, conn:
+            row = self._file_row(conn, path)
+            if row is not None and not force and row[1] == st.st_mtime and row[2] == st.st_size:
+                self._sync_approvals(conn, path, row)
+                self._fill_digests(conn, path, row)
+                return row[3]
+
+            index = scan_pulse_digests(path)
+            approved = _read_approved(path, len(index))
+            if row is not None:
+                conn.execute("DELETE FROM files WHERE id = ?", (row[0],))
+            cur = conn.execute(
+                "INSERT INTO files (path, mtime, size, pulse_count, selections_mtime) VALUES (?, ?, ?, ?, ?)",
+                (self._key(path), st.st_mtime, st.st_size, len(index), _selections_mtime(path)),
+            )
+            file_id = cur.lastrowid
+            conn.executemany(
+                "INSERT INTO pulses (file_id, pulse_index, byte_offset, n_samples, approved, content_hash, pulse_key) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((file_id, k, off, n, int(ok), digest, key) for k, (off, n, ok, digest, key) in enumerate(
+                    zip(index.offsets.tolist(), index.n_samples.tolist(), approved, index.digests, index.keys))),
+            )
+        return len(index)
+
+    @staticmethod
+    def _fill_digests(conn: sqlite3.Connection, path: Path, row) -> None:
+        """Дополняет хешами импульсы, проиндексированные до их появления, не трогая метрики."""
+        missing = conn.execute(
+            "SELECT COUNT(*) FROM pulses WHERE file_id = ? AND content_hash IS NULL", (row[0],)
+        ).fetchone()[0]
+        if not missing:
+            return
+        index = scan_pulse_digests(path)
+        if len(index) != row[3]:
+            return
+        conn.executemany(
+            "UPDATE pulses SET content_hash = ?, pulse_key = ? WHERE file_id = ? AND pulse_index = ?",
+            ((digest, key, row[0], k) for k, (digest, key) in enumerate(zip(index.digests, index.keys))),
+        )
+
+    def _sync_approvals(self, conn: sqlite3.Connection, path: Path, row) -> None:
+        """Перечитывает одобрения, если selections или журнал изменились после индексации."""
+        sel_mtime = _selections_mtime(path)
+        if sel_mtime == row[4]:
+            return
+        approved = _read_approved(path, row[3])
+        self._write_approvals(conn, row[0], approved)
+        conn.execute("UPDATE files SET selections_mtime = ? WHERE id = ?", (sel_mtime, row[0]))
+
+    @staticmethod
+    def _write_approvals(conn: sqlite3.Connection, file_id: int, approved: Sequence[bool]) -> None:
+        conn.executemany(
+            "UPDATE pulses SET approved = ? WHERE file_id = ? AND pulse_index = ?",
+            ((int(bool(ok)), file_id, k) for k, ok in enumerate(approved)),
+        )
+
+    def update_approvals(self, path: Path, approved: Sequence[bool]) -> None:
+        """Записывает одобрения файла (если файл есть в каталоге)."""
+        with closing(self._connect()) as conn, conn:
+            row = self._file_row(conn, path)
+            if row is None:
+                return
+            if len(approved) != row[3]:
+                raise ValueError(f"Длина selections {len(approved)} != числу импульсов {row[3]}")
+            self._write_approvals(conn, row[0], approved)
+            conn.execute("UPDATE files SET selections_mtime = ? WHERE id = ?", (_selections_mtime(path), row[0]))
+
+    def update_metrics(self, path: Path, indices: Sequence[int], **metrics: Sequence[float]) -> None:
+        """Записывает метрики (charge, peak, duration, score) для импульсов с данными индексами."""
+        unknown = set(metrics) - set(METRIC_COLUMNS)
+        if unknown:
+            raise ValueError(f"Неизвестные метрики: {sorted(unknown)}")
+        if not metrics:
+            return
+        columns = list(metrics)
+        assignments = ", ".join(f"{c} = ?" for c in columns)
+        with closing(self._connect()) as conn, conn:
+            row = self._file_row(conn, path)
+            if row is None:
+                return
+            values = [np.asarray(metrics[c], dtype=np.float64) for c in columns]
+            conn.executemany(
+                f"UPDATE pulses SET {assignments} WHERE file_id = ? AND pulse_index = ?",
+                ((*(float(v[j]) for v in values), row[0], int(idx)) for j, idx in enumerate(indices)),
+            )
+
+    def cached_metric(self, path: Path, metric: str = "charge", approved_only: bool = True) -> Optional[np.ndarray]:
+        """Метрика из каталога без чтения файла; None, если файл устарел или метрика посчитана не для всех."""
+        if metric not in METRIC_COLUMNS:
+            raise ValueError(f"Неизвестная метрика: {metric}")
+        if not self.is_current(path):
+            return None
+        with closing(self._connect()) as conn, conn:
+            row = self._file_row(conn, path)
+            self._sync_approvals(conn, path, row)
+            where = "file_id = ?" + (" AND approved = 1" if approved_only else "")
+            values = [r[0] for r in conn.execute(
+                f"SELECT {metric} FROM pulses WHERE {where} ORDER BY pulse_index", (row[0],)
+            )]
+        if any(v is None for v in values):
+            return None
+        return np.array(values, dtype=np.float64)
+
+    def cached_digests(self, path: Path) -> Optional[PulseDigestsModel]:
+        """Хеши импульсов из каталога без чтения файла; None, если файл устарел или проиндексирован до хешей."""
+        if not self.is_current(path):
+            return None
+        with closing(self._connect()) as conn:
+            row = self._file_row(conn, path)
+            rows = conn.execute(
+                "SELECT byte_offset, n_samples, content_hash, pulse_key FROM pulses "
+                "WHERE file_id = ? ORDER BY pulse_index", (row[0],)
+            ).fetchall()
+        if any(r[2] is None for r in rows):
+            return None
+        return PulseDigestsModel(
+            offsets=np.array([r[0] for r in rows], dtype=np.int64),
+            n_samples=np.array([r[1] for r in rows], dtype=np.int64),
+            digests=[r[2] for r in rows],
+            keys=[r[3] for r in rows],
+        )
+
+    def query(
+            self,
+            approved: Optional[bool] = None,
+            min_charge: Optional[float] = None,
+            max_charge: Optional[float] = None,
+            file_path: Optional[Path] = None,
+            limit: Optional[int] = None,
+    ) -> list[PulseHandle]:
+        """Ищет импульсы по индексу и возвращает ленивые дескрипторы."""
+        clauses, params = [], []
+        if approved is not None:
+            clauses.append("p.approved = ?")
+            params.append(int(approved))
+        if min_charge is not None:
+            clauses.append("p.charge >= ?")
+            params.append(min_charge)
+        if max_charge is not None:
+            clauses.append("p.charge <= ?")
+            params.append(max_charge)
+        if file_path is not None:
+            clauses.append("f.path = ?")
+            params.append(self._key(file_path))
+        sql = (
+            "SELECT f.path, p.pulse_index, p.byte_offset, p.n_samples, p.approved, "
+            "p.charge, p.peak, p.duration, p.score "
+            "FROM pulses p JOIN files f ON f.id = p.file_id"
+        )
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY f.path, p.pulse_index"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        with closing(self._connect()) as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [
+            PulseHandle(
+                file_path=Path(r[0]), pulse_index=r[1], byte_offset=r[2], n_samples=r[3],
+                approved=bool(r[4]), charge=r[5], peak=r[6], duration=r[7], score=r[8],
+            )
+            for r in rows
+        ]
+
+    def files(self) -> list[Path]:
+        with closing(self._connect()) as conn:
+            return [Path(r[0]) for r in conn.execute("SELECT path FROM files ORDER BY path")]
+
+
+def update_catalog_safely(action, *args, **kwargs) -> None:
+    """Вызывает метод каталога по умолчанию, не прерывая основную работу при ошибке."""
+    try:
+        action(PulseCatalog.default(), *args, **kwargs)
+    except Exception as e:
+        print(f"⚠️ Не удалось обновить каталог импульсов: {e}")
+
+
+def main(argv: Iterable[str] | None = None):
+    """CLI каталога: индексация файлов и запросы."""
+    parser = argparse.ArgumentParser(description="Каталог импульсов (SQLite)")
+    parser.add_argument("--db", type=Path, default=None, help="Путь к базе каталога (по умолчанию: processed/pulse_catalog.sqlite)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_index = sub.add_parser("index", help="Проиндексировать файлы импульсов")
+    p_index.add_argument("paths", type=Path, nargs="*", help="Файлы .txt (по умолчанию: все в processed)")
+    p_index.add_argument("--force", action="store_true", help="Переиндексировать даже неизменённые файлы")
+
+    p_query = sub.add_parser("query", help="Найти импульсы")
+    p_query.add_argument("--approved", action="store_true", help="Только одобренные")
+    p_query.add_argument("--rejected", action="store_true", help="Только отклонённые")
+    p_query.add_argument("--min-charge", type=float, default=None, help="Минимальный заряд (Кл)")
+    p_query.add_argument("--max-charge", type=float, default=None, help="Максимальный заряд (Кл)")
+    p_query.add_argument("--file", type=Path, default=None, help="Только импульсы этого файла")
+    p_query.add_argument("--limit", type=int, default=None, help="Максимум результатов")
+
+    args = parser.parse_args(argv)
+
+    from src.core.session import get_session
+    data_config = get_session().config
+    catalog = PulseCatalog(args.db) if args.db else PulseCatalog.default(data_config)
+
+    if args.command == "index":
+        paths = args.paths or sorted(data_config.processed_folder.glob("*.txt"))
+        for path in paths:
+            count = catalog.index_pulse_file(path, force=args.force)
+            print(f"📇 {path.name}: {count} импульсов")
+    else:
+        approved = True if args.approved else (False if args.rejected else None)
+        handles = catalog.query(approved, args.min_charge, args.max_charge, args.file, args.limit)
+        for h in handles:
+            charge = f"{h.charge:.3e}" if h.charge is not None else "—"
+            print(f"{h.file_path.name}\t{h.pulse_index}\t{'✓' if h.approved else '✗'}\t{charge}")
+        print(f"🔎 Найдено импульсов: {len(handles)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""
+Сжатый контейнер импульсов: независимо сжатые блоки по K импульсов и индекс.
+
+Файл <имя>.pulsez устроен так:
+    MAGIC | блок 0 | блок 1 | ... | индекс (JSON) | длина индекса (8 байт) | MAGIC
+Блок - сжатые подряд записанные массивы пакета из chunk_pulses импульсов
+(длины, ток, напряжение, время или оси t0/dt, происхождение); какие
+массивы и какого типа лежат в блоке, описано в его записи индекса.
+Читатель распаковывает только нужные блоки, писатель добавляет блоки в
+конец и переписывает индекс при закрытии, поэтому файл можно дописывать
+и писать потоком без буферизации всех импульсов. Кодеки - zlib и lzma из
+стандартной библиотеки (или none без сжатия).
+"""
+from __future__ import annotations
+
+import lzma
+import os
+import shutil
+import struct
+import zlib
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+from src.models.pulse_batch_models import PulseBatchModel, BatchProvenanceModel, BatchTimeAxes
+from src.core.atomic_io import durable_replace
+
+
+CONTAINER_SUFFIX = ".pulsez"
+CONTAINER_VERSION = 1
+MAGIC = b"PULSEZ01"
+_TRAILER = struct.Struct("<Q8s")
+CODECS = ("zlib", "lzma", "none")
+DEFAULT_CODEC = "zlib"
+DEFAULT_LEVEL = 6
+DEFAULT_CHUNK_PULSES = 256
+
+
+class ChunkArrayModel(BaseModel):
+    name: str
+    dtype: str
+    count: int
+
+
+class ChunkModel(BaseModel):
+    offset: int
+    length: int
+    pulse_count: int
+    first_pulse: int
+    sources: Optional[list[str]] = None
+    arrays: list[ChunkArrayModel]
+
+
+class ContainerIndexModel(BaseModel):
+    version: int = CONTAINER_VERSION
+    codec: str
+    level: int
+    chunk_pulses: int
+    total_pulses: int = 0
+    chunks: list[ChunkModel] = []
+
+
+def is_container(path: Path) -> bool:
+    return path.suffix == CONTAINER_SUFFIX
+
+
+def _compress(data: bytes, codec: str, level: int) -> bytes:
+    if codec == "zlib":
+        return zlib.compress(data, level)
+    if codec == "lzma":
+        return lzma.compress(data, preset=level)
+    return data
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zlib":
+        return zlib.decompress(data)
+    if codec == "lzma":
+        return lzma.decompress(data)
+    return data
+
+
+def _chunk_arrays(batch: PulseBatchModel, float32: bool) -> list[tuple[str, np.ndarray]]:
+    """Массивы блока; равномерное время хранится осями t0/dt, как в компактном текстовом формате."""
+    dtype = np.float32 if float32 else batch.current.dtype
+    arrays = [("lengths", batch.lengths.astype(np.int64)),
+              ("current", np.ascontiguousarray(batch.current, dtype=dtype)),
+              ("voltage", np.ascontiguousarray(batch.voltage, dtype=dtype))]
+    axes = batch.uniform_time_axes()
+    if axes is not None:
+        arrays += [("t0", axes[0]), ("dt", axes[1])]
+    else:
+        arrays.append(("time", np.ascontiguousarray(batch.time)))
+    if batch.provenance is not None:
+        p = batch.provenance
+        arrays += [("source_ids", p.source_ids), ("selection_index", p.selection_index),
+                   ("sample_start", p.sample_start), ("sample_end", p.sample_end)]
+    return arrays
+
+
+def _read_index(f, path: Path) -> tuple[ContainerIndexModel, int]:
+    """Индекс и смещение его начала (там же начинаются новые блоки при дописывании)."""
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    if size < len(MAGIC) + _TRAILER.size:
+        raise ValueError(f"Файл слишком мал для контейнера импульсов: {path}")
+    f.seek(0)
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError(f"Не контейнер импульсов: {path}")
+    f.seek(size - _TRAILER.size)
+    index_len, magic = _TRAILER.unpack(f.read(_TRAILER.size))
+    if magic != MAGIC:
+        raise ValueError(f"Контейнер не закрыт (нет индекса): {path}")
+    index_start = size - _TRAILER.size - index_len
+    f.seek(index_start)
+    index = ContainerIndexModel.model_validate_json(f.read(index_len))
+    if index.version != CONTAINER_VERSION:
+        raise ValueError(f"Неподдерживаемая версия контейнера {index.version}: {path}")
+    return index, index_start
+
+
+class PulseContainerWriter:
+    """Потоковая запись контейнера: append() копит импульсы и сбрасывает полные блоки.
+
+        with PulseContainerWriter(path, codec="lzma", level=6) as writer:
+            for batch in batches:
+                writer.append(batch)
+
+    append=True дописывает блоки в существующий контейнер (кодек и размер
+    блока берутся из его индекса). Дописывание идёт в копию <имя>.tmp,
+    которая заменяет контейнер при close(); до этого (и после падения или
+    исключения) path остаётся прежним закрытым контейнером.
+    """
+
+    def __init__(self, path: Path, codec: str = DEFAULT_CODEC, level: int = DEFAULT_LEVEL,
+                 chunk_pulses: int = DEFAULT_CHUNK_PULSES, float32: bool = False, append: bool = False):
+        if codec not in CODECS:
+            raise ValueError(f"Неизвестный кодек {codec!r}, допустимы: {', '.join(CODECS)}")
+        if chunk_pulses <= 0:
+            raise ValueError("chunk_pulses должен быть положительным")
+        self.path = path
+        self.float32 = float32
+        self._pending: list[PulseBatchModel] = []
+        self._pending_pulses = 0
+        self._tmp: Optional[Path] = None
+        if append and path.exists():
+            with open(path, "rb") as f:
+                self.index, position = _read_index(f, path)
+            self._tmp = path.with_name(path.name + ".tmp")
+            shutil.copyfile(path, self._tmp)
+            self._file = open(self._tmp, "r+b")
+            self._file.seek(position)
+            self._file.truncate()
+        else:
+            self._file = open(path, "wb")
+            self._file.write(MAGIC)
+            self.index = ContainerIndexModel(codec=codec, level=level, chunk_pulses=chunk_pulses)
+
+    def __enter__(self) -> "PulseContainerWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None and self._tmp is not None:
+            self._file.close()
+            self._tmp.unlink(missing_ok=True)
+            return
+        self.close()
+
+    def append(self, batch: PulseBatchModel) -> None:
+        if len(batch) == 0:
+            return
+        self._pending.append(batch)
+        self._pending_pulses += len(batch)
+        size = self.index.chunk_pulses
+        if self._pending_pulses >= size:
+            merged = PulseBatchModel.concatenate(self._pending)
+            full = len(merged) // size * size
+            for s in range(0, full, size):
+                self._write_chunk(merged.slice(s, s + size))
+            rest = merged.slice(full, len(merged))
+            self._pending = [rest] if len(rest) else []
+            self._pending_pulses = len(rest)
+
+    def _write_chunk(self, batch: PulseBatchModel) -> None:
+        arrays = _chunk_arrays(batch, self.float32)
+        payload = b"".join(np.ascontiguousarray(a).tobytes() for _, a in arrays)
+        data = _compress(payload, self.index.codec, self.index.level)
+        offset = self._file.tell()
+        self._file.write(data)
+        self.index.chunks.append(ChunkModel(
+            offset=offset,
+            length=len(data),
+            pulse_count=len(batch),
+            first_pulse=self.index.total_pulses,
+            sources=batch.provenance.sources if batch.provenance is not None else None,
+            arrays=[ChunkArrayModel(name=name, dtype=a.dtype.str, count=a.size) for name, a in arrays],
+        ))
+        self.index.total_pulses += len(batch)
+
+    def close(self) -> None:
+        """Сбрасывает неполный блок и записывает индекс; до этого файл не читается."""
+        if self._file.closed:
+            return
+        if self._pending:
+            self._write_chunk(PulseBatchModel.concatenate(self._pending))
+            self._pending, self._pending_pulses = [], 0
+        index = self.index.model_dump_json().encode("utf-8")
+        self._file.write(index)
+        self._file.write(_TRAILER.pack(len(index), MAGIC))
+        self._file.close()
+        if self._tmp is not None:
+            durable_replace(self._tmp, self.path)
+
+
+class PulseContainer:
+    """Чтение контейнера: распаковываются только блоки с нужными импульсами."""
+
+    def __init__(self, path: Path):
+        if not path.exists():
+            raise FileNotFoundError(f"Контейнер импульсов не найден: {path}")
+        self.path = path
+        with open(path, "rb") as f:
+            self.index, _ = _read_index(f, path)
+        self._starts = np.array([c.first_pulse for c in self.index.chunks], dtype=np.int64)
+
+    def __len__(self) -> int:
+        return self.index.total_pulses
+
+    def read_chunk(self, k: int) -> PulseBatchModel:
+        chunk = self.index.chunks[k]
+        with open(self.path, "rb") as f:
+            f.seek(chunk.offset)
+            payload = bytearray(_decompress(f.read(chunk.length), self.index.codec))
+        arrays, position = {}, 0
+        for spec in chunk.arrays:
+            dtype = np.dtype(spec.dtype)
+            arrays[spec.name] = np.frombuffer(payload, dtype=dtype, count=spec.count, offset=position)
+            position += spec.count * dtype.itemsize
+        lengths = arrays["lengths"]
+        if "time" in arrays:
+            time = arrays["time"]
+        else:
+            time = BatchTimeAxes(arrays["t0"], arrays["dt"], np.concatenate(([0], np.cumsum(lengths))))
+        provenance = None
+        if chunk.sources is not None:
+            provenance = BatchProvenanceModel(
+                sources=chunk.sources, source_ids=arrays["source_ids"], selection_index=arrays["selection_index"],
+                sample_start=arrays["sample_start"], sample_end=arrays["sample_end"])
+        return PulseBatchModel(time=time, current=arrays["current"], voltage=arrays["voltage"],
+                               offsets=np.concatenate(([0], np.cumsum(lengths))).astype(np.int64),
+                               provenance=provenance)
+
+    def read_pulses(self, start: int, stop: int) -> PulseBatchModel:
+        """Импульсы [start, stop): читаются только пересекающиеся блоки."""
+        start, stop = max(start, 0), min(stop, len(self))
+        if stop <= start:
+            return PulseBatchModel.from_pulses([])
+        first = int(np.searchsorted(self._starts, start, side="right")) - 1
+        last = int(np.searchsorted(self._starts, stop, side="left"))
+        batch = PulseBatchModel.concatenate([self.read_chunk(k) for k in range(first, last)])
+        base = int(self._starts[first])
+        return batch.slice(start - base, stop - base)
+
+    def read_batch(self) -> PulseBatchModel:
+        return PulseBatchModel.concatenate([self.read_chunk(k) for k in range(len(self.index.chunks))])
+
+
+def write_container(batches: Iterable[PulseBatchModel] | PulseBatchModel, path: Path,
+                    codec: str = DEFAULT_CODEC, level: int = DEFAULT_LEVEL,
+                    chunk_pulses: int = DEFAULT_CHUNK_PULSES, float32: bool = False) -> ContainerIndexModel:
+    """Записывает пакет (или поток пакетов) в контейнер через временный файл."""
+    if isinstance(batches, PulseBatchModel):
+        batches = [batches]
+    tmp = path.with_name(path.name + ".tmp")
+    with PulseContainerWriter(tmp, codec=codec, level=level, chunk_pulses=chunk_pulses, float32=float32) as writer:
+        for batch in batches:
+            writer.append(batch)
+    durable_replace(tmp, path)
+    return writer.index
+
+
+def load_container_batch(path: Path) -> PulseBatchModel:
+    return PulseContainer(path).read_batch()
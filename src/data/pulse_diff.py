@@ -0,0 +1,269 @@
+"""
+Сравнение двух прогонов извлечения импульсов.
+
+Каждый импульс представлен хешем содержимого и ключом происхождения
+(<захват>:<селекция>, см. pulse_catalog). Сопоставление линейное:
+сначала импульсы с одинаковым хешем (не изменились, даже если сдвинулись),
+затем оставшиеся с одинаковым ключом (изменились), остальное - добавлено
+или удалено. Для текстовых файлов хеши считаются по байтам без разбора
+чисел или берутся из каталога, если файл не менялся с индексации; заряды
+считаются только для изменившихся импульсов, неизменившиеся не читаются.
+Манифесты, контейнеры и виртуальные наборы (и пара из разных форматов)
+загружаются целиком, и хешируются массивы импульсов; хеш чувствителен к
+любому изменению значений, поэтому текст против контейнера с float32 или
+восстановленной осью времени покажет импульсы изменёнными (с разностью
+зарядов на уровне округления).
+
+    python -m src.data.pulse_diff old/extracted_pulses.txt new/extracted_pulses.txt --json diff.json
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+from src.core.instrumentation import add_instrumentation_arguments, configure_logging, get_logger, profile_session
+from src.data.pulse_catalog import PulseCatalog, PulseDigestsModel, pulse_key, scan_pulse_digests
+from src.models.pulse_batch_models import PulseBatchModel
+
+
+DEFAULT_SHOW = 10
+
+log = get_logger("diff")
+
+
+class ChargeGroupModel(BaseModel):
+    """Сводка зарядов группы импульсов (Кл)."""
+    count: int
+    total: float
+    mean: Optional[float] = None
+    std: Optional[float] = None
+
+    @classmethod
+    def from_charges(cls, charges: np.ndarray) -> "ChargeGroupModel":
+        if charges.size == 0:
+            return cls(count=0, total=0.0)
+        return cls(count=int(charges.size), total=float(charges.sum()),
+                   mean=float(charges.mean()), std=float(charges.std()))
+
+
+class ChargeDeltaModel(BaseModel):
+    """Изменение распределения зарядов: неизменившиеся импульсы в разность не входят."""
+    removed: ChargeGroupModel
+    added: ChargeGroupModel
+    modified_old: ChargeGroupModel
+    modified_new: ChargeGroupModel
+    modified_delta: ChargeGroupModel
+    total_delta: float
+
+
+class PulseDiffModel(BaseModel):
+    old_path: Path
+    new_path: Path
+    old_count: int
+    new_count: int
+    unchanged: int
+    added: list[int]
+    removed: list[int]
+    modified: list[tuple[int, int]]
+    charges: Optional[ChargeDeltaModel] = None
+
+    @property
+    def identical(self) -> bool:
+        return not (self.added or self.removed or self.modified)
+
+
+class _RunIndex:
+    """Хеши импульсов прогона и способ посчитать заряды выбранных импульсов."""
+
+    def __init__(self, path: Path, digests: PulseDigestsModel, batch: Optional[PulseBatchModel] = None):
+        self.path = path
+        self.digests = digests
+        self.batch = batch
+        self._batch_charges: Optional[np.ndarray] = None
+
+    def charges(self, indices: list[int]) -> np.ndarray:
+        if not indices:
+            return np.empty(0)
+        if self.batch is not None:
+            from src.analysis.charge_calculator import compute_batch_charges
+            if self._batch_charges is None:
+                self._batch_charges = compute_batch_charges(self.batch)
+            return self._batch_charges[indices]
+        from src.analysis.charge_calculator import compute_charge
+        from src.validation.pulse_loader import load_pulse_at
+        offsets, counts = self.digests.offsets, self.digests.n_samples
+        return np.array([compute_charge(load_pulse_at(self.path, int(offsets[k]), int(counts[k]))) for k in indices])
+
+
+def batch_digests(batch: PulseBatchModel) -> PulseDigestsModel:
+    """Хеши массивов времени, тока и напряжения каждого импульса (значения приводятся к float64)."""
+    # Равномерные оси разворачиваются по импульсу при хешировании, а не целиком
+    time = batch.time if batch.uniform_time else np.ascontiguousarray(batch.time, dtype=np.float64)
+    arrays = [time] + [np.ascontiguousarray(a, dtype=np.float64) for a in (batch.current, batch.voltage)]
+    provenance = batch.provenance
+    digests, keys = [], []
+    for k, (s, e) in enumerate(zip(batch.starts.tolist(), batch.ends.tolist())):
+        digest = hashlib.sha1(usedforsecurity=False)
+        for a in arrays:
+            digest.update(np.ascontiguousarray(a[s:e]).tobytes())
+        digests.append(digest.hexdigest())
+        if provenance is not None:
+            item = provenance.item(k)
+            keys.append(f"{item.source_file}:{item.selection_index}")
+        else:
+            keys.append(pulse_key("", k))
+    return PulseDigestsModel(offsets=batch.starts.astype(np.int64), n_samples=batch.lengths.astype(np.int64),
+                             digests=digests, keys=keys)
+
+
+def _text_digests(path: Path, catalog: Optional[PulseCatalog]) -> PulseDigestsModel:
+    """Хеши текстового файла: из каталога, если он актуален, иначе сканированием (с записью в каталог)."""
+    if catalog is not None:
+        try:
+            cached = catalog.cached_digests(path)
+            if cached is None:
+                catalog.index_pulse_file(path)
+                cached = catalog.cached_digests(path)
+            if cached is not None:
+                return cached
+        except Exception as e:
+            log.warning("⚠️ Каталог импульсов недоступен, хеши считаются заново: %s", e)
+    return scan_pulse_digests(path)
+
+
+def index_runs(old_path: Path, new_path: Path,
+               catalog: Optional[PulseCatalog] = None) -> tuple[_RunIndex, _RunIndex]:
+    """Индексы двух прогонов в общем представлении (байтовые хеши только если оба - текстовые файлы)."""
+    from src.data.pulses_repository import PulsesRepository
+
+    if PulsesRepository.is_text_file(old_path) and PulsesRepository.is_text_file(new_path):
+        return tuple(_RunIndex(p, _text_digests(p, catalog)) for p in (old_path, new_path))
+    runs = []
+    for path in (old_path, new_path):
+        batch = PulsesRepository.read_pulse_batch(path)
+        runs.append(_RunIndex(path, batch_digests(batch), batch))
+    return runs[0], runs[1]
+
+
+def match_pulses(old: PulseDigestsModel, new: PulseDigestsModel) -> tuple[int, list[int], list[int], list[tuple[int, int]]]:
+    """Сопоставляет импульсы за O(N): (неизменившихся, добавленные, удалённые, изменённые пары)."""
+    by_digest: dict[str, deque] = defaultdict(deque)
+    for i, digest in enumerate(old.digests):
+        by_digest[digest].append(i)
+    matched = np.zeros(len(old), dtype=bool)
+    pending: list[int] = []
+    for j, digest in enumerate(new.digests):
+        candidates = by_digest.get(digest)
+        if candidates:
+            matched[candidates.popleft()] = True
+        else:
+            pending.append(j)
+
+    by_key = {old.keys[i]: i for i in np.flatnonzero(~matched).tolist()}
+    added: list[int] = []
+    modified: list[tuple[int, int]] = []
+    for j in pending:
+        i = by_key.pop(new.keys[j], None)
+        if i is None:
+            added.append(j)
+        else:
+            matched[i] = True
+            modified.append((i, j))
+    removed = np.flatnonzero(~matched).tolist()
+    return len(new) - len(pending), added, removed, modified
+
+
+def diff_runs(old_path: Path, new_path: Path, catalog: Optional[PulseCatalog] = None,
+              charges: bool = True) -> PulseDiffModel:
+    """Добавленные, удалённые и изменённые импульсы new_path относительно old_path."""
+    old, new = index_runs(old_path, new_path, catalog)
+    unchanged, added, removed, modified = match_pulses(old.digests, new.digests)
+    delta = None
+    if charges:
+        removed_q = old.charges(removed)
+        added_q = new.charges(added)
+        modified_old = old.charges([i for i, _ in modified])
+        modified_new = new.charges([j for _, j in modified])
+        delta = ChargeDeltaModel(
+            removed=ChargeGroupModel.from_charges(removed_q),
+            added=ChargeGroupModel.from_charges(added_q),
+            modified_old=ChargeGroupModel.from_charges(modified_old),
+            modified_new=ChargeGroupModel.from_charges(modified_new),
+            modified_delta=ChargeGroupModel.from_charges(modified_new - modified_old),
+            total_delta=float(added_q.sum() - removed_q.sum() + (modified_new - modified_old).sum()),
+        )
+    return PulseDiffModel(old_path=old_path, new_path=new_path, old_count=len(old.digests),
+                          new_count=len(new.digests), unchanged=unchanged, added=added, removed=removed,
+                          modified=modified, charges=delta)
+
+
+def _print_group(name: str, group: ChargeGroupModel) -> None:
+    if group.count:
+        log.info("   %s: %d шт., сумма %.4e Кл, среднее %.4e Кл", name, group.count, group.total, group.mean)
+
+
+def main(argv: Iterable[str] | None = None):
+    """CLI сравнения двух файлов импульсов."""
+    parser = argparse.ArgumentParser(description="Сравнение двух прогонов извлечения импульсов")
+    parser.add_argument("old", type=Path, help="Файл импульсов прежнего прогона")
+    parser.add_argument("new", type=Path, help="Файл импульсов нового прогона")
+    parser.add_argument("--json", type=Path, default=None, help="Сохранить полный отчёт в JSON")
+    parser.add_argument("--show", type=int, default=DEFAULT_SHOW,
+                        help=f"Сколько номеров импульсов каждой группы печатать (по умолчанию: {DEFAULT_SHOW})")
+    parser.add_argument("--no-charges", action="store_true", help="Не считать заряды изменившихся импульсов")
+    parser.add_argument("--no-catalog", action="store_true", help="Не читать и не обновлять каталог импульсов")
+    add_instrumentation_arguments(parser, "profile_diff")
+    args = parser.parse_args(argv)
+
+    for path in (args.old, args.new):
+        if not path.exists():
+            parser.error(f"Файл не найден: {path}")
+
+    configure_logging(args.log_level)
+    with profile_session(args.profile):
+        report(args)
+
+
+def report(args: argparse.Namespace) -> None:
+    """Сравнивает прогоны и выводит (и при --json сохраняет) отчёт."""
+    catalog = None
+    if not args.no_catalog:
+        try:
+            catalog = PulseCatalog.default()
+        except Exception as e:
+            log.warning("⚠️ Каталог импульсов недоступен: %s", e)
+
+    diff = diff_runs(args.old, args.new, catalog, charges=not args.no_charges)
+    log.info("🔍 %s: %d импульсов -> %s: %d импульсов", args.old.name, diff.old_count, args.new.name, diff.new_count)
+    log.info("   без изменений: %d, изменено: %d, добавлено: %d, удалено: %d",
+             diff.unchanged, len(diff.modified), len(diff.added), len(diff.removed))
+    if diff.identical:
+        log.info("✅ Наборы импульсов совпадают")
+    for name, items in (("изменены (старый -> новый)", [f"{i}->{j}" for i, j in diff.modified]),
+                        ("добавлены (номера в новом)", diff.added),
+                        ("удалены (номера в прежнем)", diff.removed)):
+        if items and args.show > 0:
+            tail = " …" if len(items) > args.show else ""
+            log.info("   %s: %s%s", name, ", ".join(map(str, items[:args.show])), tail)
+
+    if diff.charges is not None and not diff.identical:
+        log.info("⚡ Заряды изменившихся импульсов:")
+        _print_group("удалённые", diff.charges.removed)
+        _print_group("добавленные", diff.charges.added)
+        _print_group("изменённые, разность новый - старый", diff.charges.modified_delta)
+        log.info("   суммарный заряд изменился на %.4e Кл", diff.charges.total_delta)
+
+    if args.json:
+        from src.core.atomic_io import atomic_write_json
+        atomic_write_json(args.json, diff.model_dump(mode="json"))
+        log.info("💾 Отчёт сохранён: %s", args.json)
+
+
+if __name__ == "__main__":
+    main()
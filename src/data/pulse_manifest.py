@@ -0,0 +1,154 @@
+"""
+Шардированный вывод импульсов: несколько текстовых файлов и манифест.
+
+Шард - обычный файл импульсов (формат write_pulses); манифест
+<имя>.manifest.json перечисляет шарды по порядку с числом импульсов и
+исходными захватами. Глобальный номер импульса = first_pulse шарда +
+номер внутри шарда, поэтому selections и журнал одобрений для манифеста
+работают как для одного файла.
+
+    {"version": 1, "total_pulses": 300,
+     "shards": [{"path": "extracted_pulses_shards/a_0000.txt", "pulse_count": 100,
+                 "first_pulse": 0, "sources": ["a.npz"]}, ...]}
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Optional
+
+from pydantic import BaseModel
+
+from src.models.pulse_batch_models import PulseBatchModel
+from src.core.atomic_io import atomic_write_json
+
+
+MANIFEST_SUFFIX = ".manifest.json"
+MANIFEST_VERSION = 1
+
+
+class ShardModel(BaseModel):
+    path: str
+    pulse_count: int
+    first_pulse: int
+    sources: list[str]
+
+
+class PulseManifestModel(BaseModel):
+    version: int = MANIFEST_VERSION
+    created: str
+    total_pulses: int
+    shards: list[ShardModel]
+
+    def shard_paths(self, manifest_path: Path) -> list[Path]:
+        """Абсолютные пути шардов (в манифесте они относительны его папки)."""
+        return [manifest_path.parent / shard.path for shard in self.shards]
+
+
+def is_manifest(path: Path) -> bool:
+    return path.name.endswith(MANIFEST_SUFFIX)
+
+
+def manifest_path_for(output_path: Path) -> Path:
+    """extracted_pulses.txt -> extracted_pulses.manifest.json рядом с ним."""
+    return output_path.with_name(output_path.stem + MANIFEST_SUFFIX)
+
+
+def read_manifest(path: Path) -> PulseManifestModel:
+    if not path.exists():
+        raise FileNotFoundError(f"Манифест не найден: {path}")
+    manifest = PulseManifestModel.model_validate_json(path.read_text(encoding="utf-8"))
+    if manifest.version != MANIFEST_VERSION:
+        raise ValueError(f"Неподдерживаемая версия манифеста {manifest.version}: {path}")
+    return manifest
+
+
+def _chunks(n: int, shard_size: Optional[int]) -> list[tuple[int, int]]:
+    if not shard_size or n <= shard_size:
+        return [(0, n)]
+    return [(s, min(s + shard_size, n)) for s in range(0, n, shard_size)]
+
+
+def _take_pulses(pending: list[tuple[str, PulseBatchModel]], n: int) -> tuple[PulseBatchModel, list[str]]:
+    """Забирает первые n импульсов буфера (source, пакет) и их источники."""
+    parts: list[PulseBatchModel] = []
+    names: list[str] = []
+    while n:
+        source, batch = pending[0]
+        if len(batch) <= n:
+            pending.pop(0)
+            part = batch
+        else:
+            part = batch.slice(0, n)
+            pending[0] = (source, batch.slice(n, len(batch)))
+        parts.append(part)
+        if source not in names:
+            names.append(source)
+        n -= len(part)
+    return PulseBatchModel.concatenate(parts), names
+
+
+def write_sharded(sources: Iterable[tuple[str, PulseBatchModel]], manifest_path: Path,
+                  per_source: bool = True, shard_size: Optional[int] = None,
+                  compact: bool = False, float32: bool = False) -> PulseManifestModel:
+    """Пишет шарды и манифест.
+
+    per_source=True - свой шард на каждый захват (при shard_size захват
+    дополнительно делится на шарды не больше shard_size импульсов);
+    per_source=False - все импульсы подряд, шарды по shard_size импульсов.
+    compact и float32 передаются в write_pulse_batch. Шарды пишутся по мере
+    чтения sources: в памяти держится только текущий захват (и при
+    per_source=False - остаток неполного шарда). Манифест записывается последним, поэтому
+    читатель не увидит ссылок на недописанные шарды.
+    """
+    from src.core.pulse_writer import write_pulse_batch
+
+    if not per_source and not shard_size:
+        raise ValueError("Для шардирования по числу импульсов нужен shard_size")
+
+    shard_dir = manifest_path.with_name(manifest_path.name[: -len(MANIFEST_SUFFIX)] + "_shards")
+    shard_dir.mkdir(parents=True, exist_ok=True)
+
+    shards: list[ShardModel] = []
+    written: set[Path] = set()
+
+    def write_shard(name: str, batch: PulseBatchModel, shard_sources: list[str]) -> None:
+        path = shard_dir / name
+        write_pulse_batch(batch, path, compact=compact, float32=float32)
+        first = shards[-1].first_pulse + shards[-1].pulse_count if shards else 0
+        shards.append(ShardModel(path=path.relative_to(manifest_path.parent).as_posix(),
+                                 pulse_count=len(batch), first_pulse=first, sources=shard_sources))
+        written.add(path)
+
+    if per_source:
+        # Шарды захвата пишутся сразу: в памяти только текущий захват
+        for source, batch in sources:
+            if len(batch) == 0:
+                continue
+            for k, (s, e) in enumerate(_chunks(len(batch), shard_size)):
+                write_shard(f"{Path(source).stem}_{k:04d}.txt", batch.slice(s, e), [source])
+    else:
+        # Скользящий буфер, как в PulseContainerWriter.append: шард пишется, как только
+        # набралось shard_size импульсов, остаток переносится в следующий
+        pending: list[tuple[str, PulseBatchModel]] = []
+        pending_pulses = 0
+        for source, batch in sources:
+            if len(batch) == 0:
+                continue
+            pending.append((source, batch))
+            pending_pulses += len(batch)
+            while pending_pulses >= shard_size:
+                write_shard(f"shard_{len(shards):04d}.txt", *_take_pulses(pending, shard_size))
+                pending_pulses -= shard_size
+        if pending_pulses:
+            write_shard(f"shard_{len(shards):04d}.txt", *_take_pulses(pending, pending_pulses))
+
+    total = shards[-1].first_pulse + shards[-1].pulse_count if shards else 0
+    manifest = PulseManifestModel(created=datetime.now().isoformat(), total_pulses=total, shards=shards)
+    atomic_write_json(manifest_path, manifest.model_dump())
+
+    # Шарды прошлого запуска, не вошедшие в новый манифест, удаляем после его замены
+    for stale in shard_dir.glob("*.txt"):
+        if stale not in written:
+            stale.unlink()
+    return manifest
@@ -1,23 +1,74 @@
 from __future__ import annotations
 
+import json
 from datetime import datetime
 from pathlib import Path
 from typing import List, Optional
-import json
+
+import numpy as np
 
 from src.models.config_models import DataConfigModel
 from src.models.pulse_models import PulseModel
-from src.models.pulse_group_models import PulseGroupModel, PulseItem
-from src.validation.pulse_loader import load_pulses
+from src.models.pulse_batch_models import PulseBatchModel
+from src.models.pulse_group_models import PulseGroupModel
+from src.validation.pulse_loader import load_pulses, load_pulse_batch
 from src.core.pulse_writer import write_pulses as write_pulses_txt
+from src.data.approval_journal import replay_journal
+from src.core.session import get_session
+from src.core.atomic_io import atomic_write_json, file_lock
+from src.core.instrumentation import get_logger
+from src.data.selections_codec import read_selections_mask, write_selections_mask
+from src.data.pulse_manifest import is_manifest, read_manifest, MANIFEST_SUFFIX
+from src.data.virtual_dataset import is_virtual, load_virtual_batch, pulse_keys, remap_approvals, VIRTUAL_SUFFIX
+from src.data.pulse_container import is_container, load_container_batch, CONTAINER_SUFFIX
+
+
+log = get_logger("repository")
 
 
 class PulsesRepository:
     """Единая точка доступа к файлам импульсов и selections."""
 
+    @staticmethod
+    def shard_paths(path: Path) -> List[Path]:
+        """Файлы, из которых состоит набор: шарды манифеста или сам файл."""
+        if is_manifest(path):
+            return read_manifest(path).shard_paths(path)
+        return [path]
+
+    @staticmethod
+    def is_text_file(path: Path) -> bool:
+        """Обычный текстовый файл импульсов (не манифест, не виртуальный набор и не контейнер)."""
+        return not (is_manifest(path) or is_virtual(path) or is_container(path))
+
     @staticmethod
     def read_pulses(path: Path) -> List[PulseModel]:
-        return load_pulses(path)
+        if is_virtual(path):
+            return load_virtual_batch(path).to_pulses()
+        if is_container(path):
+            return load_container_batch(path).to_pulses()
+        pulses: List[PulseModel] = []
+        for shard in PulsesRepository.shard_paths(path):
+            pulses.extend(load_pulses(shard))
+        return pulses
+
+    @staticmethod
+    def read_pulse_batch(path: Path, workers: int = 1) -> PulseBatchModel:
+        """Пакет всех импульсов набора; шарды манифеста при workers > 1 читаются параллельно."""
+        if is_virtual(path):
+            return load_virtual_batch(path)
+        if is_container(path):
+            return load_container_batch(path)
+        shards = PulsesRepository.shard_paths(path)
+        if len(shards) == 1:
+            return load_pulse_batch(shards[0])
+        if workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as pool:
+                batches = list(pool.map(load_pulse_batch, shards))
+        else:
+            batches = [load_pulse_batch(shard) for shard in shards]
+        return PulseBatchModel.concatenate(batches)
 
     @staticmethod
     def write_pulses(pulses: List[PulseModel], path: Path) -> None:
@@ -25,78 +76,112 @@ class PulsesRepository:
 
 
     @staticmethod
-    def _approved_from_group_object(obj: dict) -> List[bool]:
-        if "pulses" not in obj or not isinstance(obj["pulses"], list):
-            raise ValueError("Объект группы должен содержать список 'pulses'")
-        approved: List[bool] = []
-        for item in obj["pulses"]:
-            if not isinstance(item, dict) or "approved" not in item:
-                raise ValueError("Элемент pulses должен содержать поле 'approved'")
-            approved.append(bool(item["approved"]))
-        return approved
+    def read_selections(path: Path, total: int, input_file_name: Optional[str] = None) -> List[bool]:
+        return PulsesRepository.read_selections_mask(path, total, input_file_name).tolist()
+
+    @staticmethod
+    def read_selections_mask(path: Path, total: int, input_file_name: Optional[str] = None) -> np.ndarray:
+        """Читает selections (компактный или любой из JSON-форматов) в bool-массив."""
+        return read_selections_mask(path, total, input_file_name)
 
     @staticmethod
-    def read_selections(path: Path, total: int, input_file_name: Optional[str] = None) -> List[bool]:
-        if not path.exists() or not path.is_file():
-            raise FileNotFoundError(f"Не найден selections: {path}")
-        data = json.loads(path.read_text(encoding="utf-8"))
-
-        if isinstance(data, list) and all(isinstance(x, bool) for x in data):
-            if len(data) != total:
-                raise ValueError(f"Длина selections {len(data)} != числу импульсов {total}")
-            return list(data)
-
-        if isinstance(data, dict) and "pulses" in data:
-            approved = PulsesRepository._approved_from_group_object(data)
-            if len(approved) != total:
-                raise ValueError(f"Длина selections {len(approved)} != числу импульсов {total}")
-            return approved
-
-        if isinstance(data, dict) and "groups" in data and isinstance(data["groups"], list):
-            if not input_file_name:
-                raise ValueError("Для формата 'groups' требуется input_file_name")
-            for grp in data["groups"]:
-                if isinstance(grp, dict) and grp.get("file_name") == input_file_name:
-                    approved = PulsesRepository._approved_from_group_object(grp)
-                    if len(approved) != total:
-                        raise ValueError(f"Длина selections {len(approved)} != числу импульсов {total}")
-                    return approved
-            raise ValueError(f"В selections не найдена группа для {input_file_name}")
-
-        raise ValueError("Неподдерживаемый формат selections")
-
-    @staticmethod
-    def load_group(pulses_path: Path, selections_path: Optional[Path] = None) -> PulseGroupModel:
-        pulses = PulsesRepository.read_pulses(pulses_path)
-        approved: Optional[List[bool]] = None
-        if selections_path is None:
-            candidate = PulsesRepository.default_selections_path(pulses_path)
-            if candidate.exists() and candidate.is_file():
-                selections_path = candidate
+    def discover_pulse_files(data_config: DataConfigModel) -> List[Path]:
+        """Наборы импульсов в processed: текстовые файлы, манифесты шардов, виртуальные наборы и контейнеры."""
+        folder = data_config.processed_folder
+        return (sorted(folder.glob("*.txt")) + sorted(folder.glob(f"*{MANIFEST_SUFFIX}"))
+                + sorted(folder.glob(f"*{VIRTUAL_SUFFIX}")) + sorted(folder.glob(f"*{CONTAINER_SUFFIX}")))
+
+    @staticmethod
+    def load_group(pulses_path: Path, selections_path: Optional[Path] = None,
+                   include_rejected: bool = False, workers: int = 1) -> PulseGroupModel:
+        """Загружает группу импульсов с применением selections и журнала одобрений.
+
+        Журнал replay-ится поверх selections, только если используются
+        selections по умолчанию (или их ещё нет). При include_rejected=False
+        отклонённые импульсы отбрасываются, иначе сохраняются с approved=False.
+
+        Данные хранятся одним пакетом плоских массивов, одобрение - bool-маской;
+        фильтрация делается индексами, без объекта на каждый импульс.
+        Манифест шардов загружается как один файл (см. pulse_manifest).
+        Одобрения виртуального набора сначала переносятся на его текущий
+        состав (sync_virtual_approvals).
+        """
+        batch = PulsesRepository.read_pulse_batch(pulses_path, workers)
+        approved: Optional[np.ndarray] = None
+        default_path = PulsesRepository.default_selections_path(pulses_path)
+        if is_virtual(pulses_path) and (selections_path is None or selections_path == default_path):
+            PulsesRepository.sync_virtual_approvals(pulses_path, batch)
+        if selections_path is None and default_path.exists() and default_path.is_file():
+            selections_path = default_path
         if selections_path is not None:
-            approved = PulsesRepository.read_selections(
+            approved = PulsesRepository.read_selections_mask(
                 selections_path,
-                total=len(pulses),
+                total=len(batch),
                 input_file_name=pulses_path.name,
             )
-        items: List[PulseItem] = []
-        if approved is None:
-            items = [PulseItem(pulse=p, approved=True) for p in pulses]
-        else:
-            for p, ok in zip(pulses, approved):
-                if ok:
-                    items.append(PulseItem(pulse=p, approved=True))
-        return PulseGroupModel(file_name=pulses_path.name, pulses=items)
+        if selections_path is None or selections_path == default_path:
+            journal_path = PulsesRepository.default_journal_path(pulses_path)
+            if journal_path.exists():
+                if approved is None:
+                    approved = np.ones(len(batch), dtype=bool)
+                approved = replay_journal(journal_path, approved)
+        group = PulseGroupModel.from_batch(pulses_path.name, batch, approved)
+        return group if include_rejected else group.approved_view()
 
     @staticmethod
-    def auto_discover_files(data_config: DataConfigModel) -> dict[Path, PulseGroupModel]:
+    def sync_virtual_approvals(pulses_path: Path, batch: PulseBatchModel) -> None:
+        """Приводит selections и журнал виртуального набора к текущему составу импульсов.
+
+        Маска и журнал хранятся по позициям в порядке ключей из
+        default_keys_path. Если после правки selections.json ключи изменились,
+        решения переносятся по ключам (новые импульсы одобрены), маска
+        переписывается, журнал уплотняется в неё, ключи обновляются.
+        Решения без файла ключей считаются позиционными, только если число
+        импульсов совпадает, иначе набор начинается заново (все одобрены).
+        """
+        selections_path = PulsesRepository.default_selections_path(pulses_path)
+        journal_path = PulsesRepository.default_journal_path(pulses_path)
+        keys_path = PulsesRepository.default_keys_path(pulses_path)
+        keys = pulse_keys(batch)
+
+        get_session().ensure_dir(selections_path.parent)
+        with file_lock(selections_path):
+            stored = json.loads(keys_path.read_text(encoding="utf-8")) if keys_path.exists() else None
+            if stored == keys:
+                return
+            if selections_path.exists() or journal_path.exists():
+                old_keys = keys if stored is None else stored
+                try:
+                    old = np.ones(len(old_keys), dtype=bool)
+                    if selections_path.exists():
+                        old = PulsesRepository.read_selections_mask(selections_path, len(old_keys), pulses_path.name)
+                    approved = remap_approvals(old_keys, replay_journal(journal_path, old), keys)
+                    kept = len(set(old_keys) & set(keys))
+                    if stored is not None:
+                        log.warning("⚠️ %s: состав набора изменился, решения перенесены для %d из %d импульсов",
+                                    pulses_path.name, kept, len(keys))
+                except ValueError as e:
+                    approved = np.ones(len(keys), dtype=bool)
+                    log.warning("⚠️ %s: одобрения не соответствуют набору (%s), все импульсы одобрены",
+                                pulses_path.name, e)
+                PulsesRepository.write_selections(pulses_path, approved, lock=False)
+                journal_path.unlink(missing_ok=True)
+            atomic_write_json(keys_path, keys, indent=None)
+
+    @staticmethod
+    def auto_discover_files(data_config: DataConfigModel,
+                            include_rejected: bool = False) -> dict[Path, PulseGroupModel]:
         """Автоматически находит все файлы импульсов и соответствующие селекции."""
         results = {}
 
-        # Ищем .txt файлы в processed folder
-        for txt_file in data_config.processed_folder.glob("*.txt"):
+        # Ищем .txt файлы и манифесты шардов в processed folder
+        for txt_file in PulsesRepository.discover_pulse_files(data_config):
             selections_path = data_config.selections_folder / f"{txt_file.stem}_selections.json"
-            group = PulsesRepository.load_group(txt_file, selections_path if selections_path.exists() else None)
+            group = PulsesRepository.load_group(
+                txt_file,
+                selections_path if selections_path.exists() else None,
+                include_rejected=include_rejected,
+            )
             results[txt_file] = group
 
         return results
@@ -110,30 +195,40 @@ class PulsesRepository:
     @staticmethod
     def write_selections_for_group(pulses_path: Path, group: PulseGroupModel) -> Path:
         """Сохраняет селекции в папку data/selections"""
-        # Используем имя исходного файла для создания имени файла селекций
-        selections_filename = f"{pulses_path.stem}_selections.json"
+        return PulsesRepository.write_selections(pulses_path, group.full_mask())
+
+    @staticmethod
+    def write_selections(pulses_path: Path, approved, encoding: str = "auto", lock: bool = True) -> Path:
+        """Сохраняет bool-маску файла импульсов в selections по умолчанию.
 
-        # Сохраняем в папку selections, а не рядом с исходным файлом
-        from src.core.config_loader import load_data_config
-        data_config = load_data_config()
-        selections_path = data_config.selections_folder / selections_filename
+        По умолчанию маска пишется компактно (packbits или RLE, что короче);
+        encoding="json" сохраняет прежний формат {"pulses": [{"approved": ...}]}.
+        Запись атомарная (временный файл, fsync, os.replace) и под
+        блокировкой selections; вызывающий, уже держащий её, передаёт lock=False.
+        """
+        selections_path = PulsesRepository.default_selections_path(pulses_path)
+        mask = np.asarray(approved, dtype=bool)
 
-        group_for_save = {
-            "file_name": pulses_path.name,
-            "pulses": [{"approved": it.approved} for it in group.pulses],
-        }
+        get_session().ensure_dir(selections_path.parent)
+        write_selections_mask(selections_path, mask, pulses_path.name, encoding, lock=lock)
 
-        with open(selections_path, "w", encoding="utf-8") as f:
-            json.dump(group_for_save, f, indent=2, ensure_ascii=False)
+        # Синхронизируем одобрения в каталоге импульсов (если файл проиндексирован)
+        from src.data.pulse_catalog import PulseCatalog, update_catalog_safely
+        update_catalog_safely(PulseCatalog.update_approvals, pulses_path, mask)
 
         return selections_path
 
     @staticmethod
     def default_selections_path(pulses_path: Path) -> Path:
         """Возвращает путь к файлу селекций по умолчанию."""
-        from src.core.config_loader import load_data_config
-        data_config = load_data_config()
-        selections_filename = f"{pulses_path.stem}_selections.json"
-        return data_config.selections_folder / selections_filename
+        return get_session().selections_path(pulses_path)
 
+    @staticmethod
+    def default_journal_path(pulses_path: Path) -> Path:
+        """Возвращает путь к журналу одобрений рядом с selections по умолчанию."""
+        return PulsesRepository.default_selections_path(pulses_path).with_suffix(".journal")
 
+    @staticmethod
+    def default_keys_path(pulses_path: Path) -> Path:
+        """Ключи импульсов, к которым привязаны selections виртуального набора."""
+        return PulsesRepository.default_selections_path(pulses_path).with_suffix(".keys.json")
@@ -0,0 +1,152 @@
+"""
+Кодирование selections (bool-масок одобрения) в компактном виде.
+
+Компактный формат - это небольшой JSON-заголовок с маской в base64:
+    {"format": "packbits", "count": N, "file_name": "...", "data": "<base64>"}
+    {"format": "rle", "count": N, "first": true, "file_name": "...", "data": "<base64 uint32 длин серий>"}
+
+Чтение поддерживает и три прежних JSON-формата:
+  1) массив bool: [true, false, ...]
+  2) одиночная группа: {"file_name": "...", "pulses": [{"approved": true}, ...]}
+  3) агрегатор групп: {"groups": [{"file_name": "...", "pulses": [...]}, ...]}
+Во всех случаях результат - np.ndarray[bool] длиной total.
+"""
+from __future__ import annotations
+
+import base64
+import json
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from src.core.atomic_io import atomic_write
+
+
+ENCODINGS = ("packbits", "rle", "json")
+
+
+def _approved_from_group_object(obj: dict) -> np.ndarray:
+    if "pulses" not in obj or not isinstance(obj["pulses"], list):
+        raise ValueError("Объект группы должен содержать список 'pulses'")
+    items = obj["pulses"]
+    for item in items:
+        if not isinstance(item, dict) or "approved" not in item:
+            raise ValueError("Элемент pulses должен содержать поле 'approved'")
+    return np.fromiter((bool(item["approved"]) for item in items), dtype=bool, count=len(items))
+
+
+def encode_packbits(mask: np.ndarray) -> str:
+    return base64.b64encode(np.packbits(mask.astype(bool)).tobytes()).decode("ascii")
+
+
+def decode_packbits(data: str, count: int) -> np.ndarray:
+    packed = np.frombuffer(base64.b64decode(data), dtype=np.uint8)
+    return np.unpackbits(packed, count=count).astype(bool)
+
+
+def run_lengths(mask: np.ndarray) -> np.ndarray:
+    """Длины серий одинаковых значений маски."""
+    mask = np.asarray(mask, dtype=bool)
+    if mask.size == 0:
+        return np.empty(0, dtype=np.uint32)
+    change = np.flatnonzero(mask[1:] != mask[:-1]) + 1
+    bounds = np.concatenate(([0], change, [mask.size]))
+    return np.diff(bounds).astype(np.uint32)
+
+
+def encode_rle(mask: np.ndarray) -> str:
+    return base64.b64encode(run_lengths(mask).astype("<u4").tobytes()).decode("ascii")
+
+
+def decode_rle(data: str, count: int, first: bool) -> np.ndarray:
+    runs = np.frombuffer(base64.b64decode(data), dtype="<u4").astype(np.int64)
+    if runs.sum() != count:
+        raise ValueError(f"Сумма длин серий {runs.sum()} != count {count}")
+    values = np.zeros(runs.size, dtype=bool)
+    values[0::2] = first
+    values[1::2] = not first
+    return np.repeat(values, runs)
+
+
+def choose_encoding(mask: np.ndarray) -> str:
+    """Выбирает более короткое из packbits и rle."""
+    packed_bytes = (mask.size + 7) // 8
+    rle_bytes = 4 * run_lengths(mask).size
+    return "rle" if rle_bytes < packed_bytes else "packbits"
+
+
+def _check_total(mask: np.ndarray, total: Optional[int]) -> np.ndarray:
+    if total is not None and mask.size != total:
+        raise ValueError(f"Длина selections {mask.size} != числу импульсов {total}")
+    return mask
+
+
+def decode_selections(data, total: Optional[int] = None, input_file_name: Optional[str] = None) -> np.ndarray:
+    """Разбирает уже загруженный JSON selections в bool-маску."""
+    if isinstance(data, dict) and data.get("format") in ("packbits", "rle"):
+        count = int(data["count"])
+        if data["format"] == "packbits":
+            mask = decode_packbits(data["data"], count)
+        else:
+            mask = decode_rle(data["data"], count, bool(data.get("first", True)))
+        return _check_total(mask, total)
+
+    # Формат 1: массив bool
+    if isinstance(data, list) and all(isinstance(x, bool) for x in data):
+        return _check_total(np.array(data, dtype=bool), total)
+
+    # Формат 2: одиночная группа
+    if isinstance(data, dict) and "pulses" in data:
+        return _check_total(_approved_from_group_object(data), total)
+
+    # Формат 3: агрегатор групп
+    if isinstance(data, dict) and "groups" in data and isinstance(data["groups"], list):
+        if not input_file_name:
+            raise ValueError("Для формата 'groups' требуется input_file_name")
+        for grp in data["groups"]:
+            if isinstance(grp, dict) and grp.get("file_name") == input_file_name:
+                return _check_total(_approved_from_group_object(grp), total)
+        raise ValueError(f"В selections не найдена группа для {input_file_name}")
+
+    raise ValueError("Неподдерживаемый формат selections")
+
+
+def read_selections_mask(path: Path, total: Optional[int] = None,
+                         input_file_name: Optional[str] = None) -> np.ndarray:
+    """Читает selections любого поддерживаемого формата в np.ndarray[bool]."""
+    if not path.exists() or not path.is_file():
+        raise FileNotFoundError(f"Не найден selections: {path}")
+    data = json.loads(path.read_text(encoding="utf-8"))
+    return decode_selections(data, total, input_file_name)
+
+
+def encode_selections(mask: np.ndarray, file_name: Optional[str] = None, encoding: str = "auto") -> dict:
+    """Готовит JSON-объект selections в выбранной кодировке."""
+    mask = np.asarray(mask, dtype=bool)
+    if encoding == "auto":
+        encoding = choose_encoding(mask)
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Неизвестная кодировка selections '{encoding}', допустимо: {ENCODINGS}")
+
+    if encoding == "json":
+        return {"file_name": file_name, "pulses": [{"approved": bool(ok)} for ok in mask]}
+    obj = {"format": encoding, "count": int(mask.size), "file_name": file_name}
+    if encoding == "packbits":
+        obj["data"] = encode_packbits(mask)
+    else:
+        obj["first"] = bool(mask[0]) if mask.size else True
+        obj["data"] = encode_rle(mask)
+    return obj
+
+
+def write_selections_mask(path: Path, mask: np.ndarray, file_name: Optional[str] = None,
+                          encoding: str = "auto", lock: bool = False) -> Path:
+    """Атомарно записывает маску в path (компактно по умолчанию); lock - под блокировкой path."""
+    obj = encode_selections(mask, file_name, encoding)
+    with atomic_write(path, lock=lock) as f:
+        if encoding == "json":
+            json.dump(obj, f, indent=2, ensure_ascii=False)
+        else:
+            json.dump(obj, f, ensure_ascii=False)
+    return path
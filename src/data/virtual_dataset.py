@@ -0,0 +1,145 @@
+"""
+Виртуальный набор импульсов: срезы читаются прямо из исходных захватов.
+
+Файл <имя>.virtual.json в processed описывает набор - папку с .npz и
+папку с selections.json (пути относительно самого описания, чтобы папку
+проекта можно было перенести):
+    {"raw_folder": "../raw", "selections_folder": "../selections"}
+При загрузке массив "data" каждого захвата отображается в память (для
+несжатых .npz - np.memmap прямо по смещению внутри zip), и копируются
+только отсчёты выбранных импульсов. Текстовый файл импульсов не нужен;
+после правки selections.json анализ видит новые границы без повторного
+извлечения. Каждый импульс несёт происхождение (файл, селекция, отсчёты).
+
+Поскольку состав набора меняется вместе с selections.json, одобрения
+виртуального набора привязаны к ключам импульсов (pulse_keys), а не только
+к позициям; перенос решений - remap_approvals (см. PulsesRepository.load_group).
+"""
+from __future__ import annotations
+
+import os
+import struct
+import zipfile
+from pathlib import Path
+
+import numpy as np
+from pydantic import BaseModel
+
+from src.models.pulse_batch_models import PulseBatchModel
+from src.core.atomic_io import atomic_write_text
+from src.core.config_loader import load_selections
+
+
+VIRTUAL_SUFFIX = ".virtual.json"
+# Размер фиксированной части локального заголовка zip-записи
+_ZIP_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+
+
+class VirtualDatasetSpec(BaseModel):
+    raw_folder: Path
+    selections_folder: Path
+
+
+def is_virtual(path: Path) -> bool:
+    return path.name.endswith(VIRTUAL_SUFFIX)
+
+
+def virtual_path_for(output_path: Path) -> Path:
+    """extracted_pulses.txt -> extracted_pulses.virtual.json рядом с ним."""
+    return output_path.with_name(output_path.stem + VIRTUAL_SUFFIX)
+
+
+def _relative_to(folder: Path, base: Path) -> Path:
+    try:
+        return Path(os.path.relpath(folder.resolve(), base.resolve()))
+    except ValueError:
+        # Другой диск (Windows): относительного пути нет
+        return folder.resolve()
+
+
+def write_virtual_spec(path: Path, raw_folder: Path, selections_folder: Path) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    spec = VirtualDatasetSpec(raw_folder=_relative_to(raw_folder, path.parent),
+                              selections_folder=_relative_to(selections_folder, path.parent))
+    return atomic_write_text(path, spec.model_dump_json(indent=2))
+
+
+def read_virtual_spec(path: Path) -> VirtualDatasetSpec:
+    """Описание набора с путями, разрешёнными относительно его папки."""
+    if not path.exists():
+        raise FileNotFoundError(f"Описание виртуального набора не найдено: {path}")
+    spec = VirtualDatasetSpec.model_validate_json(path.read_text(encoding="utf-8"))
+    return VirtualDatasetSpec(raw_folder=path.parent / spec.raw_folder,
+                              selections_folder=path.parent / spec.selections_folder)
+
+
+def mmap_npz_array(npz_path: Path, key: str = "data") -> np.ndarray:
+    """Массив key из .npz, отображённый в память.
+
+    np.load(mmap_mode=...) для .npz не работает, поэтому для несжатой записи
+    смещение данных вычисляется по заголовкам zip и .npy. Сжатые записи
+    отобразить нельзя - они читаются целиком.
+    """
+    member = f"{key}.npy"
+    with zipfile.ZipFile(npz_path) as zf:
+        info = zf.getinfo(member)
+    if info.compress_type != zipfile.ZIP_STORED:
+        with np.load(npz_path) as npz:
+            return npz[key]
+
+    with open(npz_path, "rb") as f:
+        f.seek(info.header_offset)
+        header = _ZIP_LOCAL_HEADER.unpack(f.read(_ZIP_LOCAL_HEADER.size))
+        if header[0] != b"PK\x03\x04":
+            raise ValueError(f"Повреждён заголовок записи {member} в {npz_path}")
+        name_len, extra_len = header[-2], header[-1]
+        f.seek(info.header_offset + _ZIP_LOCAL_HEADER.size + name_len + extra_len)
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        data_offset = f.tell()
+    return np.memmap(npz_path, dtype=dtype, mode="r", offset=data_offset, shape=shape,
+                     order="F" if fortran_order else "C")
+
+
+def load_virtual_batch(path: Path) -> PulseBatchModel:
+    """Пакет импульсов виртуального набора по текущему selections.json."""
+    from src.core.pulse_extractor import valid_selection_ranges, gather_ranges
+    from src.core.instrumentation import span, count
+
+    spec = read_virtual_spec(path)
+    batches = []
+    for selection in load_selections(spec.selections_folder):
+        npz_path = spec.raw_folder / selection.file_name
+        if not npz_path.exists():
+            raise FileNotFoundError(f"Захват виртуального набора не найден: {npz_path}")
+        with span("virtual.gather"):
+            data = mmap_npz_array(npz_path)
+            t, v, i = data[0], data[1], data[2]
+            ranges = valid_selection_ranges(selection, t.shape[0])
+            batch = gather_ranges(t, v, i, selection.file_name, ranges)
+        count("virtual.samples_read", len(batch.time))
+        batches.append(batch)
+        del data
+    return PulseBatchModel.concatenate(batches)
+
+
+def pulse_keys(batch: PulseBatchModel) -> list[str]:
+    """Ключи импульсов виртуального набора: <захват>:<начало>-<конец> отсчётов.
+
+    Номер селекции в ключ не входит: он сдвигается, когда из selections.json
+    удаляют предыдущий диапазон.
+    """
+    p = batch.provenance
+    if p is None:
+        raise ValueError("У импульсов нет происхождения: ключи не построить")
+    names = [p.sources[i] for i in p.source_ids.tolist()]
+    return [f"{name}:{s}-{e}" for name, s, e in zip(names, p.sample_start.tolist(), p.sample_end.tolist())]
+
+
+def remap_approvals(old_keys: list[str], old_approved: np.ndarray, new_keys: list[str]) -> np.ndarray:
+    """Переносит решения на импульсы с теми же ключами; импульсы с новыми ключами одобрены."""
+    decided = dict(zip(old_keys, np.asarray(old_approved, dtype=bool).tolist()))
+    return np.fromiter((decided.get(k, True) for k in new_keys), dtype=bool, count=len(new_keys))
@@ -1,7 +1,7 @@
 from __future__ import annotations
 from pathlib import Path
 from typing import Annotated
-from pydantic import BaseModel, Field, ConfigDict, field_validator, model_validator
+from pydantic import BaseModel, Field, ConfigDict, field_validator
 from src.core.project_root import PROJECT_ROOT
 
 
@@ -36,18 +36,22 @@ class DataConfigModel(BaseModel):
 
     @field_validator("raw_data_folder", "processed_folder", "selections_folder", "outputs_folder", mode="before")
     @classmethod
-    def validate_and_create_folders(cls, v):
+    def resolve_folders(cls, v):
+        """Делает путь абсолютным; папки создаются лениво при записи (см. DataSession)."""
         path = Path(v)
         # Если путь относительный, делаем его абсолютным относительно корня проекта
         if not path.is_absolute():
             path = PROJECT_ROOT / path
-        path.mkdir(parents=True, exist_ok=True)
         return path
 
-    @model_validator(mode="after")
-    def create_subfolders(self):
-        """Создает все необходимые подпапки."""
-        (self.outputs_folder / self.approved_subfolder).mkdir(parents=True, exist_ok=True)
-        (self.outputs_folder / self.validation_subfolder).mkdir(parents=True, exist_ok=True)
-        (self.outputs_folder / self.analysis_subfolder).mkdir(parents=True, exist_ok=True)
-        return self
\ No newline at end of file
+    def all_folders(self) -> list[Path]:
+        """Все папки структуры данных, включая подпапки outputs."""
+        return [
+            self.raw_data_folder,
+            self.processed_folder,
+            self.selections_folder,
+            self.outputs_folder,
+            self.outputs_folder / self.approved_subfolder,
+            self.outputs_folder / self.validation_subfolder,
+            self.outputs_folder / self.analysis_subfolder,
+        ]
\ No newline at end of file
@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+from typing import Annotated, Optional, Sequence
+
+import numpy as np
+from pydantic import BaseModel, Field, ConfigDict, model_validator
+
+from src.models.pulse_models import PulseModel, PulseProvenanceModel, UniformTimeAxis, UNIFORM_TIME_TOLERANCE
+
+
+def _expand_time(t0: np.ndarray, dt: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    lengths = np.asarray(lengths, dtype=np.int64)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1])) if lengths.size else lengths
+    k = np.arange(int(lengths.sum())) - np.repeat(starts, lengths)
+    return np.repeat(np.asarray(t0, dtype=np.float64), lengths) + np.repeat(np.asarray(dt, dtype=np.float64), lengths) * k
+
+
+class BatchTimeAxes:
+    """Равномерные оси времени всех импульсов пакета: t0 и dt на импульс вместо отсчёта.
+
+    Аналог UniformTimeAxis для PulseBatchModel: len(), индексация (срез или
+    массив индексов - значения считаются на лету по offsets) и np.asarray(),
+    который разворачивает время целиком только для потребителей без
+    равномерного пути.
+    """
+    __slots__ = ("t0", "dt", "offsets")
+
+    def __init__(self, t0: np.ndarray, dt: np.ndarray, offsets: np.ndarray):
+        self.t0 = np.asarray(t0, dtype=np.float64)
+        self.dt = np.asarray(dt, dtype=np.float64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+
+    @classmethod
+    def concatenate(cls, parts: Sequence["BatchTimeAxes"]) -> "BatchTimeAxes":
+        shifts = np.cumsum([0] + [len(p) for p in parts[:-1]])
+        return cls(np.concatenate([p.t0 for p in parts]), np.concatenate([p.dt for p in parts]),
+                   np.concatenate([[0]] + [p.offsets[1:] + shift for p, shift in zip(parts, shifts)]))
+
+    def __len__(self) -> int:
+        return int(self.offsets[-1])
+
+    @property
+    def size(self) -> int:
+        return len(self)
+
+    @property
+    def nbytes(self) -> int:
+        return self.t0.nbytes + self.dt.nbytes + self.offsets.nbytes
+
+    def __array__(self, dtype=None, copy=None):
+        arr = _expand_time(self.t0, self.dt, np.diff(self.offsets))
+        return arr if dtype is None else arr.astype(dtype)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            pos = np.arange(*key.indices(len(self)))
+        else:
+            pos = np.asarray(key)
+            if pos.dtype == bool:
+                pos = np.flatnonzero(pos)
+            pos = np.where(pos < 0, pos + len(self), pos)
+        k = np.searchsorted(self.offsets, pos, side="right") - 1
+        values = self.t0[k] + self.dt[k] * (pos - self.offsets[k])
+        return float(values) if values.ndim == 0 else values
+
+    def tolist(self) -> list:
+        return np.asarray(self).tolist()
+
+    def axis(self, k: int) -> UniformTimeAxis:
+        """Ось импульса k."""
+        return UniformTimeAxis(self.t0[k], self.dt[k], int(self.offsets[k + 1] - self.offsets[k]))
+
+    def take(self, start: int, stop: int) -> "BatchTimeAxes":
+        """Оси импульсов [start, stop)."""
+        return BatchTimeAxes(self.t0[start:stop], self.dt[start:stop],
+                             self.offsets[start:stop + 1] - self.offsets[start])
+
+    def __reduce__(self):
+        return BatchTimeAxes, (self.t0, self.dt, self.offsets)
+
+    def __repr__(self) -> str:
+        return f"BatchTimeAxes(pulses={self.t0.size}, samples={len(self)})"
+
+
+class BatchProvenanceModel(BaseModel):
+    """Происхождение импульсов пакета: по элементу массивов на импульс."""
+    sources: Annotated[list[str], Field(description="Имена исходных .npz")]
+    source_ids: Annotated[np.ndarray, Field(description="Номер источника в sources для каждого импульса")]
+    selection_index: Annotated[np.ndarray, Field(description="Номер селекции в selections.json")]
+    sample_start: Annotated[np.ndarray, Field(description="Первый отсчёт импульса в захвате")]
+    sample_end: Annotated[np.ndarray, Field(description="Отсчёт после последнего")]
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @classmethod
+    def from_items(cls, items: Sequence[Optional[PulseProvenanceModel]]) -> Optional["BatchProvenanceModel"]:
+        """Собирает массивы из происхождений импульсов; None, если хотя бы одно неизвестно."""
+        if any(item is None for item in items):
+            return None
+        sources = list(dict.fromkeys(item.source_file for item in items))
+        ids = {name: k for k, name in enumerate(sources)}
+        n = len(items)
+        return cls(
+            sources=sources,
+            source_ids=np.fromiter((ids[item.source_file] for item in items), dtype=np.int32, count=n),
+            selection_index=np.fromiter((item.selection_index for item in items), dtype=np.int64, count=n),
+            sample_start=np.fromiter((item.sample_start for item in items), dtype=np.int64, count=n),
+            sample_end=np.fromiter((item.sample_end for item in items), dtype=np.int64, count=n),
+        )
+
+    @classmethod
+    def concatenate(cls, parts: Sequence[Optional["BatchProvenanceModel"]]) -> Optional["BatchProvenanceModel"]:
+        if not parts or any(p is None for p in parts):
+            return None
+        sources = list(dict.fromkeys(name for p in parts for name in p.sources))
+        ids = {name: k for k, name in enumerate(sources)}
+        remapped = [np.array([ids[name] for name in p.sources], dtype=np.int32)[p.source_ids] for p in parts]
+        return cls(
+            sources=sources,
+            source_ids=np.concatenate(remapped),
+            selection_index=np.concatenate([p.selection_index for p in parts]),
+            sample_start=np.concatenate([p.sample_start for p in parts]),
+            sample_end=np.concatenate([p.sample_end for p in parts]),
+        )
+
+    def __len__(self) -> int:
+        return len(self.source_ids)
+
+    def take(self, index) -> "BatchProvenanceModel":
+        """Подмножество по срезу или массиву индексов."""
+        return BatchProvenanceModel(
+            sources=self.sources,
+            source_ids=self.source_ids[index],
+            selection_index=self.selection_index[index],
+            sample_start=self.sample_start[index],
+            sample_end=self.sample_end[index],
+        )
+
+    def item(self, k: int) -> PulseProvenanceModel:
+        return PulseProvenanceModel(
+            source_file=self.sources[int(self.source_ids[k])],
+            selection_index=int(self.selection_index[k]),
+            sample_start=int(self.sample_start[k]),
+            sample_end=int(self.sample_end[k]),
+        )
+
+
+class PulseBatchModel(BaseModel):
+    """Пакет импульсов в виде плоских массивов и смещений.
+
+    Импульс k занимает отрезок [offsets[k], offsets[k + 1]) во всех трёх
+    массивах. Такое представление позволяет считать характеристики сразу
+    для всех импульсов без Python-объектов на каждый импульс. Для
+    компактных файлов time - BatchTimeAxes (t0/dt на импульс), и время
+    разворачивается только по требованию.
+    """
+    time: Annotated[np.ndarray | BatchTimeAxes, Field(description="Время всех импульсов подряд или их равномерные оси")]
+    current: Annotated[np.ndarray, Field(description="Ток всех импульсов подряд")]
+    voltage: Annotated[np.ndarray, Field(description="Напряжение всех импульсов подряд")]
+    offsets: Annotated[np.ndarray, Field(description="Границы импульсов, длина = число импульсов + 1")]
+    provenance: Optional[BatchProvenanceModel] = Field(default=None, description="Происхождение импульсов")
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @model_validator(mode="after")
+    def validate_layout(self):
+        """Проверяет согласованность массивов и смещений."""
+        n = len(self.time)
+        if len(self.current) != n or len(self.voltage) != n:
+            raise ValueError(
+                f"Массивы имеют разную длину: time={n}, "
+                f"current={len(self.current)}, voltage={len(self.voltage)}"
+            )
+        if self.offsets.ndim != 1 or len(self.offsets) == 0:
+            raise ValueError("offsets должен быть одномерным и непустым")
+        if self.offsets[0] != 0 or self.offsets[-1] != n:
+            raise ValueError(f"offsets должен начинаться с 0 и заканчиваться {n}")
+        if np.any(np.diff(self.offsets) <= 0):
+            raise ValueError("Импульсы не могут быть пустыми")
+        if self.provenance is not None and len(self.provenance) != len(self.offsets) - 1:
+            raise ValueError(f"Происхождение задано для {len(self.provenance)} импульсов из {len(self.offsets) - 1}")
+        if isinstance(self.time, BatchTimeAxes) and not np.array_equal(self.time.offsets, self.offsets):
+            raise ValueError("Границы осей времени не совпадают с offsets")
+        return self
+
+    @property
+    def uniform_time(self) -> bool:
+        """True, если время хранится осями t0/dt (BatchTimeAxes)."""
+        return isinstance(self.time, BatchTimeAxes)
+
+    @classmethod
+    def from_pulses(cls, pulses: Sequence[PulseModel]) -> "PulseBatchModel":
+        """Собирает пакет из списка PulseModel (одна конкатенация на массив)."""
+        if not pulses:
+            empty = np.empty(0, dtype=np.float64)
+            return cls(time=empty, current=empty.copy(), voltage=empty.copy(), offsets=np.zeros(1, dtype=np.int64))
+        lengths = np.fromiter((len(p.time) for p in pulses), dtype=np.int64, count=len(pulses))
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+        if all(isinstance(p.time, UniformTimeAxis) for p in pulses):
+            time = BatchTimeAxes(np.array([p.time.t0 for p in pulses]), np.array([p.time.dt for p in pulses]), offsets)
+        else:
+            time = np.concatenate([np.asarray(p.time) for p in pulses])
+        return cls(
+            time=time,
+            current=np.concatenate([p.current for p in pulses]),
+            voltage=np.concatenate([p.voltage for p in pulses]),
+            offsets=offsets,
+            provenance=BatchProvenanceModel.from_items([p.provenance for p in pulses]),
+        )
+
+    @classmethod
+    def concatenate(cls, batches: Sequence["PulseBatchModel"]) -> "PulseBatchModel":
+        """Склеивает несколько пакетов в один (импульсы идут в порядке пакетов)."""
+        batches = [b for b in batches if len(b)]
+        if not batches:
+            return cls.from_pulses([])
+        if len(batches) == 1:
+            return batches[0]
+        shifts = np.cumsum([0] + [len(b.time) for b in batches[:-1]])
+        if all(b.uniform_time for b in batches):
+            time = BatchTimeAxes.concatenate([b.time for b in batches])
+        else:
+            time = np.concatenate([np.asarray(b.time) for b in batches])
+        return cls(
+            time=time,
+            current=np.concatenate([b.current for b in batches]),
+            voltage=np.concatenate([b.voltage for b in batches]),
+            offsets=np.concatenate([[0]] + [b.offsets[1:] + shift for b, shift in zip(batches, shifts)]).astype(np.int64),
+            provenance=BatchProvenanceModel.concatenate([b.provenance for b in batches]),
+        )
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def starts(self) -> np.ndarray:
+        return self.offsets[:-1]
+
+    @property
+    def ends(self) -> np.ndarray:
+        return self.offsets[1:]
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    @staticmethod
+    def expand_time(t0: np.ndarray, dt: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+        """Плоский массив времени из равномерных осей (t0, dt) импульсов заданной длины."""
+        return _expand_time(t0, dt, lengths)
+
+    def uniform_time_axes(self, tolerance: float = UNIFORM_TIME_TOLERANCE):
+        """(t0, dt) каждого импульса, если время всех импульсов равномерно в пределах tolerance * dt, иначе None."""
+        if self.uniform_time:
+            return self.time.t0, self.time.dt
+        lengths = self.lengths
+        t0 = self.time[self.starts].astype(np.float64)
+        last = self.time[self.ends - 1].astype(np.float64)
+        dt = np.where(lengths > 1, (last - t0) / np.maximum(lengths - 1, 1), 0.0)
+        if np.any((dt == 0) & (lengths > 1)):
+            return None
+        err = np.abs(self.time - self.expand_time(t0, dt, lengths))
+        if np.any(err > tolerance * np.repeat(np.abs(dt), lengths)):
+            return None
+        return t0, dt
+
+    def pulse(self, index: int) -> PulseModel:
+        """Возвращает импульс как PulseModel (срезы-представления, без копирования)."""
+        s, e = int(self.offsets[index]), int(self.offsets[index + 1])
+        provenance = self.provenance.item(index) if self.provenance is not None else None
+        time = self.time.axis(index) if self.uniform_time else self.time[s:e]
+        return PulseModel(time=time, current=self.current[s:e], voltage=self.voltage[s:e],
+                          provenance=provenance)
+
+    def slice(self, start: int, stop: int) -> "PulseBatchModel":
+        """Импульсы [start, stop) как отдельный пакет (массивы - представления)."""
+        s, e = int(self.offsets[start]), int(self.offsets[stop])
+        return PulseBatchModel(
+            time=self.time.take(start, stop) if self.uniform_time else self.time[s:e],
+            current=self.current[s:e],
+            voltage=self.voltage[s:e],
+            offsets=self.offsets[start:stop + 1] - s,
+            provenance=self.provenance.take(slice(start, stop)) if self.provenance is not None else None,
+        )
+
+    def to_pulses(self) -> list[PulseModel]:
+        return [self.pulse(k) for k in range(len(self))]
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
-from typing import List
-from pydantic import BaseModel, Field
+from typing import Annotated, List, Optional
+import numpy as np
+from pydantic import BaseModel, Field, ConfigDict, model_validator
 from src.models.pulse_models import PulseModel
+from src.models.pulse_batch_models import PulseBatchModel
 
 
 class PulseItem(BaseModel):
@@ -11,7 +13,66 @@ class PulseItem(BaseModel):
 
 
 class PulseGroupModel(BaseModel):
+    """Группа импульсов одного файла: пакет данных + индексы + маска одобрения.
+
+    indices - номера импульсов пакета, входящих в группу (представление без
+    копирования данных), approved[k] - одобрение импульса indices[k].
+    """
     file_name: str
-    pulses: List[PulseItem]
+    batch: Annotated[PulseBatchModel, Field(description="Все импульсы файла")]
+    indices: Annotated[np.ndarray, Field(description="Номера импульсов пакета, входящих в группу")]
+    approved: Annotated[np.ndarray, Field(description="Bool-маска одобрения для импульсов группы")]
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @model_validator(mode="after")
+    def validate_mask(self):
+        if len(self.indices) != len(self.approved):
+            raise ValueError(f"Длина маски {len(self.approved)} != числу импульсов {len(self.indices)}")
+        return self
+
+    @classmethod
+    def from_batch(cls, file_name: str, batch: PulseBatchModel,
+                   approved: Optional[np.ndarray] = None) -> "PulseGroupModel":
+        """Группа из всех импульсов пакета (по умолчанию все одобрены)."""
+        n = len(batch)
+        mask = np.ones(n, dtype=bool) if approved is None else np.asarray(approved, dtype=bool).copy()
+        return cls(file_name=file_name, batch=batch, indices=np.arange(n), approved=mask)
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    @property
+    def total(self) -> int:
+        """Число импульсов в исходном файле."""
+        return len(self.batch)
+
+    def pulse(self, k: int) -> PulseModel:
+        """k-й импульс группы (срезы пакета, без копирования)."""
+        return self.batch.pulse(int(self.indices[k]))
+
+    def select(self, mask) -> "PulseGroupModel":
+        """Представление группы, отфильтрованное по bool-маске (данные не копируются)."""
+        mask = np.asarray(mask, dtype=bool)
+        if mask.shape != self.approved.shape:
+            raise ValueError(f"Длина маски {len(mask)} != числу импульсов {len(self)}")
+        return PulseGroupModel(
+            file_name=self.file_name,
+            batch=self.batch,
+            indices=self.indices[mask],
+            approved=self.approved[mask],
+        )
+
+    def approved_view(self) -> "PulseGroupModel":
+        """Только одобренные импульсы."""
+        return self.select(self.approved)
 
+    def full_mask(self) -> np.ndarray:
+        """Маска одобрения по всем импульсам файла (не вошедшие в группу - False)."""
+        mask = np.zeros(self.total, dtype=bool)
+        mask[self.indices] = self.approved
+        return mask
 
+    @property
+    def pulses(self) -> List[PulseItem]:
+        """Совместимость со старым API: список PulseItem (создаёт объект на импульс)."""
+        return [PulseItem(pulse=self.pulse(k), approved=bool(ok)) for k, ok in enumerate(self.approved)]
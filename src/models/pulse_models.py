@@ -1,15 +1,131 @@
 from __future__ import annotations
 
-from typing import Annotated
+from typing import Annotated, Optional
 
 import numpy as np
 from pydantic import BaseModel, Field, ConfigDict, model_validator
 
 
+# Допустимое отклонение отсчётов времени от равномерной сетки, в долях dt
+UNIFORM_TIME_TOLERANCE = 1e-6
+
+
+class UniformTimeAxis:
+    """Равномерная ось времени t0 + dt * k, k < n, без хранения массива.
+
+    Ведёт себя как одномерный массив там, где это нужно: len(), индексация
+    (срез даёт снова UniformTimeAxis, массив индексов - значения без
+    разворачивания всей оси), умножение/сдвиг на число и np.asarray(),
+    который разворачивает ось только при явной необходимости.
+    """
+    __slots__ = ("t0", "dt", "n")
+
+    def __init__(self, t0: float, dt: float, n: int):
+        self.t0 = float(t0)
+        self.dt = float(dt)
+        self.n = int(n)
+
+    @classmethod
+    def from_array(cls, time: np.ndarray, tolerance: float = UNIFORM_TIME_TOLERANCE) -> Optional["UniformTimeAxis"]:
+        """Ось по массиву времени; None, если отсчёты отклоняются от сетки больше tolerance * dt."""
+        if isinstance(time, cls):
+            return time
+        time = np.asarray(time, dtype=np.float64)
+        n = time.size
+        if n == 0:
+            return None
+        if n == 1:
+            return cls(time[0], 0.0, 1)
+        dt = (time[-1] - time[0]) / (n - 1)
+        if dt == 0:
+            return None
+        err = np.abs(time - (time[0] + dt * np.arange(n))).max()
+        return cls(time[0], dt, n) if err <= tolerance * abs(dt) else None
+
+    def __len__(self) -> int:
+        return self.n
+
+    def __array__(self, dtype=None, copy=None):
+        arr = self.t0 + self.dt * np.arange(self.n)
+        return arr if dtype is None else arr.astype(dtype)
+
+    def __iter__(self):
+        return iter(np.asarray(self))
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            r = range(self.n)[key]
+            return UniformTimeAxis(self.t0 + self.dt * r.start, self.dt * r.step, len(r))
+        if isinstance(key, (int, np.integer)):
+            k = int(key)
+            if not -self.n <= k < self.n:
+                raise IndexError(f"Индекс {k} вне оси длиной {self.n}")
+            return self.t0 + self.dt * (k % self.n)
+        k = np.asarray(key)
+        if k.dtype == bool:
+            k = np.flatnonzero(k)
+        return self.t0 + self.dt * np.where(k < 0, k + self.n, k)
+
+    def __mul__(self, factor):
+        return UniformTimeAxis(self.t0 * factor, self.dt * factor, self.n)
+
+    __rmul__ = __mul__
+
+    def __add__(self, shift):
+        return UniformTimeAxis(self.t0 + shift, self.dt, self.n)
+
+    __radd__ = __add__
+
+    def __sub__(self, shift):
+        return UniformTimeAxis(self.t0 - shift, self.dt, self.n)
+
+    def __reduce__(self):
+        return UniformTimeAxis, (self.t0, self.dt, self.n)
+
+    def __repr__(self) -> str:
+        return f"UniformTimeAxis(t0={self.t0!r}, dt={self.dt!r}, n={self.n})"
+
+    @property
+    def nbytes(self) -> int:
+        return 24
+
+    def to_field(self) -> str:
+        """Поле оси в строке "start" компактного файла импульсов: <t0>:<dt>."""
+        return f"{self.t0!r}:{self.dt!r}"
+
+    @classmethod
+    def from_field(cls, field: str, n: int) -> "UniformTimeAxis":
+        t0, dt = field.split(":")
+        return cls(float(t0), float(dt), n)
+
+
+class PulseProvenanceModel(BaseModel):
+    """Откуда взят импульс: захват, номер селекции и отрезок отсчётов [sample_start, sample_end)."""
+    source_file: Annotated[str, Field(min_length=1, description="Имя исходного .npz")]
+    selection_index: Annotated[int, Field(ge=0, description="Номер селекции в selections.json")]
+    sample_start: Annotated[int, Field(ge=0, description="Первый отсчёт импульса в захвате")]
+    sample_end: Annotated[int, Field(ge=0, description="Отсчёт после последнего")]
+
+    def to_fields(self) -> str:
+        """Поля строки "start" файла импульсов: <файл>\t<селекция>:<начало>:<конец>."""
+        return f"{self.source_file}\t{self.selection_index}:{self.sample_start}:{self.sample_end}"
+
+    @classmethod
+    def from_start_line(cls, line: str) -> Optional["PulseProvenanceModel"]:
+        """Разбирает строку "start"; None для строк без происхождения (старый формат)."""
+        parts = line.rstrip("\r\n").split("\t")
+        if len(parts) < 3 or not parts[1] or not parts[2]:
+            return None
+        selection_index, sample_start, sample_end = (int(x) for x in parts[2].split(":"))
+        return cls(source_file=parts[1], selection_index=selection_index,
+                   sample_start=sample_start, sample_end=sample_end)
+
+
 class PulseModel(BaseModel):
-    time: Annotated[np.ndarray, Field(description="Массив времени импульса")]
+    time: Annotated[np.ndarray | UniformTimeAxis, Field(description="Массив времени импульса или равномерная ось")]
     current: Annotated[np.ndarray, Field(description="Массив тока импульса")]
     voltage: Annotated[np.ndarray, Field(description="Массив напряжения импульса")]
+    provenance: Optional[PulseProvenanceModel] = Field(default=None, description="Происхождение импульса")
     model_config = ConfigDict(
         arbitrary_types_allowed=True,
         validate_default=True
@@ -28,5 +144,17 @@ class PulseModel(BaseModel):
             raise ValueError("Массивы не могут быть пустыми")
         return self
 
+    def compact(self, float32: bool = True, tolerance: float = UNIFORM_TIME_TOLERANCE) -> "PulseModel":
+        """Компактная копия: равномерное время как (t0, dt, n), ток и напряжение во float32.
 
-
+        Если время неравномерно (отклонение больше tolerance * dt), массив
+        времени сохраняется как есть.
+        """
+        axis = UniformTimeAxis.from_array(self.time, tolerance)
+        dtype = np.float32 if float32 else None
+        return PulseModel(
+            time=axis if axis is not None else self.time,
+            current=np.asarray(self.current, dtype=dtype),
+            voltage=np.asarray(self.voltage, dtype=dtype),
+            provenance=self.provenance,
+        )
@@ -0,0 +1,87 @@
+"""
+CLI сквозного конвейера: python -m src.pipeline
+
+Извлечение, необязательная авто-сортировка, расчёт зарядов и отчёт
+выполняются в одном процессе без промежуточного текстового файла.
+"""
+import argparse
+from pathlib import Path
+
+from src.core.instrumentation import add_instrumentation_arguments, configure_logging, get_logger, profile_session
+from src.analysis.density import bins_arg
+
+log = get_logger("pipeline")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Сквозной конвейер: извлечение -> сортировка -> анализ -> отчёт"
+    )
+    parser.add_argument(
+        "-c", "--config",
+        type=Path,
+        default=Path("configs/extraction_config.json"),
+        help="Конфиг извлечения (по умолчанию: configs/extraction_config.json)"
+    )
+    parser.add_argument(
+        "--triage",
+        action="store_true",
+        help="Отбросить выбросы по робастной оценке аномальности перед анализом"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=None,
+        help="Порог оценки аномальности для --triage (по умолчанию: 3.5)"
+    )
+    parser.add_argument(
+        "--write-pulses",
+        type=Path,
+        default=None,
+        help="(опционально) сохранить извлечённые импульсы в текстовый файл"
+    )
+    parser.add_argument(
+        "--no-plot",
+        action="store_true",
+        help="Не строить гистограмму"
+    )
+    parser.add_argument(
+        "--bins",
+        type=bins_arg,
+        default=20,
+        help="Количество бинов или правило: fd, scott, knuth, auto (по умолчанию: 20)"
+    )
+    parser.add_argument(
+        "--dpi",
+        type=int,
+        default=300,
+        help="Разрешение гистограммы (по умолчанию: 300)"
+    )
+    add_instrumentation_arguments(parser, "profile_pipeline")
+    args = parser.parse_args()
+
+    configure_logging(args.log_level)
+    with profile_session(args.profile):
+        summary = run(args)
+
+    log.info("\n⏱️ Время этапов:")
+    for stage, seconds in summary.get("stage_seconds", {}).items():
+        log.info("   %s: %.3f с", stage, seconds)
+
+
+def run(args: argparse.Namespace) -> dict:
+    from src.pipeline.runner import PipelineRunner
+
+    return PipelineRunner(
+        extraction_config=args.config,
+        triage=args.triage,
+        triage_threshold=args.threshold,
+        write_pulses_path=args.write_pulses,
+        plot=not args.no_plot,
+        bins=args.bins,
+        dpi=args.dpi,
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Сквозной конвейер в одном процессе: извлечение -> (авто-сортировка) ->
+расчёт зарядов и характеристик -> гистограмма и отчёт.
+
+Между этапами передаётся PulseBatchModel в памяти; текстовый файл
+импульсов пишется только как необязательный побочный результат.
+"""
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from src.core.config_loader import load_config, load_selections
+from src.core.pulse_extractor import extract_pulse_batch
+from src.core.session import get_session
+from src.core.instrumentation import get_logger, span
+from src.core.atomic_io import atomic_write_json
+from src.analysis.charge_calculator import compute_batch_charges
+from src.models.pulse_batch_models import PulseBatchModel
+
+
+log = get_logger("pipeline")
+
+
+class PipelineRunner:
+    """Выполняет этапы конвейера и собирает время каждого этапа в сводку."""
+
+    def __init__(
+            self,
+            extraction_config: Path = Path("configs/extraction_config.json"),
+            triage: bool = False,
+            triage_threshold: Optional[float] = None,
+            write_pulses_path: Optional[Path] = None,
+            plot: bool = True,
+            bins: int | str = 20,
+            unit_scale: float = 1e9,
+            unit_label: str = "нКл",
+            dpi: int = 300,
+    ):
+        self.session = get_session()
+        self.extraction_config = extraction_config
+        self.triage = triage
+        self.triage_threshold = triage_threshold
+        self.write_pulses_path = write_pulses_path
+        self.plot = plot
+        self.bins = bins
+        self.unit_scale = unit_scale
+        self.unit_label = unit_label
+        self.dpi = dpi
+        self.timings: dict[str, float] = {}
+
+    @contextmanager
+    def _stage(self, name: str):
+        start = time.perf_counter()
+        log.info("▶️ Этап: %s", name)
+        try:
+            with span(f"pipeline.{name}"):
+                yield
+        finally:
+            self.timings[name] = time.perf_counter() - start
+            log.info("   ⏱️ %s: %.3f с", name, self.timings[name])
+
+    def run(self) -> dict:
+        data_config = self.session.config
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        analysis_dir = self.session.output_dir(data_config.analysis_subfolder)
+        summary: dict = {"run_date": datetime.now().isoformat()}
+
+        with self._stage("extract"):
+            config = load_config(self.extraction_config)
+            selections = load_selections(data_config.selections_folder)
+            batch: PulseBatchModel = extract_pulse_batch(config, selections)
+        summary["total_pulses"] = len(batch)
+        if len(batch) == 0:
+            log.error("❌ Не извлечено ни одного импульса")
+            summary["stage_seconds"] = self.timings
+            return summary
+
+        if self.write_pulses_path is not None:
+            with self._stage("write_pulses"):
+                from src.core.pulse_writer import write_pulse_batch
+                from src.data.pulse_catalog import PulseCatalog, update_catalog_safely
+
+                self.session.ensure_dir(self.write_pulses_path.parent)
+                write_pulse_batch(batch, self.write_pulses_path)
+                update_catalog_safely(PulseCatalog.index_pulse_file, self.write_pulses_path)
+            summary["pulses_file"] = str(self.write_pulses_path)
+
+        approved = np.ones(len(batch), dtype=bool)
+        features: dict[str, np.ndarray] = {}
+        if self.triage:
+            with self._stage("triage"):
+                from src.analysis.anomaly_scoring import score_pulses, flag_outliers, DEFAULT_THRESHOLD
+
+                threshold = self.triage_threshold if self.triage_threshold is not None else DEFAULT_THRESHOLD
+                scores, features = score_pulses(batch)
+                approved = ~flag_outliers(scores, threshold)
+            summary["triage"] = {"threshold": threshold, "flagged": int((~approved).sum())}
+
+        with self._stage("analysis"):
+            charges_all = features["charge"] if "charge" in features else compute_batch_charges(batch)
+            charges = charges_all[approved]
+        summary["total_pulses_analyzed"] = int(charges.size)
+        if charges.size == 0:
+            log.error("❌ Нет одобренных импульсов для анализа")
+            summary["stage_seconds"] = self.timings
+            return summary
+        summary["charge_statistics"] = {
+            "mean": float(charges.mean()),
+            "std": float(charges.std()),
+            "min": float(charges.min()),
+            "max": float(charges.max()),
+            "median": float(np.median(charges)),
+            "unit": "C",
+        }
+
+        if self.plot:
+            with self._stage("report"):
+                from src.core.mpl_backend import use_headless_backend
+                use_headless_backend()
+                from src.analysis.histogram_plotter import plot_charge_histogram
+
+                histogram_path = analysis_dir / f"pipeline_histogram_{timestamp}.png"
+                plot_charge_histogram(
+                    charges,
+                    save_path=histogram_path,
+                    bins=self.bins,
+                    unit_scale=self.unit_scale,
+                    unit_label=self.unit_label,
+                    dpi=self.dpi,
+                )
+            summary["histogram"] = str(histogram_path)
+
+        summary["stage_seconds"] = self.timings
+        summary_path = analysis_dir / f"pipeline_summary_{timestamp}.json"
+        atomic_write_json(summary_path, summary)
+        log.info("📊 Сводка конвейера сохранена: %s", summary_path)
+        return summary
@@ -0,0 +1,305 @@
+"""
+Непрерывный приём данных: опрос raw_data_folder и selections.json.
+
+Каждые interval секунд папка с захватами сканируется через stat (только
+стандартная библиотека, без внешних сервисов). Захват считается готовым,
+когда его размер и mtime не меняются settle секунд и архив открывается
+целиком - так недописанные файлы пропускаются до следующего опроса.
+Извлекаются только новые или изменённые захваты (или те, чья запись в
+selections.json изменилась); каждый пишется в свой файл импульсов
+processed/<имя>_pulses.txt. Сводная статистика зарядов пересчитывается
+инкрементально из сохранённых по источникам сумм.
+
+    python -m src.pipeline.watch --interval 2 --settle 3
+    python -m src.pipeline.watch --once
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+from src.core.instrumentation import add_instrumentation_arguments, configure_logging, get_logger, profile_session, span
+from src.core.session import get_session
+from src.core.atomic_io import atomic_write_json, atomic_write_text
+
+
+STATE_FILE_NAME = "ingest_state.json"
+SUMMARY_FILE_NAME = "ingest_summary.json"
+
+log = get_logger("ingest")
+
+
+class ChargeSums(BaseModel):
+    """Достаточная статистика зарядов источника: сводка складывается без перечитывания импульсов."""
+    count: int = 0
+    total: float = 0.0
+    total_sq: float = 0.0
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+    @classmethod
+    def from_charges(cls, charges: np.ndarray) -> "ChargeSums":
+        if charges.size == 0:
+            return cls()
+        return cls(count=int(charges.size), total=float(charges.sum()), total_sq=float(np.square(charges).sum()),
+                   min=float(charges.min()), max=float(charges.max()))
+
+    def merge(self, other: "ChargeSums") -> "ChargeSums":
+        mins = [v for v in (self.min, other.min) if v is not None]
+        maxs = [v for v in (self.max, other.max) if v is not None]
+        return ChargeSums(count=self.count + other.count, total=self.total + other.total,
+                          total_sq=self.total_sq + other.total_sq,
+                          min=min(mins) if mins else None, max=max(maxs) if maxs else None)
+
+    def statistics(self) -> dict:
+        if self.count == 0:
+            return {"count": 0}
+        mean = self.total / self.count
+        var = max(self.total_sq / self.count - mean * mean, 0.0)
+        return {"count": self.count, "mean": mean, "std": var ** 0.5, "min": self.min, "max": self.max, "unit": "C"}
+
+
+class SourceState(BaseModel):
+    """Что уже извлечено из одного захвата."""
+    size: int
+    mtime_ns: int
+    selection_hash: str
+    output: Path
+    pulses: int
+    charges: ChargeSums
+    ingested_at: str
+
+
+class IngestState(BaseModel):
+    sources: dict[str, SourceState] = {}
+
+
+def selection_hash(selection) -> str:
+    """Хеш записи selections.json для одного файла."""
+    payload = json.dumps(selection.model_dump(), sort_keys=True).encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+def is_readable_npz(path: Path) -> bool:
+    """Архив целиком записан: zip-оглавление читается и содержит data.npy."""
+    try:
+        with zipfile.ZipFile(path) as zf:
+            return "data.npy" in zf.namelist()
+    except (zipfile.BadZipFile, OSError):
+        return False
+
+
+class IngestWatcher:
+    """Опрашивает папку захватов и инкрементально извлекает новые данные."""
+
+    def __init__(self, settle: float = 3.0):
+        self.session = get_session()
+        self.settle = settle
+        config = self.session.config
+        self.state_path = config.processed_folder / STATE_FILE_NAME
+        self.summary_path = config.outputs_folder / config.analysis_subfolder / SUMMARY_FILE_NAME
+        self.state = self._load_state()
+        # путь -> ((size, mtime_ns), время первого наблюдения этой сигнатуры)
+        self._pending: dict[Path, tuple[tuple[int, int], float]] = {}
+        self._selections_sig: Optional[tuple[int, int]] = None
+        self._selections: dict[str, object] = {}
+        self._selection_hashes: dict[str, str] = {}
+
+    def _load_state(self) -> IngestState:
+        if self.state_path.exists():
+            try:
+                return IngestState.model_validate_json(self.state_path.read_text(encoding="utf-8"))
+            except ValueError as e:
+                log.warning("⚠️ Состояние приёма повреждено и будет пересоздано: %s", e)
+        return IngestState()
+
+    def _save_state(self) -> None:
+        self.session.ensure_dir(self.state_path.parent)
+        atomic_write_text(self.state_path, self.state.model_dump_json(indent=2))
+
+    def _refresh_selections(self) -> None:
+        """Перечитывает selections.json, если он изменился с прошлого опроса."""
+        from src.core.config_loader import load_selections
+
+        path = self.session.config.selections_folder / "selections.json"
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            self._selections_sig, self._selections, self._selection_hashes = None, {}, {}
+            return
+        sig = (st.st_size, st.st_mtime_ns)
+        if sig == self._selections_sig:
+            return
+        try:
+            selections = load_selections(path.parent)
+        except ValueError as e:
+            # Файл может быть недописан - попробуем на следующем опросе
+            log.warning("⚠️ selections.json не читается, повтор при следующем опросе: %s", e)
+            return
+        self._selections_sig = sig
+        self._selections = {s.file_name: s for s in selections}
+        self._selection_hashes = {name: selection_hash(s) for name, s in self._selections.items()}
+        log.info("📋 Загружены селекции: %d файлов", len(self._selections))
+
+    def _ready_sources(self) -> list[Path]:
+        """Захваты, которые изменились и уже не дописываются."""
+        now = time.monotonic()
+        raw = self.session.config.raw_data_folder
+        ready = []
+        seen = set()
+        for path in sorted(raw.glob("*.npz")) if raw.exists() else []:
+            seen.add(path)
+            sel_hash = self._selection_hashes.get(path.name)
+            if sel_hash is None:
+                continue
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            sig = (st.st_size, st.st_mtime_ns)
+            known = self.state.sources.get(path.name)
+            if known and (known.size, known.mtime_ns) == sig and known.selection_hash == sel_hash:
+                self._pending.pop(path, None)
+                continue
+
+            pending = self._pending.get(path)
+            if pending is None or pending[0] != sig:
+                pending = self._pending[path] = (sig, now)
+                if self.settle > 0:
+                    continue
+            if now - pending[1] >= self.settle and is_readable_npz(path):
+                ready.append(path)
+
+        for path in list(self._pending):
+            if path not in seen:
+                del self._pending[path]
+        for name in [n for n in self.state.sources if not (raw / n).exists()]:
+            log.info("🗑️ Захват удалён, исключён из сводки: %s", name)
+            del self.state.sources[name]
+        # Пока selections.json не прочитан, отсутствие записи ничего не значит
+        if self._selections_sig is not None:
+            for name in [n for n in self.state.sources if n not in self._selection_hashes]:
+                log.info("🗑️ Захват убран из selections.json, исключён из сводки: %s", name)
+                del self.state.sources[name]
+        return ready
+
+    def ingest(self, path: Path) -> None:
+        """Извлекает импульсы одного захвата в отдельный файл и обновляет сводку источника."""
+        from src.core.pulse_extractor import extract_pulse_batch
+        from src.core.pulse_writer import write_pulse_batch
+        from src.analysis.charge_calculator import compute_batch_charges
+        from src.data.pulse_catalog import PulseCatalog, update_catalog_safely
+        from src.models.config_models import ConfigModel
+
+        selection = self._selections[path.name]
+        st = path.stat()
+        started = time.perf_counter()
+        with span("ingest.source"):
+            config = ConfigModel(data_folder_path=path.parent)
+            batch = extract_pulse_batch(config, [selection])
+            output = self.session.ensure_dir(self.session.config.processed_folder) / f"{path.stem}_pulses.txt"
+            write_pulse_batch(batch, output)
+            charges = compute_batch_charges(batch) if len(batch) else np.empty(0)
+
+            def _store(catalog: PulseCatalog) -> None:
+                catalog.index_pulse_file(output)
+                if charges.size:
+                    catalog.update_metrics(output, np.arange(charges.size), charge=charges)
+            update_catalog_safely(_store)
+
+        self.state.sources[path.name] = SourceState(
+            size=st.st_size,
+            mtime_ns=st.st_mtime_ns,
+            selection_hash=self._selection_hashes[path.name],
+            output=output,
+            pulses=len(batch),
+            charges=ChargeSums.from_charges(charges),
+            ingested_at=datetime.now().isoformat(),
+        )
+        self._pending.pop(path, None)
+        log.info("✅ %s: %d импульсов -> %s (%.2f с)", path.name, len(batch), output.name,
+                 time.perf_counter() - started)
+
+    def write_summary(self) -> Path:
+        """Сводка по всем источникам: объединение сохранённых сумм, без перечитывания импульсов."""
+        total = ChargeSums()
+        for source in self.state.sources.values():
+            total = total.merge(source.charges)
+        summary = {
+            "updated": datetime.now().isoformat(),
+            "sources": {
+                name: {"output": str(s.output), "pulses": s.pulses, "charge_statistics": s.charges.statistics()}
+                for name, s in sorted(self.state.sources.items())
+            },
+            "total_pulses": sum(s.pulses for s in self.state.sources.values()),
+            "charge_statistics": total.statistics(),
+        }
+        self.session.ensure_dir(self.summary_path.parent)
+        return atomic_write_json(self.summary_path, summary)
+
+    def poll(self) -> int:
+        """Один опрос: возвращает число извлечённых захватов."""
+        self._refresh_selections()
+        known_before = set(self.state.sources)
+        ready = self._ready_sources()
+        done = 0
+        for path in ready:
+            try:
+                self.ingest(path)
+                done += 1
+            except Exception as e:
+                log.error("❌ Ошибка при приёме %s: %s", path.name, e)
+        if done or set(self.state.sources) != known_before:
+            self._save_state()
+            summary_path = self.write_summary()
+            log.info("📊 Сводка обновлена: %s", summary_path)
+        return done
+
+    def run(self, interval: float = 2.0) -> None:
+        log.info("👀 Наблюдение за %s (опрос каждые %.1f с, стабилизация %.1f с)",
+                 self.session.config.raw_data_folder, interval, self.settle)
+        try:
+            while True:
+                self.poll()
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            log.info("⏹️ Наблюдение остановлено")
+
+    def run_once(self) -> int:
+        """Разовый прогон без ожидания стабилизации (для cron и ручного запуска)."""
+        settle, self.settle = self.settle, 0.0
+        try:
+            return self.poll()
+        finally:
+            self.settle = settle
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Непрерывный приём новых захватов из raw_data_folder")
+    parser.add_argument("--interval", type=float, default=2.0, help="Период опроса, с (по умолчанию: 2)")
+    parser.add_argument("--settle", type=float, default=3.0,
+                        help="Сколько секунд файл должен не меняться перед извлечением (по умолчанию: 3)")
+    parser.add_argument("--once", action="store_true", help="Один проход по папке и выход")
+    add_instrumentation_arguments(parser, "profile_ingest")
+    args = parser.parse_args()
+
+    configure_logging(args.log_level)
+    with profile_session(args.profile):
+        watcher = IngestWatcher(settle=args.settle)
+        if args.once:
+            watcher.run_once()
+        else:
+            watcher.run(args.interval)
+
+
+if __name__ == "__main__":
+    main()
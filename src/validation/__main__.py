@@ -2,45 +2,46 @@ import argparse
 import sys
 from pathlib import Path
 
-from src.core.config_loader import load_data_config
-from src.validation.folder_validator import FolderStructureValidator
-from src.validation.pulse_loader import load_pulses
-from src.validation.pulse_plotter import plot_pulses
+from src.core.instrumentation import add_instrumentation_arguments, configure_logging, get_logger, profile_session
+
+# Модули с numpy/pydantic/matplotlib импортируются внутри функций,
+# чтобы --help и выбор режима не платили за их загрузку.
+
+log = get_logger("validation")
 
 
 def validate_structure() -> bool:
     """Проверяет и создает структуру папок."""
-    data_config = load_data_config()
+    from src.core.session import get_session
+    from src.validation.folder_validator import FolderStructureValidator
+
+    data_config = get_session().config
     validator = FolderStructureValidator(data_config)
 
     if not validator.validate_and_create_structure():
-        print("❌ Ошибка при создании структуры папок")
+        log.error("❌ Ошибка при создании структуры папок")
         return False
 
     files = validator.check_for_files()
 
-    print("\n📁 Структура файлов:")
-    print(f"  .npz файлов в raw: {len(files['raw_npz'])}")
-    print(f"  .txt файлов в processed: {len(files['processed_txt'])}")
-    print(f"  .json файлов селекций: {len(files['selections_json'])}")
+    log.info("\n📁 Структура файлов:")
+    log.info("  .npz файлов в raw: %d", len(files["raw_npz"]))
+    log.info("  .txt файлов в processed: %d", len(files["processed_txt"]))
+    log.info("  .json файлов селекций: %d", len(files["selections_json"]))
 
     return True
 
 
 def main_cli() -> None:
     """CLI режим - старая функциональность."""
-    # Загружаем конфигурацию для правильных путей
-    from src.core.config_loader import load_data_config
-    data_config = load_data_config()
-
     parser = argparse.ArgumentParser(
         description="Визуализация импульсов из текстового файла"
     )
     parser.add_argument(
         "-i", "--input",
         type=Path,
-        default=data_config.processed_folder / "pulses.txt",
-        help="Путь к входному файлу с импульсами",
+        default=None,
+        help="Путь к входному файлу с импульсами (по умолчанию: processed/pulses.txt)",
     )
     parser.add_argument(
         "-o", "--output",
@@ -48,9 +49,38 @@ def main_cli() -> None:
         default=None,
         help="Директория для сохранения графиков (по умолчанию: outputs/validation)",
     )
+    parser.add_argument(
+        "-w", "--workers",
+        type=int,
+        default=1,
+        help="Количество процессов для параллельной отрисовки PNG (по умолчанию: 1)",
+    )
+    parser.add_argument(
+        "--skip-existing",
+        action="store_true",
+        help="Не перерисовывать PNG, содержимое которых не изменилось (по хешу)",
+    )
+    parser.add_argument(
+        "--contact-sheet",
+        type=Path,
+        default=None,
+        help="Вместо отдельных PNG нарисовать контактные листы 10x10 "
+             "(директория для PNG или файл .pdf для многостраничного документа)",
+    )
 
     args = parser.parse_args()
 
+    # Headless backend выбирается до первого импорта pyplot
+    from src.core.mpl_backend import use_headless_backend
+    use_headless_backend()
+    from src.core.session import get_session
+    from src.validation.pulse_loader import load_pulses
+
+    # Загружаем конфигурацию для правильных путей
+    data_config = get_session().config
+    if args.input is None:
+        args.input = data_config.processed_folder / "pulses.txt"
+
     # Если выходная директория не указана, используем стандартную
     if args.output is None:
         args.output = data_config.outputs_folder / "validation"
@@ -63,7 +93,20 @@ def main_cli() -> None:
         parser.error(f"Указанный путь не является файлом: {args.input}")
 
     pulses = load_pulses(args.input)
-    plot_pulses(pulses, save_dir=args.output)
+    if args.contact_sheet is not None:
+        from src.validation.contact_sheet import render_contact_sheets
+        render_contact_sheets(pulses, args.contact_sheet)
+    elif args.workers > 1 or args.skip_existing:
+        from src.validation.pulse_plotter import render_pulses_parallel
+        render_pulses_parallel(
+            pulses,
+            save_dir=args.output,
+            workers=args.workers,
+            skip_existing=args.skip_existing,
+        )
+    else:
+        from src.validation.pulse_plotter import plot_pulses
+        plot_pulses(pulses, save_dir=args.output)
 
 
 def main_gui() -> None:
@@ -72,7 +115,7 @@ def main_gui() -> None:
         from PyQt6.QtWidgets import QApplication
         from src.validation.pulse_validator_gui import PulseValidatorMainWindow
     except ImportError:
-        print("Ошибка: PyQt6 не установлен. Установите: pip install PyQt6")
+        log.error("Ошибка: PyQt6 не установлен. Установите: pip install PyQt6")
         sys.exit(1)
 
     app = QApplication(sys.argv)
@@ -94,18 +137,21 @@ def main() -> None:
         action="store_true",
         help="Запустить в CLI режиме (старая функциональность)",
     )
+    add_instrumentation_arguments(parser, "profile_validation")
 
     args, unknown_args = parser.parse_known_args()
-
-    # Если указан --cli или есть дополнительные аргументы, запускаем CLI
-    if args.cli or unknown_args:
-        if unknown_args:
-            # Передаем неизвестные аргументы в CLI режим
-            sys.argv = [sys.argv[0]] + unknown_args
-        main_cli()
-    else:
-        # По умолчанию запускаем GUI
-        main_gui()
+    configure_logging(args.log_level)
+
+    with profile_session(args.profile):
+        # Если указан --cli или есть дополнительные аргументы, запускаем CLI
+        if args.cli or unknown_args:
+            if unknown_args:
+                # Передаем неизвестные аргументы в CLI режим
+                sys.argv = [sys.argv[0]] + unknown_args
+            main_cli()
+        else:
+            # По умолчанию запускаем GUI
+            main_gui()
 
 
 if __name__ == "__main__":
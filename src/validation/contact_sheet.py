@@ -0,0 +1,208 @@
+"""
+Контактные листы: много импульсов мелкими графиками на одной странице.
+
+Используются прореженные (min/max) трассы и общие оси, поэтому каждая
+страница рисуется за один проход по заранее созданной сетке осей.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+from matplotlib.figure import Figure
+
+from src.models.pulse_models import PulseModel
+from src.models.pulse_batch_models import PulseBatchModel
+from src.core.instrumentation import get_logger
+
+
+SHEET_ROWS = 10
+SHEET_COLS = 10
+# Максимум точек на одну трассу после прореживания
+SHEET_MAX_POINTS = 200
+APPROVED_COLOR = "tab:green"
+REJECTED_COLOR = "tab:red"
+
+log = get_logger("contact_sheet")
+
+
+def decimate_trace(time: np.ndarray, values: np.ndarray, max_points: int = SHEET_MAX_POINTS) -> tuple[np.ndarray, np.ndarray]:
+    """Прореживает трассу до ~max_points точек, сохраняя min/max каждого сегмента."""
+    n = len(values)
+    if n <= max_points:
+        return np.asarray(time), values
+
+    segments = max(1, max_points // 2)
+    seg_len = n // segments
+    usable = seg_len * segments
+    v = values[:usable].reshape(segments, seg_len)
+
+    rows = np.arange(segments)
+    i_min = v.argmin(axis=1)
+    i_max = v.argmax(axis=1)
+    # Порядок min/max внутри сегмента сохраняем по времени
+    first = np.minimum(i_min, i_max)
+    second = np.maximum(i_min, i_max)
+    # Время берётся по индексам отсчётов: для UniformTimeAxis ось не разворачивается
+    picked = np.column_stack((rows * seg_len + first, rows * seg_len + second)).ravel()
+    t_out = np.asarray(time[picked])
+    v_out = np.column_stack((v[rows, first], v[rows, second])).ravel()
+    return t_out, v_out
+
+
+def prepare_traces(pulses: Sequence[PulseModel], max_points: int = SHEET_MAX_POINTS) -> list[tuple[np.ndarray, np.ndarray]]:
+    """Возвращает прореженные трассы тока со временем относительно начала импульса."""
+    traces = []
+    for p in pulses:
+        t = p.time - p.time[0]
+        traces.append(decimate_trace(t, p.current, max_points))
+    return traces
+
+
+def prepare_batch_traces(batch: PulseBatchModel, indices: Sequence[int],
+                         max_points: int = SHEET_MAX_POINTS) -> list[tuple[np.ndarray, np.ndarray]]:
+    """Как prepare_traces, но прямо по срезам пакета и только для импульсов indices."""
+    traces = []
+    for k in indices:
+        s, e = int(batch.offsets[k]), int(batch.offsets[k + 1])
+        if batch.uniform_time:
+            t = batch.time.axis(k) - batch.time.t0[k]
+        else:
+            t = batch.time[s:e] - batch.time[s]
+        traces.append(decimate_trace(t, batch.current[s:e], max_points))
+    return traces
+
+
+class ContactSheetLayout:
+    """Сетка rows x cols осей с общими осями и заранее созданными линиями."""
+
+    def __init__(self, figure: Figure, rows: int = SHEET_ROWS, cols: int = SHEET_COLS):
+        self.figure = figure
+        self.rows = rows
+        self.cols = cols
+        axes = figure.subplots(rows, cols, sharex=True, sharey=True, squeeze=False)
+        self.axes = list(axes.ravel())
+        self.lines = []
+        self.labels = []
+        for ax in self.axes:
+            (line,) = ax.plot([], [], linewidth=0.6, color="black")
+            label = ax.text(0.02, 0.95, "", transform=ax.transAxes, ha="left", va="top", fontsize=5)
+            ax.set_xticks([])
+            ax.set_yticks([])
+            self.lines.append(line)
+            self.labels.append(label)
+        figure.subplots_adjust(left=0.01, right=0.99, bottom=0.01, top=0.99, wspace=0.05, hspace=0.05)
+
+    @property
+    def page_size(self) -> int:
+        return self.rows * self.cols
+
+    def set_limits(self, traces: Sequence[tuple[np.ndarray, np.ndarray]]) -> None:
+        """Задаёт общие пределы осей по всем трассам (один раз на набор данных)."""
+        if not traces:
+            return
+        self._apply_limits(max(float(t[-1]) for t, _ in traces),
+                           min(float(v.min()) for _, v in traces),
+                           max(float(v.max()) for _, v in traces))
+
+    def set_batch_limits(self, batch: PulseBatchModel, indices: np.ndarray) -> None:
+        """Общие пределы осей для импульсов indices пакета без прореживания трасс."""
+        indices = np.asarray(indices, dtype=np.int64)
+        if indices.size == 0:
+            return
+        starts, ends = batch.starts[indices], batch.ends[indices]
+        duration = batch.time[ends - 1] - batch.time[starts]
+        self._apply_limits(float(np.max(duration)),
+                           float(np.minimum.reduceat(batch.current, batch.starts)[indices].min()),
+                           float(np.maximum.reduceat(batch.current, batch.starts)[indices].max()))
+
+    def _apply_limits(self, t_max: float, y_min: float, y_max: float) -> None:
+        t_max = t_max or 1.0
+        if y_min == y_max:
+            y_min, y_max = y_min - 1.0, y_max + 1.0
+        self.axes[0].set_xlim(0.0, t_max)
+        self.axes[0].set_ylim(y_min, y_max)
+
+    def fill(self, traces: Sequence[tuple[np.ndarray, np.ndarray]], numbers: Sequence[int],
+             approved: Sequence[bool] | None = None) -> None:
+        """Обновляет линии и подписи страницы; лишние ячейки скрываются."""
+        for slot, ax in enumerate(self.axes):
+            if slot < len(traces):
+                t, v = traces[slot]
+                ok = True if approved is None else bool(approved[slot])
+                color = APPROVED_COLOR if ok else REJECTED_COLOR
+                self.lines[slot].set_data(t, v)
+                self.lines[slot].set_color(color)
+                self.labels[slot].set_text(f"#{numbers[slot]}")
+                for spine in ax.spines.values():
+                    spine.set_edgecolor(color)
+                ax.set_visible(True)
+            else:
+                ax.set_visible(False)
+
+    def slot_at(self, axes) -> int | None:
+        """Номер ячейки по объекту осей (для обработки кликов)."""
+        try:
+            return self.axes.index(axes)
+        except ValueError:
+            return None
+
+
+def render_contact_sheets(
+        pulses: Sequence[PulseModel],
+        save_path: Path,
+        approved: Sequence[bool] | None = None,
+        rows: int = SHEET_ROWS,
+        cols: int = SHEET_COLS,
+        max_points: int = SHEET_MAX_POINTS,
+        dpi: int = 150,
+) -> list[Path]:
+    """Рисует контактные листы импульсов.
+
+    Если save_path оканчивается на .pdf, создаётся один многостраничный PDF,
+    иначе save_path считается директорией и страницы пишутся как
+    contact_sheet_001.png, contact_sheet_002.png, ...
+    """
+    if approved is not None and len(approved) != len(pulses):
+        raise ValueError(f"Длина маски {len(approved)} != числу импульсов {len(pulses)}")
+
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(cols * 1.2, rows * 0.9))
+    FigureCanvasAgg(fig)
+    layout = ContactSheetLayout(fig, rows, cols)
+    traces = prepare_traces(pulses, max_points)
+    layout.set_limits(traces)
+
+    page = layout.page_size
+    written: list[Path] = []
+    pdf = None
+    if save_path.suffix.lower() == ".pdf":
+        from matplotlib.backends.backend_pdf import PdfPages
+        save_path.parent.mkdir(parents=True, exist_ok=True)
+        pdf = PdfPages(save_path)
+    else:
+        save_path.mkdir(parents=True, exist_ok=True)
+
+    try:
+        for page_idx, start in enumerate(range(0, len(traces), page), start=1):
+            end = min(start + page, len(traces))
+            layout.fill(
+                traces[start:end],
+                numbers=range(start + 1, end + 1),
+                approved=None if approved is None else approved[start:end],
+            )
+            if pdf is not None:
+                pdf.savefig(fig, dpi=dpi)
+            else:
+                path = save_path / f"contact_sheet_{page_idx:03d}.png"
+                fig.savefig(path, dpi=dpi)
+                written.append(path)
+    finally:
+        if pdf is not None:
+            pdf.close()
+            written.append(save_path)
+
+    log.info("🗂️ Контактные листы: %d импульсов, страниц: %d", len(traces), -(-len(traces) // page))
+    return written
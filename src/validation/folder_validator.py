@@ -1,5 +1,8 @@
 from pathlib import Path
 from src.models.config_models import DataConfigModel
+from src.core.instrumentation import get_logger
+
+log = get_logger("folders")
 
 
 class FolderStructureValidator:
@@ -8,20 +11,15 @@ class FolderStructureValidator:
 
     def validate_and_create_structure(self) -> bool:
         """Проверяет и создает структуру папок."""
-        folders = [
-            self.data_config.raw_data_folder,
-            self.data_config.processed_folder,
-            self.data_config.selections_folder,
-            self.data_config.outputs_folder,
-        ]
+        folders = self.data_config.all_folders()
 
         all_created = True
         for folder in folders:
             try:
                 folder.mkdir(parents=True, exist_ok=True)
-                print(f"✓ Папка {folder} создана/проверена")
+                log.info("✓ Папка %s создана/проверена", folder)
             except Exception as e:
-                print(f"✗ Ошибка создания папки {folder}: {e}")
+                log.error("✗ Ошибка создания папки %s: %s", folder, e)
                 all_created = False
 
         return all_created
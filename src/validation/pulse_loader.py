@@ -1,9 +1,71 @@
+import io
+import re
 from pathlib import Path
 import numpy as np
-from src.models.pulse_models import PulseModel
+from src.models.pulse_models import PulseModel, PulseProvenanceModel, UniformTimeAxis
+from src.models.pulse_batch_models import PulseBatchModel, BatchProvenanceModel, BatchTimeAxes
+from src.core.instrumentation import span, count, is_enabled
+
+# Строка-разделитель импульсов (с любым содержимым после "start")
+_START_LINE = re.compile(r"^start[^\n]*$", re.MULTILINE)
+
+
+def _sample_dtype(header: str):
+    """dtype тока и напряжения: float32, если столбцы помечены ":f4"."""
+    return np.float32 if ":f4" in header else np.float64
+
+
+def _compact_dtype(header: str):
+    """None для полного формата (time/current/voltage), иначе dtype компактного формата."""
+    if header.startswith("time"):
+        return None
+    return _sample_dtype(header)
+
+
+def _time_field(line: str) -> str:
+    """Поле оси времени <t0>:<dt> из строки "start" компактного файла."""
+    parts = line.rstrip("\r\n").split("\t")
+    if len(parts) < 4 or not parts[3]:
+        raise ValueError("В строке start нет оси времени <t0>:<dt>")
+    return parts[3]
+
+
+def _load_compact_pulses(file, dtype) -> list[PulseModel]:
+    """Разбор компактного файла: ток и напряжение построчно, время - из строки start."""
+    pulses: list[PulseModel] = []
+    current, voltage = [], []
+    provenance, axis_field = None, None
+
+    def flush():
+        if current:
+            pulses.append(PulseModel(
+                time=UniformTimeAxis.from_field(axis_field, len(current)),
+                current=np.array(current, dtype=dtype),
+                voltage=np.array(voltage, dtype=dtype),
+                provenance=provenance
+            ))
+            current.clear()
+            voltage.clear()
+
+    for line_num, line in enumerate(file, start=2):
+        try:
+            if line.startswith("start"):
+                flush()
+                provenance = PulseProvenanceModel.from_start_line(line)
+                axis_field = _time_field(line)
+            else:
+                parts = line.strip().split("\t")
+                if len(parts) == 2:
+                    current.append(float(parts[0]))
+                    voltage.append(float(parts[1]))
+        except ValueError as e:
+            raise ValueError(f"Ошибка парсинга строки {line_num}: {e}") from e
+    flush()
+    return pulses
+
 
 def load_pulses(file_path: Path) -> list[PulseModel]:
-    """Загружает импульсы из текстового файла."""
+    """Загружает импульсы из текстового файла (полного или компактного формата)."""
     if not file_path.exists():
         raise FileNotFoundError(f"Файл не найден: {file_path}")
     if not file_path.is_file():
@@ -11,40 +73,161 @@ def load_pulses(file_path: Path) -> list[PulseModel]:
     
     pulses: list[PulseModel] = []
     time, current, voltage = [], [], []
+    provenance = None
     try:
-        with open(file_path, "r", encoding="utf-8") as file:
-            next(file)  # Пропускаем заголовок
-            for line_num, line in enumerate(file, start=2):
-                try:
-                    if line.startswith("start"):
-                        if time:
-                            pulses.append(PulseModel(
-                                time=np.array(time),
-                                current=np.array(current),
-                                voltage=np.array(voltage)
-                            ))
-                            time, current, voltage = [], [], []
-                    else:
-                        parts = line.strip().split("\t")
-                        if len(parts) == 3:
-                            t, i, v = map(float, parts)
-                            time.append(t)
-                            current.append(i)
-                            voltage.append(v)
-                except ValueError as e:
-                    raise ValueError(
-                        f"Ошибка парсинга строки {line_num} в файле {file_path}: {e}"
-                    ) from e
+        with span("load.pulses"), open(file_path, "r", encoding="utf-8") as file:
+            header = next(file)  # Пропускаем заголовок
+            compact_dtype = _compact_dtype(header)
+            if compact_dtype is not None:
+                pulses = _load_compact_pulses(file, compact_dtype)
+            else:
+                dtype = _sample_dtype(header)
+                for line_num, line in enumerate(file, start=2):
+                    try:
+                        if line.startswith("start"):
+                            if time:
+                                pulses.append(PulseModel(
+                                    time=np.array(time),
+                                    current=np.array(current, dtype=dtype),
+                                    voltage=np.array(voltage, dtype=dtype),
+                                    provenance=provenance
+                                ))
+                                time, current, voltage = [], [], []
+                            provenance = PulseProvenanceModel.from_start_line(line)
+                        else:
+                            parts = line.strip().split("\t")
+                            if len(parts) == 3:
+                                t, i, v = map(float, parts)
+                                time.append(t)
+                                current.append(i)
+                                voltage.append(v)
+                    except ValueError as e:
+                        raise ValueError(
+                            f"Ошибка парсинга строки {line_num} в файле {file_path}: {e}"
+                        ) from e
         if time:
             pulses.append(PulseModel(
                 time=np.array(time),
-                current=np.array(current),
-                voltage=np.array(voltage)
+                current=np.array(current, dtype=dtype),
+                voltage=np.array(voltage, dtype=dtype),
+                provenance=provenance
             ))
     except FileNotFoundError:
         raise
     except Exception as e:
         raise RuntimeError(f"Ошибка при чтении файла {file_path}: {e}") from e
-    
+
+    if is_enabled():
+        # stat() и проход по импульсам только при включённой инструментации
+        count("load.bytes_read", file_path.stat().st_size)
+        count("load.pulses_parsed", len(pulses))
+        count("load.samples_parsed", sum(len(p.time) for p in pulses))
     return pulses
 
+
+def load_pulse_at(file_path: Path, byte_offset: int, n_samples: int) -> PulseModel:
+    """Загружает один импульс по байтовому смещению его первой строки данных."""
+    with open(file_path, "rb") as file:
+        header = file.readline().decode("utf-8")
+        compact_dtype = _compact_dtype(header)
+        start_line = ""
+        if compact_dtype is not None:
+            # Ось времени хранится в строке start прямо перед данными
+            back = max(0, byte_offset - 4096)
+            file.seek(back)
+            start_line = file.read(byte_offset - back).rstrip(b"\n").rsplit(b"\n", 1)[-1].decode("utf-8")
+        file.seek(byte_offset)
+        lines = [file.readline().decode("utf-8") for _ in range(n_samples)]
+    columns = 3 if compact_dtype is None else 2
+    try:
+        data = np.loadtxt(lines, delimiter="\t", ndmin=2)
+    except ValueError as e:
+        raise ValueError(f"Ошибка парсинга импульса по смещению {byte_offset} в файле {file_path}: {e}") from e
+    if data.shape != (n_samples, columns):
+        raise ValueError(f"Ожидалось {n_samples} строк по {columns} значения по смещению {byte_offset} в файле {file_path}")
+    if compact_dtype is not None:
+        return PulseModel(time=UniformTimeAxis.from_field(_time_field(start_line), n_samples),
+                          current=data[:, 0].astype(compact_dtype), voltage=data[:, 1].astype(compact_dtype),
+                          provenance=PulseProvenanceModel.from_start_line(start_line))
+    dtype = _sample_dtype(header)
+    return PulseModel(time=data[:, 0], current=data[:, 1].astype(dtype), voltage=data[:, 2].astype(dtype),
+                      provenance=PulseProvenanceModel.from_start_line(start_line) if start_line else None)
+
+
+def load_pulse_batch(file_path: Path) -> PulseBatchModel:
+    """Загружает все импульсы файла в плоские массивы без объекта на каждый импульс.
+
+    Строки "start" заменяются строкой из NaN, весь текст разбирается одним
+    вызовом np.loadtxt, а границы импульсов находятся по NaN-строкам.
+    """
+    if not file_path.exists():
+        raise FileNotFoundError(f"Файл не найден: {file_path}")
+    if not file_path.is_file():
+        raise ValueError(f"Путь не является файлом: {file_path}")
+
+    with span("load.read_text"):
+        text = file_path.read_text(encoding="utf-8")
+    if is_enabled():
+        count("load.bytes_read", file_path.stat().st_size)
+    header, _, body = text.partition("\n")
+    compact_dtype = _compact_dtype(header)
+    columns = 3 if compact_dtype is None else 2
+    start_lines = _START_LINE.findall(body)
+    body = _START_LINE.sub("\t".join(["nan"] * columns), body)
+    if not body.strip():
+        data = np.empty((0, columns))
+    else:
+        try:
+            with span("load.parse"):
+                data = np.loadtxt(io.StringIO(body), delimiter="\t", ndmin=2)
+        except ValueError as e:
+            raise ValueError(f"Ошибка парсинга файла {file_path}: {e}") from e
+    if data.shape[1] != columns:
+        raise ValueError(f"Ожидалось {columns} столбца в файле {file_path}, получено {data.shape[1]}")
+
+    marker_pos = np.flatnonzero(np.isnan(data).all(axis=1))
+    samples = np.delete(data, marker_pos, axis=0)
+    # Позиция каждого маркера в массиве без маркеров = число отсчётов до него;
+    # пустые импульсы (подряд идущие маркеры) схлопываются np.unique
+    offsets = np.unique(np.concatenate(([0], marker_pos - np.arange(marker_pos.size), [samples.shape[0]])))
+    provenance = _batch_provenance(start_lines, marker_pos, samples.shape[0])
+    count("load.pulses_parsed", offsets.size - 1)
+    count("load.samples_parsed", samples.shape[0])
+
+    if compact_dtype is not None:
+        # Время не хранится в файле: оси строк "start" остаются осями, без массива времени
+        keep = _nonempty(marker_pos, samples.shape[0])
+        axes = [_time_field(line).split(":") for line, k in zip(start_lines, keep) if k]
+        t0 = np.array([float(a[0]) for a in axes])
+        dt = np.array([float(a[1]) for a in axes])
+        return PulseBatchModel(
+            time=BatchTimeAxes(t0, dt, offsets),
+            current=np.ascontiguousarray(samples[:, 0], dtype=compact_dtype),
+            voltage=np.ascontiguousarray(samples[:, 1], dtype=compact_dtype),
+            offsets=offsets.astype(np.int64),
+            provenance=provenance,
+        )
+    dtype = _sample_dtype(header)
+    return PulseBatchModel(
+        time=np.ascontiguousarray(samples[:, 0]),
+        current=np.ascontiguousarray(samples[:, 1], dtype=dtype),
+        voltage=np.ascontiguousarray(samples[:, 2], dtype=dtype),
+        offsets=offsets.astype(np.int64),
+        provenance=provenance,
+    )
+
+
+def _nonempty(marker_pos: np.ndarray, n_samples: int) -> np.ndarray:
+    """Маска маркеров "start", за которыми идёт хотя бы один отсчёт."""
+    starts = marker_pos - np.arange(marker_pos.size)
+    ends = np.append(starts[1:], n_samples)
+    return ends > starts
+
+
+def _batch_provenance(start_lines: list[str], marker_pos: np.ndarray, n_samples: int):
+    """Происхождение непустых импульсов по их строкам "start" (None, если хоть одно неизвестно)."""
+    if not start_lines or marker_pos[0] != 0:
+        return None
+    items = [PulseProvenanceModel.from_start_line(line)
+             for line, keep in zip(start_lines, _nonempty(marker_pos, n_samples)) if keep]
+    return BatchProvenanceModel.from_items(items)
@@ -1,24 +1,24 @@
 from __future__ import annotations
 
-from typing import List
-from src.models.pulse_group_models import PulseItem
+from typing import Sequence
+import numpy as np
+from src.models.pulse_group_models import PulseGroupModel
 
 
-def apply_pulse_mask(items: List[PulseItem], mask: List[bool]) -> List[PulseItem]:
-    """Возвращает новый список PulseItem, отфильтрованный по bool-маске.
+def apply_pulse_mask(group: PulseGroupModel, mask: Sequence[bool] | np.ndarray) -> PulseGroupModel:
+    """Возвращает представление группы, отфильтрованное по bool-маске.
 
-    Длина маски должна совпадать с количеством элементов.
-    Помимо фильтрации, в результирующих элементах поле approved
-    синхронизируется с соответствующим значением маски.
+    Длина маски должна совпадать с количеством импульсов группы.
+    Данные импульсов не копируются: результат ссылается на тот же пакет
+    через массив индексов. Поле approved в результате синхронизируется
+    с маской (все оставшиеся импульсы одобрены).
     """
-    if len(items) != len(mask):
-        raise ValueError(f"Длина маски {len(mask)} != числу импульсов {len(items)}")
+    mask = np.asarray(mask, dtype=bool)
+    if len(group) != len(mask):
+        raise ValueError(f"Длина маски {len(mask)} != числу импульсов {len(group)}")
 
-    filtered: List[PulseItem] = []
-    for it, keep in zip(items, mask):
-        if keep:
-            # Создаём новый PulseItem с синхронизированным approved
-            filtered.append(PulseItem(pulse=it.pulse, approved=True))
+    filtered = group.select(mask)
+    filtered.approved[:] = True
     return filtered
 
 
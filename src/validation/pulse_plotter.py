@@ -1,23 +1,39 @@
 """
 Модуль для визуализации импульсов.
 """
+import hashlib
+import json
+import os
+import time
 import matplotlib.pyplot as plt
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from src.models.pulse_models import PulseModel
+from src.models.pulse_models import PulseModel, UniformTimeAxis
+from src.core.atomic_io import atomic_write, atomic_write_json
+from src.core.instrumentation import get_logger
 from typing import Sequence
-from src.validation.pulse_mask import apply_pulse_mask
-from src.models.pulse_group_models import PulseItem
+
+
+# Имя файла с хешами содержимого уже отрисованных PNG
+RENDER_MANIFEST_NAME = "render_manifest.json"
+# Количество импульсов в одной задаче для процесса-воркера
+RENDER_CHUNK_SIZE = 64
+# Как часто (в импульсах) печатать прогресс
+PROGRESS_EVERY = 500
+
+log = get_logger("render")
 
 
 def plot_pulses(pulses: list[PulseModel], save_dir: Path | None = None, mask: Sequence[bool] | None = None) -> None:
 
     # Применяем маску, если она задана
-    items = [PulseItem(pulse=p, approved=True) for p in pulses]
     if mask is not None:
-        items = apply_pulse_mask(items, list(mask))
+        if len(mask) != len(pulses):
+            raise ValueError(f"Длина маски {len(mask)} != числу импульсов {len(pulses)}")
+        pulses = [pulses[k] for k in np.flatnonzero(np.asarray(mask, dtype=bool))]
 
-    for idx, item in enumerate(items, start=1):
-        p = item.pulse
+    for idx, p in enumerate(pulses, start=1):
         fig, ax1 = plt.subplots()
         ax1.set_title(f"Pulse #{idx}")
         ax1.set_xlabel("Time (s)")
@@ -36,4 +52,135 @@ def plot_pulses(pulses: list[PulseModel], save_dir: Path | None = None, mask: Se
             plt.close(fig)
 
         else:
-            plt.show()
\ No newline at end of file
+            plt.show()
+
+
+def pulse_content_hash(idx: int, time_arr: np.ndarray, current: np.ndarray, voltage: np.ndarray) -> str:
+    """Хеш содержимого графика: номер импульса (он в заголовке) и массивы данных."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(idx).encode())
+    if isinstance(time_arr, UniformTimeAxis):
+        h.update(np.array([time_arr.t0, time_arr.dt, time_arr.n], dtype=np.float64).tobytes())
+        time_arr = np.empty(0)
+    for arr in (time_arr, current, voltage):
+        h.update(np.ascontiguousarray(arr, dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+# Состояние процесса-воркера: одна Agg-фигура, переиспользуемая для всех импульсов
+_worker_state: dict = {}
+
+
+def _init_render_worker() -> None:
+    """Создаёт в процессе-воркере одну фигуру с линиями, которые потом только обновляются."""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    # layout="tight" пересчитывает поля при каждом savefig - с заголовком и
+    # подписями делений текущего импульса, как fig.tight_layout() в plot_pulses
+    fig = Figure(layout="tight")
+    FigureCanvasAgg(fig)
+    ax1 = fig.add_subplot(111)
+    ax1.set_xlabel("Time (s)")
+    ax1.set_ylabel("Current (A)", color="tab:blue")
+    (line_i,) = ax1.plot([], [], color="tab:blue", label="Current")
+    ax2 = ax1.twinx()
+    ax2.set_ylabel("Voltage (V)", color="tab:red")
+    (line_v,) = ax2.plot([], [], color="tab:red", linestyle="--", label="Voltage")
+
+    _worker_state.update(fig=fig, ax1=ax1, ax2=ax2, line_i=line_i, line_v=line_v)
+
+
+def _render_chunk(tasks: list[tuple[int, str, np.ndarray, np.ndarray, np.ndarray]]) -> int:
+    """Отрисовывает пачку импульсов в PNG на переиспользуемой фигуре воркера."""
+    if not _worker_state:
+        _init_render_worker()
+    st = _worker_state
+
+    for idx, path, time_arr, current, voltage in tasks:
+        st["line_i"].set_data(time_arr, current)
+        st["line_v"].set_data(time_arr, voltage)
+        for ax in (st["ax1"], st["ax2"]):
+            ax.relim()
+            ax.autoscale_view()
+        st["ax1"].set_title(f"Pulse #{idx}")
+        # Прерванное сохранение не оставляет обрезанный PNG, который --skip-existing счёл бы готовым
+        with atomic_write(Path(path), binary=True) as f:
+            st["fig"].savefig(f, format="png")
+    return len(tasks)
+
+
+def _load_render_manifest(save_dir: Path) -> dict[str, str]:
+    manifest_path = save_dir / RENDER_MANIFEST_NAME
+    if not manifest_path.exists():
+        return {}
+    try:
+        return json.loads(manifest_path.read_text(encoding="utf-8"))
+    except (json.JSONDecodeError, OSError):
+        return {}
+
+
+def render_pulses_parallel(
+        pulses: list[PulseModel],
+        save_dir: Path,
+        mask: Sequence[bool] | None = None,
+        workers: int | None = None,
+        skip_existing: bool = False,
+        chunk_size: int = RENDER_CHUNK_SIZE,
+) -> dict:
+    """Параллельная отрисовка импульсов в PNG пулом процессов.
+
+    Каждый воркер держит одну Agg-фигуру и обновляет данные линий вместо
+    пересоздания фигуры. При skip_existing=True PNG, чей хеш содержимого
+    совпадает с записанным в render_manifest.json, не перерисовываются.
+    Возвращает сводку: отрисовано, пропущено, время и скорость.
+    """
+    save_dir.mkdir(parents=True, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+
+    if mask is not None:
+        if len(mask) != len(pulses):
+            raise ValueError(f"Длина маски {len(mask)} != числу импульсов {len(pulses)}")
+        pulses = [p for p, keep in zip(pulses, mask) if keep]
+
+    manifest = _load_render_manifest(save_dir) if skip_existing else {}
+    new_manifest: dict[str, str] = {}
+    tasks = []
+    skipped = 0
+    for idx, p in enumerate(pulses, start=1):
+        name = f"pulse_{idx:03d}.png"
+        digest = pulse_content_hash(idx, p.time, p.current, p.voltage)
+        new_manifest[name] = digest
+        if skip_existing and manifest.get(name) == digest and (save_dir / name).exists():
+            skipped += 1
+            continue
+        tasks.append((idx, str(save_dir / name), p.time, p.current, p.voltage))
+
+    chunks = [tasks[k:k + chunk_size] for k in range(0, len(tasks), chunk_size)]
+    rendered = 0
+    next_report = PROGRESS_EVERY
+    start = time.perf_counter()
+
+    log.info("🖼️ Отрисовка %d импульсов (%d пропущено), процессов: %d", len(tasks), skipped, workers)
+    if chunks:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_render_worker) as pool:
+            futures = [pool.submit(_render_chunk, chunk) for chunk in chunks]
+            for fut in as_completed(futures):
+                rendered += fut.result()
+                if rendered >= next_report or rendered == len(tasks):
+                    elapsed = time.perf_counter() - start
+                    rate = rendered / elapsed if elapsed > 0 else 0.0
+                    log.info("   %d/%d PNG, %.1f имп/с", rendered, len(tasks), rate)
+                    next_report = rendered + PROGRESS_EVERY
+
+    elapsed = time.perf_counter() - start
+    atomic_write_json(save_dir / RENDER_MANIFEST_NAME, new_manifest)
+
+    summary = {
+        "rendered": rendered,
+        "skipped": skipped,
+        "seconds": elapsed,
+        "pulses_per_second": rendered / elapsed if elapsed > 0 else 0.0,
+    }
+    log.info("✅ Готово: %d PNG за %.1f с (%.1f имп/с)", rendered, elapsed, summary["pulses_per_second"])
+    return summary
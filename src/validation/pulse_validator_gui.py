@@ -1,11 +1,12 @@
 """
 Главное окно PyQt приложения для валидации импульсов.
 """
-import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
 
-from PyQt6.QtCore import Qt
+import numpy as np
+from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QKeySequence, QShortcut, QColor
 from PyQt6.QtWidgets import (
     QMainWindow,
@@ -17,24 +18,39 @@ from PyQt6.QtWidgets import (
     QFileDialog,
     QStatusBar,
     QSplitter,
+    QStackedWidget,
 )
 
-from src.core.config_loader import load_data_config
+from src.core.session import get_session
 from src.data.pulses_repository import PulsesRepository
+from src.data.approval_journal import ApprovalJournal
 from src.models.config_models import DataConfigModel
 from src.validation.ui.widgets.pulse_plot_widget import PulsePlotWidget
+from src.validation.ui.widgets.pulse_grid_widget import PulseGridWidget
 from src.models.pulse_models import PulseModel
 from src.core.pulse_writer import write_pulses
-from src.models.pulse_group_models import PulseGroupModel, PulseItem
+from src.core.atomic_io import atomic_write_json
+from src.models.pulse_group_models import PulseGroupModel
+from src.analysis.anomaly_scoring import score_pulses, triage_order
 from src.validation.pulse_mask import apply_pulse_mask
 
 
 class PulseValidatorMainWindow(QMainWindow):
     """Главное окно приложения для валидации импульсов."""
 
-    def __init__(self, data_config: DataConfigModel | None = None) -> None:
+    # Сигналы завершения фонового сохранения (доставляются в GUI-поток)
+    save_finished = pyqtSignal(str)
+    save_failed = pyqtSignal(str)
+
+    def __init__(self, data_config: DataConfigModel | None = None, sort_by_score: bool = True) -> None:
         super().__init__()
-        self.data_config = data_config or load_data_config()
+        self.data_config = data_config or get_session().config
+
+        # Журнал решений и фоновый поток сохранения
+        self.journal = ApprovalJournal()
+        self._save_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="save-approved")
+        self.save_finished.connect(self._on_save_finished)
+        self.save_failed.connect(self._on_save_failed)
 
         self.setWindowTitle("Валидатор импульсов")
         self.setGeometry(100, 100, 1200, 700)
@@ -47,6 +63,16 @@ class PulseValidatorMainWindow(QMainWindow):
         # Текущий выбранный импульс
         self.current_file: Optional[Path] = None
         self.current_pulse_index: Optional[int] = None
+        # Файл, трассы которого сейчас загружены в сетку
+        self._grid_file: Optional[Path] = None
+
+        # Предварительная сортировка: оценки аномальности и порядок просмотра.
+        # order_by_file[f][pos] - индекс импульса на позиции pos в дереве,
+        # position_by_file[f][idx] - позиция импульса idx в дереве.
+        self.sort_by_score = sort_by_score
+        self.scores_by_file: dict[Path, np.ndarray] = {}
+        self.order_by_file: dict[Path, np.ndarray] = {}
+        self.position_by_file: dict[Path, np.ndarray] = {}
 
         self._setup_ui()
         self._setup_shortcuts()
@@ -70,9 +96,14 @@ class PulseValidatorMainWindow(QMainWindow):
         self.tree_widget.itemDoubleClicked.connect(self._on_double_click)
         splitter.addWidget(self.tree_widget)
 
-        # Виджет графика справа
+        # Виджет графика справа (одиночный график или сетка, переключение по G)
         self.plot_widget = PulsePlotWidget()
-        splitter.addWidget(self.plot_widget)
+        self.grid_widget = PulseGridWidget()
+        self.grid_widget.pulse_clicked.connect(self._on_grid_clicked)
+        self.view_stack = QStackedWidget()
+        self.view_stack.addWidget(self.plot_widget)
+        self.view_stack.addWidget(self.grid_widget)
+        splitter.addWidget(self.view_stack)
 
         # Статус-бар
         self.status_bar = QStatusBar()
@@ -105,6 +136,14 @@ class PulseValidatorMainWindow(QMainWindow):
         space_shortcut = QShortcut(QKeySequence("Space"), self)
         space_shortcut.activated.connect(self._toggle_current_approval)
 
+        # T — сортировка по оценке аномальности вкл/выкл
+        triage_shortcut = QShortcut(QKeySequence("T"), self)
+        triage_shortcut.activated.connect(self._toggle_sort_by_score)
+
+        # G — переключить сетку импульсов
+        grid_shortcut = QShortcut(QKeySequence("G"), self)
+        grid_shortcut.activated.connect(self._toggle_grid_view)
+
     def _open_files(self) -> None:
         """Открыть диалог выбора файлов и загрузить все выбранные файлы."""
         file_paths, _ = QFileDialog.getOpenFileNames(
@@ -120,12 +159,12 @@ class PulseValidatorMainWindow(QMainWindow):
             file_path = Path(file_path_str)
             try:
                 # Загружаем группу с авто-применением selections, если лежит рядом
-                group = PulsesRepository.load_group(file_path)
+                group = PulsesRepository.load_group(file_path, include_rejected=True)
             except Exception as e:
                 QMessageBox.warning(self, "Ошибка загрузки", f"{file_path.name}: {e}")
                 continue
 
-            if not group.pulses:
+            if len(group) == 0:
                 continue
 
             self.pulse_data[file_path] = group
@@ -142,14 +181,51 @@ class PulseValidatorMainWindow(QMainWindow):
         file_item.setData(0, Qt.ItemDataRole.UserRole, file_path)
 
         group = self.pulse_data[file_path]
-        for idx, item in enumerate(group.pulses):
+        order = self._compute_order(file_path)
+        scores = self.scores_by_file.get(file_path)
+        for idx in order:
+            idx = int(idx)
             pulse_item = QTreeWidgetItem(file_item)
-            pulse_item.setText(0, f"Импульс {idx + 1}")
+            if self.sort_by_score and scores is not None:
+                pulse_item.setText(0, f"Импульс {idx + 1} (score {scores[idx]:.1f})")
+            else:
+                pulse_item.setText(0, f"Импульс {idx + 1}")
             pulse_item.setData(0, Qt.ItemDataRole.UserRole, (file_path, idx))
-            self._update_item_appearance(pulse_item, item.approved)
+            self._update_item_appearance(pulse_item, bool(group.approved[idx]))
 
         file_item.setExpanded(True)
 
+    def _compute_order(self, file_path: Path) -> np.ndarray:
+        """Считает оценки аномальности группы и порядок импульсов в дереве."""
+        group = self.pulse_data[file_path]
+        n = len(group)
+        order = np.arange(n)
+        if self.sort_by_score and n > 0:
+            if file_path not in self.scores_by_file:
+                try:
+                    scores, _ = score_pulses(group.batch)
+                    self.scores_by_file[file_path] = scores[group.indices]
+                except Exception as e:
+                    print(f"⚠️ Не удалось оценить импульсы {file_path.name}: {e}")
+            if file_path in self.scores_by_file:
+                order = triage_order(self.scores_by_file[file_path])
+        position = np.empty(n, dtype=np.int64)
+        position[order] = np.arange(n)
+        self.order_by_file[file_path] = order
+        self.position_by_file[file_path] = position
+        return order
+
+    def _toggle_sort_by_score(self) -> None:
+        """Переключает порядок просмотра: по оценке аномальности или по файлу."""
+        self.sort_by_score = not self.sort_by_score
+        self.tree_widget.clear()
+        for file_path in self.pulse_data.keys():
+            self._add_file_to_tree(file_path)
+        if self.current_file is not None and self.current_pulse_index is not None:
+            self._select_pulse(self.current_file, self.current_pulse_index)
+        mode = "по оценке аномальности" if self.sort_by_score else "по порядку в файле"
+        self.status_bar.showMessage(f"Порядок просмотра: {mode}")
+
     def _update_item_appearance(self, item: QTreeWidgetItem, is_approved: bool) -> None:
         """Обновить внешний вид элемента дерева в зависимости от статуса одобрения."""
         if is_approved:
@@ -192,18 +268,21 @@ class PulseValidatorMainWindow(QMainWindow):
         if file_path not in self.pulse_data:
             return
         group = self.pulse_data[file_path]
-        if pulse_index >= len(group.pulses):
+        if pulse_index >= len(group):
             return
 
-        pulse = group.pulses[pulse_index].pulse
+        pulse = group.pulse(pulse_index)
         self.current_file = file_path
         self.current_pulse_index = pulse_index
 
-        is_approved = group.pulses[pulse_index].approved
-        self.plot_widget.plot_pulse(pulse, pulse_index + 1, is_approved)
+        is_approved = bool(group.approved[pulse_index])
+        if self._grid_mode():
+            self._refresh_grid()
+        else:
+            self.plot_widget.plot_pulse(pulse, pulse_index + 1, is_approved)
 
-        total_pulses = len(group.pulses)
-        approved_count = sum(1 for it in group.pulses if it.approved)
+        total_pulses = len(group)
+        approved_count = int(group.approved.sum())
         self.status_bar.showMessage(
             f"Файл: {file_path.name} | Импульс {pulse_index + 1}/{total_pulses} | Одобрено: {approved_count}/{total_pulses}"
         )
@@ -217,9 +296,11 @@ class PulseValidatorMainWindow(QMainWindow):
         if file_path not in self.pulse_data:
             return
         group = self.pulse_data[file_path]
-        if pulse_index >= len(group.pulses):
+        if pulse_index >= len(group):
             return
-        group.pulses[pulse_index].approved = not group.pulses[pulse_index].approved
+        group.approved[pulse_index] = not group.approved[pulse_index]
+        # В журнал пишется индекс импульса в исходном файле
+        self.journal.record(file_path, int(group.indices[pulse_index]), bool(group.approved[pulse_index]), group.total)
 
         # Найти элемент в дереве
         file_item = None
@@ -231,26 +312,57 @@ class PulseValidatorMainWindow(QMainWindow):
         if file_item is None:
             return
 
-        pulse_item = file_item.child(pulse_index)
+        pulse_item = file_item.child(int(self.position_by_file[file_path][pulse_index]))
         if pulse_item is None:
             return
 
-        self._update_item_appearance(pulse_item, group.pulses[pulse_index].approved)
+        self._update_item_appearance(pulse_item, bool(group.approved[pulse_index]))
 
         # Обновить график, если это текущий
-        if self.current_file == file_path and self.current_pulse_index == pulse_index:
+        if self._grid_mode() and self.current_file == file_path:
+            self._refresh_grid()
+        elif self.current_file == file_path and self.current_pulse_index == pulse_index:
             self.plot_widget.plot_pulse(
-                group.pulses[pulse_index].pulse,
+                group.pulse(pulse_index),
                 pulse_index + 1,
-                group.pulses[pulse_index].approved,
+                bool(group.approved[pulse_index]),
             )
 
-        total_pulses = len(group.pulses)
-        approved_count = sum(1 for it in group.pulses if it.approved)
+        total_pulses = len(group)
+        approved_count = int(group.approved.sum())
         self.status_bar.showMessage(
             f"Файл: {file_path.name} | Импульс {pulse_index + 1}/{total_pulses} | Одобрено: {approved_count}/{total_pulses}"
         )
 
+    def _grid_mode(self) -> bool:
+        return self.view_stack.currentWidget() is self.grid_widget
+
+    def _toggle_grid_view(self) -> None:
+        """Переключает одиночный график и сетку импульсов."""
+        if self._grid_mode():
+            self.view_stack.setCurrentWidget(self.plot_widget)
+            if self.current_file is not None and self.current_pulse_index is not None:
+                self._show_pulse(self.current_file, self.current_pulse_index)
+        else:
+            self.view_stack.setCurrentWidget(self.grid_widget)
+            self._refresh_grid()
+
+    def _refresh_grid(self) -> None:
+        """Показывает в сетке страницу с текущим импульсом."""
+        if self.current_file is None or self.current_file not in self.pulse_data:
+            return
+        group = self.pulse_data[self.current_file]
+        if self._grid_file != self.current_file:
+            self.grid_widget.set_group(group)
+            self._grid_file = self.current_file
+        self.grid_widget.show_page(self.current_pulse_index or 0, group.approved.tolist())
+
+    def _on_grid_clicked(self, pulse_index: int) -> None:
+        """Клик по ячейке сетки переключает одобрение импульса."""
+        if self.current_file is None:
+            return
+        self._toggle_approval_at(self.current_file, pulse_index)
+
     def _next_pulse(self) -> None:
         if not self.pulse_data or self.current_file is None or self.current_pulse_index is None:
             return
@@ -261,23 +373,24 @@ class PulseValidatorMainWindow(QMainWindow):
         except ValueError:
             return
 
-        next_pulse_index = self.current_pulse_index + 1
-        group = self.pulse_data[self.current_file]
-        if next_pulse_index < len(group.pulses):
-            self._select_pulse(self.current_file, next_pulse_index)
+        # Навигация идёт по позициям в дереве (с учётом сортировки по оценке)
+        next_pos = int(self.position_by_file[self.current_file][self.current_pulse_index]) + 1
+        order = self.order_by_file[self.current_file]
+        if next_pos < len(order):
+            self._select_pulse(self.current_file, int(order[next_pos]))
         elif file_index + 1 < len(files):
             next_file = files[file_index + 1]
             # переходим к следующему файлу только если в нём есть импульсы
-            if len(self.pulse_data[next_file].pulses) > 0:
-                self._select_pulse(next_file, 0)
+            if len(self.pulse_data[next_file]) > 0:
+                self._select_pulse(next_file, int(self.order_by_file[next_file][0]))
 
     def _prev_pulse(self) -> None:
         if not self.pulse_data or self.current_file is None or self.current_pulse_index is None:
             return
 
-        prev_pulse_index = self.current_pulse_index - 1
-        if prev_pulse_index >= 0:
-            self._select_pulse(self.current_file, prev_pulse_index)
+        prev_pos = int(self.position_by_file[self.current_file][self.current_pulse_index]) - 1
+        if prev_pos >= 0:
+            self._select_pulse(self.current_file, int(self.order_by_file[self.current_file][prev_pos]))
         else:
             files = list(self.pulse_data.keys())
             try:
@@ -286,9 +399,8 @@ class PulseValidatorMainWindow(QMainWindow):
                 return
             if file_index > 0:
                 prev_file = files[file_index - 1]
-                last_index = len(self.pulse_data[prev_file].pulses) - 1
-                if last_index >= 0:
-                    self._select_pulse(prev_file, last_index)
+                if len(self.pulse_data[prev_file]) > 0:
+                    self._select_pulse(prev_file, int(self.order_by_file[prev_file][-1]))
 
     def _select_pulse(self, file_path: Path, pulse_index: int) -> None:
         # Найти файл в дереве
@@ -301,7 +413,7 @@ class PulseValidatorMainWindow(QMainWindow):
         if file_item is None:
             return
 
-        pulse_item = file_item.child(pulse_index)
+        pulse_item = file_item.child(int(self.position_by_file[file_path][pulse_index]))
         if pulse_item is None:
             return
 
@@ -313,7 +425,8 @@ class PulseValidatorMainWindow(QMainWindow):
         if not self.pulse_data:
             return
         first_file = list(self.pulse_data.keys())[0]
-        self._select_pulse(first_file, 0)
+        if len(self.pulse_data[first_file]) > 0:
+            self._select_pulse(first_file, int(self.order_by_file[first_file][0]))
 
     def _save_approved(self) -> None:
         if not self.pulse_data:
@@ -323,14 +436,19 @@ class PulseValidatorMainWindow(QMainWindow):
         approved_pulses: list[PulseModel] = []
         metadata: list[dict] = []
         for file_path, group in self.pulse_data.items():
-            for idx, item in enumerate(group.pulses):
-                if item.approved:
-                    approved_pulses.append(item.pulse)
-                    metadata.append({
-                        "file": str(file_path),
-                        "pulse_index": idx,
-                        "original_index": idx + 1,
-                    })
+            for pos in np.flatnonzero(group.approved):
+                idx = int(group.indices[pos])
+                pulse = group.pulse(pos)
+                approved_pulses.append(pulse)
+                entry = {
+                    "file": str(file_path),
+                    "pulse_index": idx,
+                    "original_index": idx + 1,
+                }
+                if pulse.provenance is not None:
+                    # Связь с исходным захватом: файл, номер селекции и отсчёты
+                    entry.update(pulse.provenance.model_dump())
+                metadata.append(entry)
         if not approved_pulses:
             QMessageBox.information(self, "Информация", "Нет одобренных импульсов для сохранения")
             return
@@ -354,48 +472,58 @@ class PulseValidatorMainWindow(QMainWindow):
             return
         output_path = Path(output_path_str)
 
+        totals = {fpath: group.total for fpath, group in self.pulse_data.items()}
+        self.status_bar.showMessage(f"Сохранение {len(approved_pulses)} импульсов в фоне...")
+        self._save_executor.submit(self._write_approved, approved_pulses, metadata, output_path, totals)
+
+    def _write_approved(self, approved_pulses: list[PulseModel], metadata: list[dict],
+                        output_path: Path, totals: dict[Path, int]) -> None:
+        """Записывает одобренные импульсы и уплотняет журналы (фоновый поток)."""
         try:
             write_pulses(approved_pulses, output_path)
 
             # Сохраняем метаданные в ту же папку
             metadata_path = output_path.with_suffix(".json")
-            with open(metadata_path, "w", encoding="utf-8") as f:
-                json.dump(
-                    {
-                        "source_file": str(output_path),
-                        "total_approved": len(approved_pulses),
-                        "pulses": metadata,
-                    },
-                    f,
-                    indent=2,
-                    ensure_ascii=False,
-                )
-
-            # Сохраняем selections для каждого исходного файла в правильные папки
-            try:
-                for fpath, group in self.pulse_data.items():
-                    # Сохраняем selections рядом с исходными файлами
-                    selections_path = PulsesRepository.default_selections_path(fpath)
-                    PulsesRepository.write_selections_for_group(fpath, group)
-            except Exception as save_e:
-                QMessageBox.warning(self, "Предупреждение", f"Не удалось сохранить selections: {save_e}")
-
-            QMessageBox.information(
-                self,
-                "Успех",
+            atomic_write_json(metadata_path, {
+                "source_file": str(output_path),
+                "total_approved": len(approved_pulses),
+                "pulses": metadata,
+            })
+
+            # Selections каждого исходного файла = прежние selections + журнал
+            for fpath, total in totals.items():
+                self.journal.compact(fpath, total)
+            self.journal.flush()
+
+            self.save_finished.emit(
                 f"Сохранено {len(approved_pulses)} импульсов в: {output_path}\n"
-                f"Метаданные: {metadata_path}",
+                f"Метаданные: {metadata_path}"
             )
         except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить: {e}")
+            self.save_failed.emit(str(e))
+
+    def _on_save_finished(self, message: str) -> None:
+        self.status_bar.showMessage("Сохранение завершено")
+        QMessageBox.information(self, "Успех", message)
+
+    def _on_save_failed(self, message: str) -> None:
+        self.status_bar.showMessage("Ошибка сохранения")
+        QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить: {message}")
+
+    def closeEvent(self, event) -> None:
+        """Дожидается фонового сохранения и уплотняет журналы перед выходом."""
+        self._save_executor.shutdown(wait=True)
+        self.journal.close()
+        super().closeEvent(event)
 
     # Утилита для применения bool-маски к группе и обновления дерева (без UI)
     def _apply_mask_to_group(self, file_path: Path, mask: list[bool]) -> None:
         if file_path not in self.pulse_data:
             return
         group = self.pulse_data[file_path]
-        items = apply_pulse_mask(group.pulses, mask)
-        group.pulses = items
+        self.pulse_data[file_path] = apply_pulse_mask(group, mask)
+        self.scores_by_file.pop(file_path, None)
+        self._grid_file = None
         # Перестроить ветку файла
         # Удаляем и заново добавляем
         for i in range(self.tree_widget.topLevelItemCount()):
@@ -408,7 +536,7 @@ class PulseValidatorMainWindow(QMainWindow):
     def _auto_load_files(self) -> None:
         """Автоматическая загрузка всех файлов из configured folders."""
         try:
-            self.pulse_data = PulsesRepository.auto_discover_files(self.data_config)
+            self.pulse_data = PulsesRepository.auto_discover_files(self.data_config, include_rejected=True)
             for file_path in self.pulse_data.keys():
                 self._add_file_to_tree(file_path)
 
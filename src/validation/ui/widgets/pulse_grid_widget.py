@@ -0,0 +1,67 @@
+"""
+Виджет сетки импульсов (контактный лист) для быстрой визуальной сортировки.
+"""
+from PyQt6.QtCore import pyqtSignal
+from PyQt6.QtWidgets import QWidget, QVBoxLayout
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+import numpy as np
+from src.models.pulse_group_models import PulseGroupModel
+from src.validation.contact_sheet import ContactSheetLayout, prepare_batch_traces, SHEET_ROWS, SHEET_COLS
+
+
+class PulseGridWidget(QWidget):
+    """Сетка мелких графиков; клик по ячейке сообщает индекс импульса."""
+
+    # Индекс импульса в группе, по которому кликнули
+    pulse_clicked = pyqtSignal(int)
+
+    def __init__(self, rows: int = SHEET_ROWS, cols: int = SHEET_COLS):
+        super().__init__()
+
+        self.figure = Figure(figsize=(10, 6))
+        self.canvas = FigureCanvas(self.figure)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.canvas)
+
+        self.layout_grid = ContactSheetLayout(self.figure, rows, cols)
+        self.canvas.mpl_connect("button_press_event", self._on_click)
+
+        # Пакет и номера импульсов текущей группы, начало показанной страницы
+        self._batch = None
+        self._indices = np.empty(0, dtype=np.int64)
+        self._page_start = 0
+
+    @property
+    def page_size(self) -> int:
+        return self.layout_grid.page_size
+
+    def set_group(self, group: PulseGroupModel) -> None:
+        """Запоминает группу и задаёт общие оси; трассы прореживаются постранично в show_page."""
+        self._batch = group.batch
+        self._indices = np.asarray(group.indices, dtype=np.int64)
+        self.layout_grid.set_batch_limits(self._batch, self._indices)
+
+    def show_page(self, start: int, approved: list[bool]) -> None:
+        """Показывает страницу, начиная с импульса start."""
+        self._page_start = max(0, start - start % self.page_size)
+        end = min(self._page_start + self.page_size, len(self._indices))
+        traces = prepare_batch_traces(self._batch, self._indices[self._page_start:end]) if self._batch is not None else []
+        self.layout_grid.fill(
+            traces,
+            numbers=range(self._page_start + 1, end + 1),
+            approved=approved[self._page_start:end],
+        )
+        self.canvas.draw_idle()
+
+    def _on_click(self, event) -> None:
+        if event.inaxes is None:
+            return
+        slot = self.layout_grid.slot_at(event.inaxes)
+        if slot is None:
+            return
+        index = self._page_start + slot
+        if index < len(self._indices):
+            self.pulse_clicked.emit(index)